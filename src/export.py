@@ -0,0 +1,4 @@
+from mirai.commands.export import main
+
+if __name__ == '__main__':
+    main()
@@ -23,10 +23,7 @@ for i in $(seq 0 "$num_months"); do
     fi
 done
 
+# download the pages (URI<TAB>filename) under the adaptive per-host throttle
 for i in "${months[@]}"; do
-    output_file_name="${directory%/}/${primeminister}_${i}.html"
-    uri="${baseURI}${i}/index.html"
-    # download the page
-    curl -A "Mozilla/5.0 (Windows NT 10.0; Win16; 8086) Chrome Firefox" -o "$output_file_name" "$uri"
-    sleep 2s
-done
+    printf '%s\t%s\n' "${baseURI}${i}/index.html" "${primeminister}_${i}.html"
+done | python3 "$(dirname "$0")/fetch.py" - "$directory" --delay 2 --overwrite
@@ -7,6 +7,8 @@ html_en_dir=en
 html_ja_dir=ja
 tsv_dir=tsv
 json_dir=json
+stats_file=../stats.json
+store_dir=../store
 
 mkdir -p "$index_dir"
 mkdir -p "$html_en_dir"
@@ -16,12 +18,21 @@ mkdir -p "$json_dir"
 
 newest=$(date +"%Y%m")
 
-echo "Oldest: $oldest"
-echo "Newest: $newest"
-for primeminister in 103 # 102_ishiba 101_kishida 100_kishida 99_suga 98_abe 
-do
-    ./0_download_indices.sh "$index_dir" "$primeminister" "$oldest" "$num_months"
-done
-python 1_extract_uris.py "${index_dir%/}" > URIs.txt
-./2_download_en.sh URIs.txt "$html_en_dir"
-python 3_extract_body.py "$html_en_dir" "$html_ja_dir" "${json_dir%/}/${oldest}-${newest}.json"
+# usage: ./do.sh [--backfill]
+if [ "$1" = "--backfill" ]; then
+    # 全ての首相アーカイブ（103 102_ishiba 101_kishida 100_kishida 99_suga 98_abe）を遡る
+    oldest=201212
+    echo "Oldest: $oldest"
+    echo "Newest: $newest"
+    python backfill.py "$index_dir" "$html_en_dir"
+else
+    echo "Oldest: $oldest"
+    echo "Newest: $newest"
+    for primeminister in 103
+    do
+        ./0_download_indices.sh "$index_dir" "$primeminister" "$oldest" "$num_months"
+    done
+    python 1_extract_uris.py "${index_dir%/}" > URIs.txt
+    ./2_download_en.sh URIs.txt "$html_en_dir"
+fi
+python 3_extract_body.py "$html_en_dir" "$html_ja_dir" "${json_dir%/}/${oldest}-${newest}.json" --stats "$stats_file" --store "$store_dir"
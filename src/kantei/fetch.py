@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from mirai.sources.kantei.fetch import main  # noqa: E402
+
+if __name__ == '__main__':
+    main()
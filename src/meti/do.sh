@@ -4,6 +4,8 @@ oldest=202410
 html_dir=html
 tsv_dir=tsv
 json_dir=json
+stats_file=../stats.json
+store_dir=../store
 
 mkdir -p "$html_dir" "$tsv_dir" "$json_dir"
 
@@ -13,4 +15,4 @@ echo "Oldest: $oldest"
 echo "Newest: $newest"
 
 python3 0_download_indices.py "$oldest" "$newest" "${tsv_dir%/}/$oldest-$newest.tsv" --html_directory "$html_dir"
-python3 1_extract_body.py "${tsv_dir%/}/$oldest-$newest.tsv" "${json_dir%/}/$oldest-$newest.json" --html_directory "$html_dir"
+python3 1_extract_body.py "${tsv_dir%/}/$oldest-$newest.tsv" "${json_dir%/}/$oldest-$newest.json" --html_directory "$html_dir" --stats "$stats_file" --store "$store_dir"
@@ -0,0 +1,25 @@
+"""Download, extraction and evaluation tools for the Mirai full-document dataset.
+
+``import mirai`` is cheap: the names below are imported on first access.
+"""
+import importlib
+from typing import Any
+
+_LAZY: dict[str, str] = {
+    'Document': 'mirai.document',
+    'iter_documents': 'mirai.document',
+    'read_documents': 'mirai.document',
+    'write_documents': 'mirai.document',
+    'iter_records': 'mirai.records',
+    'unique_records': 'mirai.records',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,3 @@
+from mirai.cli import main
+
+main()
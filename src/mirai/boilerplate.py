@@ -0,0 +1,197 @@
+"""Corpus-wide boilerplate detection with a hashed paragraph frequency index.
+
+Every paragraph is normalised (NFKC, case-folded, whitespace collapsed,
+digits replaced by 0) and hashed to 64 bits.  Per site and language the
+index keeps a sorted ``uint64`` array of hashes with the number of documents
+containing each, plus the hashes of the document ids already counted, so a
+re-extracted document is not counted twice.  A paragraph seen in at least
+``max(min_count, min_fraction * documents)`` documents of its site is
+boilerplate and is stripped before the alignment checks.
+
+Documents are counted before they are stripped, so a fresh index only
+starts stripping once it has seen enough of the site; run an extractor twice
+over a new corpus (the second run reuses the counts) to strip consistently.
+"""
+import fcntl
+import hashlib
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+import numpy as np
+
+WHITESPACE: re.Pattern[str] = re.compile(r'\s+')
+DIGITS: re.Pattern[str] = re.compile(r'\d')
+LANGUAGES: tuple[str, ...] = ('en', 'ja')
+
+
+def normalise(paragraph: str) -> str:
+    text: str = unicodedata.normalize('NFKC', paragraph).casefold()
+    return DIGITS.sub('0', WHITESPACE.sub(' ', text).strip())
+
+
+def paragraph_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _merge(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray, new_counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Add (new_keys, new_counts) into a sorted key/count table."""
+    all_keys: np.ndarray = np.concatenate([keys, new_keys])
+    merged, inverse = np.unique(all_keys, return_inverse=True)
+    totals: np.ndarray = np.zeros(len(merged), dtype=np.uint32)
+    np.add.at(totals, inverse, np.concatenate([counts, new_counts]).astype(np.uint32))
+    return merged, totals
+
+
+class BoilerplateIndex:
+    """Hash -> document frequency tables of one site, with not yet saved observations kept separately."""
+
+    def __init__(self, site: str, min_count: int = 10, min_fraction: float = 0.02) -> None:
+        self.site: str = site
+        self.min_count: int = min_count
+        self.min_fraction: float = min_fraction
+        self.keys: dict[str, np.ndarray] = {lang: np.zeros(0, dtype=np.uint64) for lang in LANGUAGES}
+        self.counts: dict[str, np.ndarray] = {lang: np.zeros(0, dtype=np.uint32) for lang in LANGUAGES}
+        self.documents: np.ndarray = np.zeros(0, dtype=np.uint64)
+        self.pending: dict[str, dict[int, int]] = {lang: {} for lang in LANGUAGES}
+        # 文書ハッシュ -> 言語ごとの（重複のない）段落ハッシュ。保存時の競合で差し引くために保持する
+        self.pending_documents: dict[int, dict[str, np.ndarray]] = {}
+        self.stripped: int = 0
+
+    def _load_arrays(self, path: Path) -> dict[str, np.ndarray]:
+        if not path.exists():
+            return {}
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def load(self, path: Path) -> None:
+        arrays: dict[str, np.ndarray] = self._load_arrays(path)
+        for lang in LANGUAGES:
+            self.keys[lang] = arrays.get(f'{self.site}.{lang}.keys', self.keys[lang])
+            self.counts[lang] = arrays.get(f'{self.site}.{lang}.counts', self.counts[lang])
+        self.documents = arrays.get(f'{self.site}.documents', self.documents)
+
+    def save(self, path: Path) -> int:
+        """Merge the pending observations into the file under an exclusive lock (other sites are kept).
+
+        Documents that another run counted meanwhile are left out of the merge; returns how many there were.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.with_name(path.name + '.lock').open('w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            arrays: dict[str, np.ndarray] = self._load_arrays(path)
+            # 読み込み後に他のプロセスが数えた文書は二重に数えない
+            documents: np.ndarray = arrays.get(f'{self.site}.documents', np.zeros(0, dtype=np.uint64))
+            new_documents: np.ndarray = np.array(sorted(self.pending_documents), dtype=np.uint64)
+            counted: np.ndarray = new_documents[np.isin(new_documents, documents)]
+            for doc_hash in counted.tolist():
+                for lang, values in self.pending_documents.pop(doc_hash).items():
+                    pending: dict[int, int] = self.pending[lang]
+                    for value in values.tolist():
+                        pending[value] -= 1
+                        if not pending[value]:
+                            del pending[value]
+            for lang in LANGUAGES:
+                pending = self.pending[lang]
+                keys, counts = _merge(
+                    arrays.get(f'{self.site}.{lang}.keys', np.zeros(0, dtype=np.uint64)),
+                    arrays.get(f'{self.site}.{lang}.counts', np.zeros(0, dtype=np.uint32)),
+                    np.fromiter(pending.keys(), dtype=np.uint64, count=len(pending)),
+                    np.fromiter(pending.values(), dtype=np.uint32, count=len(pending)),
+                )
+                arrays[f'{self.site}.{lang}.keys'] = keys
+                arrays[f'{self.site}.{lang}.counts'] = counts
+                self.keys[lang], self.counts[lang] = keys, counts
+                pending.clear()
+            self.documents = np.union1d(documents, new_documents)
+            arrays[f'{self.site}.documents'] = self.documents
+            self.pending_documents.clear()
+            temporary: Path = path.with_name(path.name + '.tmp.npz')
+            np.savez(temporary, **arrays)
+            os.replace(temporary, path)
+        return len(counted)
+
+    def _counted(self, doc_hash: int) -> bool:
+        """Whether a saved count already includes the document (``documents`` is sorted)."""
+        position: int = int(np.searchsorted(self.documents, np.uint64(doc_hash)))
+        return position < len(self.documents) and int(self.documents[position]) == doc_hash
+
+    @property
+    def num_documents(self) -> int:
+        return len(self.documents) + len(self.pending_documents)
+
+    def _frequencies(self, lang: str, hashes: np.ndarray) -> np.ndarray:
+        keys: np.ndarray = self.keys[lang]
+        found: np.ndarray = np.zeros(len(hashes), dtype=np.int64)
+        if len(keys):
+            positions: np.ndarray = np.minimum(np.searchsorted(keys, hashes), len(keys) - 1)
+            hit: np.ndarray = keys[positions] == hashes
+            found[hit] = self.counts[lang][positions[hit]]
+        pending: dict[int, int] = self.pending[lang]
+        return found + np.fromiter((pending.get(int(value), 0) for value in hashes), dtype=np.int64, count=len(hashes))
+
+    def observe(self, lang: str, hashes: np.ndarray) -> None:
+        """Count each distinct paragraph hash of a document once."""
+        pending: dict[int, int] = self.pending[lang]
+        for value in set(hashes.tolist()):
+            pending[value] = pending.get(value, 0) + 1
+
+    def apply(self, doc_id: str, en_paragraphs: list[str], ja_paragraphs: list[str]) -> tuple[list[str], list[str]]:
+        """Count a document's paragraphs (first time only) and return both sides with boilerplate removed."""
+        doc_hash: int = paragraph_hash(doc_id)
+        hashes: dict[str, np.ndarray] = {
+            lang: np.fromiter((paragraph_hash(normalise(text)) for text in paragraphs), dtype=np.uint64, count=len(paragraphs))
+            for lang, paragraphs in (('en', en_paragraphs), ('ja', ja_paragraphs))
+        }
+        if doc_hash not in self.pending_documents and not self._counted(doc_hash):
+            self.pending_documents[doc_hash] = {lang: np.unique(hashes[lang]) for lang in LANGUAGES}
+            for lang in LANGUAGES:
+                self.observe(lang, self.pending_documents[doc_hash][lang])
+
+        threshold: float = max(self.min_count, self.min_fraction * self.num_documents)
+        result: list[list[str]] = []
+        for lang, paragraphs in (('en', en_paragraphs), ('ja', ja_paragraphs)):
+            keep: np.ndarray = self._frequencies(lang, hashes[lang]) < threshold
+            self.stripped += int(len(paragraphs) - keep.sum())
+            result.append([text for text, kept in zip(paragraphs, keep) if kept])
+        return result[0], result[1]
+
+
+class BoilerplateStripper:
+    """What the extractors hold: an index bound to a file, or a no-op when ``--boilerplate`` is not given."""
+
+    def __init__(self, path: Optional[Path], index: Optional[BoilerplateIndex]) -> None:
+        self.path: Optional[Path] = path
+        self.index: Optional[BoilerplateIndex] = index
+
+    def apply(self, doc_id: str, en_paragraphs: list[str], ja_paragraphs: list[str]) -> tuple[list[str], list[str]]:
+        if self.index is None:
+            return en_paragraphs, ja_paragraphs
+        return self.index.apply(doc_id, en_paragraphs, ja_paragraphs)
+
+    def save(self, log: Callable[[str], None]) -> None:
+        if self.index is None or self.path is None:
+            return
+        if counted := self.index.save(self.path):
+            log(f'Boilerplate: {counted} {self.index.site} documents were counted concurrently in {self.path}; their counts of this run were not merged')
+        log(f'Boilerplate: stripped {self.index.stripped} paragraphs; index has {self.index.num_documents} {self.index.site} documents')
+
+
+def boilerplate_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--boilerplate``/``--boilerplate_min_count``/``--boilerplate_min_fraction`` options to a click command."""
+    func = click.option('--boilerplate_min_fraction', default=0.02, type=float, help="Also require this fraction of the site's documents")(func)
+    func = click.option('--boilerplate_min_count', default=10, type=int, help="Documents a paragraph must appear in to be boilerplate")(func)
+    func = click.option('--boilerplate', default=None, type=click.Path(dir_okay=False, path_type=Path), help="Paragraph frequency index (.npz) to update and strip boilerplate with")(func)
+    return func
+
+
+def make_stripper(site: str, boilerplate: Optional[Path], boilerplate_min_count: int, boilerplate_min_fraction: float) -> BoilerplateStripper:
+    """Build a :class:`BoilerplateStripper` from the values of :func:`boilerplate_options`."""
+    if boilerplate is None:
+        return BoilerplateStripper(None, None)
+    index: BoilerplateIndex = BoilerplateIndex(site, boilerplate_min_count, boilerplate_min_fraction)
+    index.load(boilerplate)
+    return BoilerplateStripper(boilerplate, index)
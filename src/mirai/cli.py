@@ -0,0 +1,77 @@
+"""The ``mirai`` command line.
+
+Subcommands are registered as ``module:attribute`` strings and imported only
+when invoked, so ``mirai --help`` or ``mirai stats`` do not pay for importing
+bs4, requests, numpy or pyarrow.
+"""
+import importlib
+from typing import Optional
+
+import click
+
+from mirai.sources import EXTRACT_COMMANDS, FETCH_COMMANDS
+
+
+class LazyGroup(click.Group):
+    """A click group whose subcommands are imported on first use.
+
+    ``lazy_commands`` maps a command name to ``("module:attribute", short help)``;
+    the short help is shown in ``--help`` without importing the module.
+    """
+
+    def __init__(self, *args, lazy_commands: Optional[dict[str, tuple[str, str]]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_commands: dict[str, tuple[str, str]] = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx: click.Context, name: str) -> Optional[click.Command]:
+        if name in self.lazy_commands and name not in self.commands:
+            module, _, attribute = self.lazy_commands[name][0].partition(':')
+            command: click.Command = getattr(importlib.import_module(module), attribute)
+            self.add_command(command, name)
+        return super().get_command(ctx, name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        rows: list[tuple[str, str]] = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_commands and name not in self.commands:
+                rows.append((name, self.lazy_commands[name][1]))
+            else:
+                rows.append((name, self.commands[name].get_short_help_str()))
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands={
+    'watch': ('mirai.commands.watch:main', "Poll the sources and append new documents to a live dataset."),
+    'export': ('mirai.commands.export:main', "Export records as partitioned Parquet/Arrow tables."),
+    'translate': ('mirai.commands.translate:main', "Translate records through a batched, cached endpoint."),
+    'mock-server': ('mirai.commands.mock_translation_server:main', "Serve a mock translation endpoint."),
+    'score': ('mirai.commands.score:main', "Score system outputs with chrF and BLEU."),
+    'stats': ('mirai.commands.stats:main', "Update and render the corpus statistics."),
+    'dev': ('mirai.commands.dev:main', "Re-run an extractor on every change and diff the results."),
+    'sample': ('mirai.commands.sample:main', "Draw a reproducible stratified subset of the records."),
+    'diff': ('mirai.commands.diff:main', "Diff two dataset releases into a changelog and a patch."),
+    'store': ('mirai.commands.store:main', "Upsert, compact and export the consolidated document store."),
+    'mirror': ('mirai.commands.mirror:main', "Replay recorded sites locally and benchmark the downloaders."),
+    'sentences': ('mirai.commands.sentences:main', "Segment and align the paragraph pairs into sentence pairs."),
+    'pack': ('mirai.commands.pack:main', "Pack records into a memory-mappable file for process pools."),
+    'tokens': ('mirai.commands.tokens:main', "Count tokens per paragraph and plan model batches."),
+})
+def main() -> None:
+    """Download, extract and evaluate the Mirai full-document dataset."""
+
+
+main.add_command(LazyGroup('fetch', help="Download a source's index and document pages.", lazy_commands={
+    source: (target, f'Download the {source} pages.') for source, target in FETCH_COMMANDS.items()
+}))
+main.add_command(LazyGroup('extract', help="Extract aligned EN/JA documents of a source.", lazy_commands={
+    source: (target, f'Extract the {source} documents.') for source, target in EXTRACT_COMMANDS.items()
+}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Dataset-level tools: watch mode, export, translation, scoring and statistics."""
@@ -0,0 +1,245 @@
+"""Hot-reload development loop for the extractors.
+
+``mirai dev SOURCE ARGS...`` runs ``mirai extract SOURCE ARGS...`` in a worker
+process, then watches the extractor module and re-runs it whenever the file
+changes, printing how the result differs from the previous run: accepted and
+rejected counts, the documents that flipped (with the log lines of their
+rejection) and the paragraphs that changed.
+
+The worker keeps every page it has parsed.  The extractor's ``BeautifulSoup``
+is replaced by a cache keyed on the page text; since the fsa and kantei
+extractors decompose nodes, every call gets its own copy of the cached tree,
+and the copies for the next run are made while the loop is idle.  Only the
+extractor module is reloaded; changes to other modules need a restart.
+"""
+import copy
+import difflib
+import hashlib
+import importlib
+import importlib.util
+import io
+import multiprocessing
+import time
+import traceback
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import click
+from bs4 import BeautifulSoup
+
+from mirai.document import Document, read_documents
+from mirai.profile import DocumentProfile, ExtractionProfiler
+from mirai.sources import EXTRACT_COMMANDS, SOURCES
+
+
+class SoupCache:
+    """Drop-in for ``BeautifulSoup(markup, features)`` that parses each page once."""
+
+    def __init__(self) -> None:
+        self.markup: dict[tuple[bytes, Optional[str]], tuple[str | bytes, dict[str, Any]]] = {}
+        self.pristine: dict[tuple[bytes, Optional[str]], BeautifulSoup] = {}
+        self.spare: dict[tuple[bytes, Optional[str]], BeautifulSoup] = {}
+        self.parsed: int = 0
+        self.copied: int = 0
+
+    def __call__(self, markup: str | bytes, features: Optional[str] = None, **kwargs: Any) -> BeautifulSoup:
+        data: bytes = markup.encode('utf-8') if isinstance(markup, str) else markup
+        key: tuple[bytes, Optional[str]] = (hashlib.blake2b(data, digest_size=16).digest(), features)
+        spare: Optional[BeautifulSoup] = self.spare.pop(key, None)
+        if spare is not None:
+            return spare
+        pristine: Optional[BeautifulSoup] = self.pristine.get(key)
+        if pristine is not None:
+            self.copied += 1
+            return copy.copy(pristine)
+        # 初回はそのまま返し、保存用の木はアイドル時に作る
+        self.markup[key] = (markup, kwargs)
+        self.parsed += 1
+        return BeautifulSoup(markup, features, **kwargs)
+
+    def refill(self, interrupted: Callable[[], bool]) -> None:
+        """Prepare one untouched copy of every page for the next run, stopping early if work arrives."""
+        for key, (markup, kwargs) in self.markup.items():
+            if key in self.spare:
+                continue
+            if interrupted():
+                return
+            if key not in self.pristine:
+                self.pristine[key] = BeautifulSoup(markup, key[1], **kwargs)
+            self.spare[key] = copy.copy(self.pristine[key])
+
+
+class RecordingProfiler(ExtractionProfiler):
+    """Records every document the extractor looks at, with what it logged while doing so."""
+
+    def __init__(self) -> None:
+        super().__init__(None)
+        self.logs: dict[str, str] = {}
+
+    @contextmanager
+    def document(self, doc_id: str, *paths: Path) -> Iterator[DocumentProfile]:
+        buffer: io.StringIO = io.StringIO()
+        try:
+            with redirect_stdout(buffer), redirect_stderr(buffer), super().document(doc_id, *paths) as doc:
+                yield doc
+        finally:
+            self.logs[str(doc_id)] = buffer.getvalue()
+
+
+@dataclass
+class RunResult:
+    accepted: dict[str, Document] = field(default_factory=dict)
+    rejected: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def last_line(log: str) -> str:
+    lines: list[str] = [line.strip() for line in log.replace('\r', '\n').splitlines() if line.strip()]
+    return lines[-1] if lines else 'dropped after extraction (filters or schema)'
+
+
+def run_extractor(module_name: str, args: list[str], cache: SoupCache) -> RunResult | str:
+    """Reload the extractor module and run it; returns the result or a traceback."""
+    start: float = time.perf_counter()
+    output: io.StringIO = io.StringIO()
+    recorder: RecordingProfiler = RecordingProfiler()
+    try:
+        module: Any = importlib.reload(importlib.import_module(module_name))
+        module.BeautifulSoup = cache
+        module.make_profiler = lambda *_args, **_kwargs: recorder
+        with module.main.make_context(module_name, list(args)) as context:
+            output_json: Path = Path(context.params['output_json'])
+        with redirect_stdout(output), redirect_stderr(output):
+            module.main.main(args=list(args), standalone_mode=False)
+        accepted: dict[str, Document] = {doc.id: doc for doc in read_documents([output_json])}
+    except (Exception, SystemExit):
+        tail: str = '\n'.join(output.getvalue().splitlines()[-5:])
+        return (tail + '\n' if tail else '') + traceback.format_exc()
+    rejected: dict[str, str] = {doc_id: last_line(log) for doc_id, log in recorder.logs.items() if doc_id not in accepted}
+    return RunResult(accepted, rejected, time.perf_counter() - start)
+
+
+def paragraph_diff(doc_id: str, old: Document, new: Document) -> list[str]:
+    lines: list[str] = []
+    for lang in ('en', 'ja'):
+        before: list[str] = old[f'{lang}_body']
+        after: list[str] = new[f'{lang}_body']
+        if before != after:
+            lines.extend(f'    {line}' for line in difflib.unified_diff(before, after, f'{doc_id} {lang}', f'{doc_id} {lang}', n=0, lineterm=''))
+    if old.ja_date != new.ja_date:
+        lines.append(f'    ja_date: {old.ja_date} -> {new.ja_date}')
+    return lines
+
+
+def describe(previous: Optional[RunResult], current: RunResult, show: int) -> list[str]:
+    """Summary lines of a run, compared with the previous one."""
+    def delta(now: int, before: int) -> str:
+        return f' ({now - before:+d})' if previous is not None else ''
+
+    lines: list[str] = [
+        f'{len(current.accepted)} accepted{delta(len(current.accepted), len(previous.accepted) if previous else 0)}, '
+        f'{len(current.rejected)} rejected{delta(len(current.rejected), len(previous.rejected) if previous else 0)} '
+        f'in {current.seconds:.1f}s'
+    ]
+    if previous is None:
+        return lines
+
+    gained: list[str] = sorted(current.accepted.keys() - previous.accepted.keys())
+    lost: list[str] = sorted(previous.accepted.keys() - current.accepted.keys())
+    changed: list[str] = sorted(doc_id for doc_id in current.accepted.keys() & previous.accepted.keys()
+                                if current.accepted[doc_id] != previous.accepted[doc_id])
+    for title, ids in (('newly accepted', gained), ('newly rejected', lost), ('changed', changed)):
+        if not ids:
+            continue
+        lines.append(f'{title}: {len(ids)}')
+        for doc_id in ids[:show]:
+            if title == 'newly accepted':
+                lines.append(f'  + {doc_id} (was: {previous.rejected.get(doc_id, "not processed")})')
+            elif title == 'newly rejected':
+                lines.append(f'  - {doc_id}: {current.rejected.get(doc_id, "not processed")}')
+            else:
+                lines.append(f'  ~ {doc_id}')
+                lines.extend(paragraph_diff(doc_id, previous.accepted[doc_id], current.accepted[doc_id]))
+        if len(ids) > show:
+            lines.append(f'  ... {len(ids) - show} more')
+    if not (gained or lost or changed):
+        lines.append('no changes')
+    return lines
+
+
+def worker(module_name: str, args: list[str], show: int, connection: Connection) -> None:
+    """Serve run requests until ``None`` is received; keeps the soup cache and the previous result."""
+    cache: SoupCache = SoupCache()
+    previous: Optional[RunResult] = None
+    try:
+        while connection.recv() is not None:
+            result: RunResult | str = run_extractor(module_name, args, cache)
+            if isinstance(result, str):
+                connection.send(['extractor failed; keeping the previous result', result])
+                continue
+            lines: list[str] = describe(previous, result, show)
+            lines.append(f'page cache: {len(cache.markup)} pages, {cache.copied} copied during the run')
+            cache.copied = 0
+            connection.send(lines)
+            previous = result
+            cache.refill(connection.poll)
+    except (EOFError, KeyboardInterrupt):
+        pass
+
+
+@click.command(context_settings={'ignore_unknown_options': True, 'allow_interspersed_args': False})
+@click.option('--interval', default=1.0, type=float, help="Seconds between checks of the watched files")
+@click.option('--show', default=10, type=int, help="Documents listed per kind of change")
+@click.option('--watch', 'extra_paths', multiple=True, type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="Also re-run when this file changes (the extractor module is always watched)")
+@click.argument('source', type=click.Choice(SOURCES))
+@click.argument('extractor_args', nargs=-1, type=click.UNPROCESSED)
+def main(interval: float, show: int, extra_paths: tuple[Path, ...], source: str, extractor_args: tuple[str, ...]) -> None:
+    """Re-run SOURCE's extractor with EXTRACTOR_ARGS whenever its module changes, and diff the results.
+
+    EXTRACTOR_ARGS are exactly those of ``mirai extract SOURCE``; its output file
+    is overwritten on every run.  Options of this command go before SOURCE.
+    """
+    module_name: str = EXTRACT_COMMANDS[source].partition(':')[0]
+    watched: list[Path] = [Path(importlib.util.find_spec(module_name).origin), *extra_paths]
+
+    def stamps() -> list[int]:
+        return [path.stat().st_mtime_ns if path.exists() else 0 for path in watched]
+
+    def start() -> tuple[multiprocessing.Process, Connection]:
+        parent, child = multiprocessing.Pipe()
+        process: multiprocessing.Process = multiprocessing.Process(target=worker, args=(module_name, list(extractor_args), show, child), daemon=True)
+        process.start()
+        return process, parent
+
+    process, connection = start()
+    click.echo(f'[dev] watching {", ".join(str(path) for path in watched)}', err=True)
+    seen: list[int] = stamps()
+    try:
+        while True:
+            click.echo(f'[dev] {time.strftime("%H:%M:%S")} extracting {source}', err=True)
+            connection.send('run')
+            try:
+                for line in connection.recv():
+                    click.echo(line)
+            except EOFError:
+                click.echo('[dev] worker died; restarting with an empty page cache', err=True)
+                process, connection = start()
+            while stamps() == seen:
+                time.sleep(interval)
+            seen = stamps()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        process.join(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
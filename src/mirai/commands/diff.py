@@ -0,0 +1,187 @@
+"""Diff two dataset releases without loading either into memory.
+
+    mirai diff ../fsa/json/201001-202412.json ../fsa/json/201001-202506.json --changelog CHANGES.txt --patch release.patch.jsonl
+
+A release is a dataset file or a directory of them (any format
+``read_documents`` reads).  Each record is reduced to its ``id``, a hash of
+its canonical JSON form and a hash per field; these entries are sorted in
+runs of ``--run_size`` and spilled to a temporary directory, and the sorted
+runs of both releases are merged and joined by ``id`` in one pass.  Only the
+canonical records of the new release are kept (in a spill file), so the patch
+can carry the added and changed documents.  When an ``id`` occurs more than
+once in a release, its last occurrence counts.
+
+The changelog has one line per difference (``+ id``, ``- id``,
+``~ id fields``) after a summary line; the patch is JSON lines of
+``{"op": "add"|"replace", "record": ...}`` and ``{"op": "remove", "id": ...}``.
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import IO, BinaryIO, Iterable, Iterator, Optional
+import click
+from tqdm import tqdm
+
+from mirai.document import read_documents
+
+DATASET_SUFFIXES: tuple[str, ...] = ('.json', '.jsonl', '.parquet', '.arrow')
+
+# (id, seq, record digest, field digests "name:hex,...", offset, length)
+Entry = tuple[str, int, str, str, int, int]
+
+
+def release_files(path: Path) -> list[Path]:
+    if path.is_dir():
+        return sorted(child for child in path.iterdir() if child.suffix in DATASET_SUFFIXES)
+    return [path]
+
+
+def digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def canonical(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+class RunSpiller:
+    """Collects entries of one release into sorted runs on disk, optionally keeping the records."""
+
+    def __init__(self, directory: Path, name: str, run_size: int, keep_records: bool) -> None:
+        self.directory: Path = directory
+        self.name: str = name
+        self.run_size: int = run_size
+        self.buffer: list[Entry] = []
+        self.runs: list[Path] = []
+        self.records: Optional[BinaryIO] = (directory / f'{name}.records').open('w+b') if keep_records else None
+        self.count: int = 0
+
+    def add(self, record: dict) -> None:
+        text: str = canonical(record)
+        fields: str = ','.join(f'{name}:{digest(canonical(value))}' for name, value in sorted(record.items()))
+        offset: int = 0
+        length: int = 0
+        if self.records is not None:
+            data: bytes = text.encode('utf-8')
+            offset = self.records.tell()
+            length = len(data)
+            self.records.write(data)
+        self.buffer.append((str(record['id']), self.count, digest(text), fields, offset, length))
+        self.count += 1
+        if len(self.buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.buffer.sort()
+        path: Path = self.directory / f'{self.name}.{len(self.runs):05d}.run'
+        with path.open('w', encoding='utf-8') as f:
+            f.writelines('\t'.join(map(str, entry)) + '\n' for entry in self.buffer)
+        self.runs.append(path)
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(path: Path) -> Iterator[Entry]:
+        with path.open(encoding='utf-8') as f:
+            for line in f:
+                doc_id, seq, record_digest, fields, offset, length = line.rstrip('\n').split('\t')
+                yield doc_id, int(seq), record_digest, fields, int(offset), int(length)
+
+    def entries(self) -> Iterator[Entry]:
+        """All entries sorted by id, keeping the last occurrence of each id."""
+        if self.buffer:
+            self._spill()
+        merged: Iterator[Entry] = heapq.merge(*(self._read_run(path) for path in self.runs))
+        for _, group in itertools.groupby(merged, key=lambda entry: entry[0]):
+            *_, last = group
+            yield last
+
+    def record(self, entry: Entry) -> str:
+        self.records.seek(entry[4])
+        return self.records.read(entry[5]).decode('utf-8')
+
+
+def spill_release(paths: Iterable[Path], spiller: RunSpiller, desc: str) -> RunSpiller:
+    for document in tqdm(read_documents(paths), desc=desc, unit='doc'):
+        spiller.add(document.to_dict())
+    return spiller
+
+
+def changed_fields(old: Entry, new: Entry) -> list[str]:
+    before: dict[str, str] = dict(field.split(':') for field in old[3].split(',') if field)
+    after: dict[str, str] = dict(field.split(':') for field in new[3].split(',') if field)
+    return sorted(name for name in before.keys() | after.keys() if before.get(name) != after.get(name))
+
+
+def diff_entries(old: Iterator[Entry], new: Iterator[Entry]) -> Iterator[tuple[str, Optional[Entry], Optional[Entry]]]:
+    """Merge-join two id-sorted entry streams into ('+'|'-'|'~', old, new) differences."""
+    old_entry: Optional[Entry] = next(old, None)
+    new_entry: Optional[Entry] = next(new, None)
+    while old_entry is not None or new_entry is not None:
+        if new_entry is None or (old_entry is not None and old_entry[0] < new_entry[0]):
+            yield '-', old_entry, None
+            old_entry = next(old, None)
+        elif old_entry is None or new_entry[0] < old_entry[0]:
+            yield '+', None, new_entry
+            new_entry = next(new, None)
+        else:
+            if old_entry[2] != new_entry[2]:
+                yield '~', old_entry, new_entry
+            old_entry, new_entry = next(old, None), next(new, None)
+
+
+@click.command()
+@click.argument('old_release', type=click.Path(exists=True, path_type=Path))
+@click.argument('new_release', type=click.Path(exists=True, path_type=Path))
+@click.option('--changelog', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write the changelog here (default: standard output)")
+@click.option('--patch', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write a JSONL patch turning the old release into the new one")
+@click.option('--run_size', default=200_000, type=int, help="Entries per sorted run spilled to disk")
+@click.option('--tmp_dir', default=None, type=click.Path(file_okay=False, path_type=Path), help="Directory for the spilled runs (default: system temp)")
+def main(old_release: Path, new_release: Path, changelog: Optional[Path], patch: Optional[Path], run_size: int, tmp_dir: Optional[Path]) -> None:
+    """List the documents added, removed or changed between OLD_RELEASE and NEW_RELEASE."""
+    with tempfile.TemporaryDirectory(dir=tmp_dir, prefix='mirai-diff-') as directory:
+        old: RunSpiller = spill_release(release_files(old_release), RunSpiller(Path(directory), 'old', run_size, keep_records=False), 'Old release')
+        new: RunSpiller = spill_release(release_files(new_release), RunSpiller(Path(directory), 'new', run_size, keep_records=patch is not None), 'New release')
+
+        counts: dict[str, int] = {'+': 0, '-': 0, '~': 0}
+        body_path: Path = Path(directory) / 'changelog.body'
+        patch_file: Optional[IO[str]] = patch.open('w', encoding='utf-8') if patch is not None else None
+        try:
+            with body_path.open('w', encoding='utf-8') as body:
+                for kind, old_entry, new_entry in diff_entries(old.entries(), new.entries()):
+                    counts[kind] += 1
+                    if kind == '-':
+                        body.write(f'- {old_entry[0]}\n')
+                        if patch_file is not None:
+                            patch_file.write(json.dumps({'op': 'remove', 'id': old_entry[0]}, ensure_ascii=False, separators=(',', ':')) + '\n')
+                        continue
+                    fields: list[str] = changed_fields(old_entry, new_entry) if kind == '~' else []
+                    body.write(f'+ {new_entry[0]}\n' if kind == '+' else f'~ {new_entry[0]} {",".join(fields)}\n')
+                    if patch_file is not None:
+                        # 正規化済みの JSON をそのまま埋め込む
+                        operation: str = '{"op":"add","record":' if kind == '+' else f'{{"op":"replace","fields":{json.dumps(fields)},"record":'
+                        patch_file.write(operation + new.record(new_entry) + '}\n')
+        finally:
+            if patch_file is not None:
+                patch_file.close()
+            if new.records is not None:
+                new.records.close()
+
+        summary: str = f'{old.count} -> {new.count} records read: {counts["+"]} added, {counts["-"]} removed, {counts["~"]} changed'
+        output: IO[str] = changelog.open('w', encoding='utf-8') if changelog is not None else sys.stdout
+        try:
+            output.write(f'# {old_release} -> {new_release}: {summary}\n')
+            with body_path.open(encoding='utf-8') as body:
+                for line in body:
+                    output.write(line)
+        finally:
+            if changelog is not None:
+                output.close()
+    tqdm.write(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Replay recorded sites locally and benchmark the downloaders against them.
+
+    cd src/fsa && python -m mirai fetch fsa 202410 tsv/out.tsv --record ../mirror
+    mirai mirror serve ../mirror --port 8700 --latency 0.2 --encoding shift_jis
+    mirai mirror bench ../mirror --oldest 202410 --newest 202412 --concurrency 1,4 --latency 0.05
+
+``bench`` starts a replay server on a free port and runs each source's
+download stage (``mirai fetch SOURCE``) against it with all of its outputs in
+a fresh temporary directory, once per concurrency level, so nothing is cached
+between runs.  It reports wall time, requests, bytes and the misses (URLs that are not
+in the archive) per run; the same archive, options and seed give the same
+request stream.
+"""
+import io
+import importlib
+import json
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Optional
+import click
+
+from mirai.mirror import ENCODINGS, MirrorArchive, ReplayConfig, ReplayStats, make_server
+from mirai.sources import FETCH_COMMANDS, SOURCES
+
+
+def replay_options(func: Any) -> Any:
+    """Options shared by ``serve`` and ``bench`` that shape the replayed responses."""
+    func = click.option('--seed', default=0, type=int, help="Seed of the injected latency jitter and errors")(func)
+    func = click.option('--encoding', default='keep', type=click.Choice(ENCODINGS), help="Serve HTML as recorded, as UTF-8, as Shift_JIS, or either per URL")(func)
+    func = click.option('--error_status', default=503, type=int, help="Status of the injected errors (429/503 carry Retry-After)")(func)
+    func = click.option('--error_rate', default=0.0, type=float, help="Fraction of requests answered with --error_status")(func)
+    func = click.option('--bandwidth', default=0.0, type=float, help="Bytes per second per response (0: unlimited)")(func)
+    func = click.option('--jitter', default=0.0, type=float, help="Random extra latency in seconds")(func)
+    func = click.option('--latency', default=0.0, type=float, help="Seconds to wait before answering")(func)
+    return func
+
+
+def fetch_args(source: str, directory: Path, oldest: str, newest: str, concurrency: int, delay: float, mirror: str) -> list[str]:
+    """Arguments of ``mirai fetch SOURCE`` for a benchmark run that writes everything under an empty ``directory``."""
+    throttle: list[str] = ['--min_concurrency', str(concurrency), '--max_concurrency', str(concurrency), '--mirror', mirror]
+    out: str = str(directory / 'out.tsv')
+    html: str = str(directory / 'html')
+    if source == 'fsa':
+        return [oldest, out, '--html_directory', html, '--index_file', str(directory / 'index.html'), '--delay', str(delay), *throttle]
+    if source == 'meti':
+        return [oldest, newest, out, '--html_directory', html, '--index_directory', str(directory / 'indices'), '--delay', str(delay), *throttle]
+    if source == 'mof':
+        return [oldest, newest, out, html, '--delay', str(delay), *throttle]
+    return [str(directory / 'indices'), str(directory / 'en'), '--archives', f'103:{oldest}-{newest}',
+            '--index_delay', str(delay), '--delay', str(delay), *throttle]
+
+
+def run_stage(source: str, args: list[str], stats: ReplayStats) -> dict[str, Any]:
+    module, _, attribute = FETCH_COMMANDS[source].partition(':')
+    command: click.Command = getattr(importlib.import_module(module), attribute)
+    before: tuple[int, int, int, int] = (stats.requests, stats.bytes, stats.misses, stats.errors)
+    output: io.StringIO = io.StringIO()
+    error: Optional[str] = None
+    start: float = time.perf_counter()
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            command.main(args=args, standalone_mode=False)
+    # click の Abort や sys.exit も失敗として記録し、ベンチマークは続ける
+    except (Exception, SystemExit) as e:
+        error = f'{type(e).__name__}: {e}'
+    seconds: float = time.perf_counter() - start
+    requests, size, misses, errors = (now - then for now, then in zip((stats.requests, stats.bytes, stats.misses, stats.errors), before))
+    return {
+        'seconds': round(seconds, 3),
+        'requests': requests,
+        'bytes': size,
+        'misses': misses,
+        'errors': errors,
+        'requests_per_second': round(requests / seconds, 2) if seconds else 0.0,
+        'error': error,
+    }
+
+
+@click.group()
+def main() -> None:
+    """Serve a recorded mirror archive and benchmark the downloaders against it."""
+
+
+@main.command('serve')
+@click.argument('archive', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=8700, type=int)
+@replay_options
+def serve_command(archive: Path, host: str, port: int, latency: float, jitter: float, bandwidth: float,
+                  error_rate: float, error_status: int, encoding: str, seed: int) -> None:
+    """Replay ARCHIVE at http://HOST:PORT/ (pass that URL to --mirror)."""
+    mirror: MirrorArchive = MirrorArchive(archive)
+    server, _ = make_server(mirror, ReplayConfig(latency, jitter, bandwidth, error_rate, error_status, encoding, seed), host, port)
+    click.echo(f'Replaying {len(mirror)} responses on http://{host}:{port}/', err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+@main.command('bench')
+@click.argument('archive', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--source', 'sources', multiple=True, type=click.Choice(SOURCES), help="Sources to benchmark (default: all)")
+@click.option('--oldest', required=True, help="Oldest month (YYYYMM) passed to the download stages")
+@click.option('--newest', required=True, help="Newest month (YYYYMM) passed to the download stages")
+@click.option('--concurrency', default='1,4', help="Comma-separated per-host concurrency levels to run")
+@click.option('--delay', default=0.0, type=float, help="Request spacing passed to the download stages")
+@click.option('--output', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Also write the results as JSON")
+@replay_options
+def bench_command(archive: Path, sources: tuple[str, ...], oldest: str, newest: str, concurrency: str, delay: float, output: Optional[Path],
+                  latency: float, jitter: float, bandwidth: float, error_rate: float, error_status: int, encoding: str, seed: int) -> None:
+    """Time each source's download stage against a local replay of ARCHIVE."""
+    levels: list[int] = [int(level) for level in concurrency.split(',') if level.strip()]
+    results: list[dict[str, Any]] = []
+    for source in sources or SOURCES:
+        for level in levels:
+            # 実行ごとにサーバを作り直し、乱数列を揃える
+            server, stats = make_server(MirrorArchive(archive), ReplayConfig(latency, jitter, bandwidth, error_rate, error_status, encoding, seed))
+            thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            mirror: str = f'http://127.0.0.1:{server.server_address[1]}'
+            try:
+                with tempfile.TemporaryDirectory(prefix=f'mirai-bench-{source}-') as directory:
+                    result: dict[str, Any] = {'source': source, 'concurrency': level,
+                                              **run_stage(source, fetch_args(source, Path(directory), oldest, newest, level, delay, mirror), stats)}
+            finally:
+                server.shutdown()
+                server.server_close()
+            results.append(result)
+            click.echo(f'{source:8s} c={level:<3d} {result["seconds"]:8.2f}s {result["requests"]:6d} req '
+                       f'{result["requests_per_second"]:8.1f} req/s {result["bytes"] / 1e6:8.2f} MB '
+                       f'{result["misses"]:4d} missing {result["errors"]:4d} injected'
+                       + (f'  FAILED: {result["error"]}' if result['error'] else ''))
+    if output is not None:
+        output.write_text(json.dumps({
+            'archive': str(archive),
+            'replay': {'latency': latency, 'jitter': jitter, 'bandwidth': bandwidth, 'error_rate': error_rate,
+                       'error_status': error_status, 'encoding': encoding, 'seed': seed},
+            'results': results,
+        }, ensure_ascii=False, indent='\t'), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
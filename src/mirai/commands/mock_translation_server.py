@@ -0,0 +1,52 @@
+"""Local stand-in for a translation endpoint, for testing translate.py offline.
+
+Answers ``POST {"texts": [...], "target_lang": ...}`` with
+``{"translations": ["[<target_lang>] <text>", ...]}``.  Latency and a rate of
+503 responses (with ``Retry-After``) can be injected.
+"""
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import click
+
+
+def make_handler(latency: float, error_rate: float) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body: dict = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            time.sleep(latency)
+            if random.random() < error_rate:
+                self.send_response(503)
+                self.send_header('Retry-After', '1')
+                self.end_headers()
+                return
+            payload: bytes = json.dumps({
+                'translations': [f"[{body.get('target_lang', '')}] {text}" for text in body['texts']],
+            }, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=8000, type=int)
+@click.option('--latency', default=0.0, type=float, help="Seconds to wait before answering")
+@click.option('--error_rate', default=0.0, type=float, help="Fraction of requests answered with 503")
+def main(host: str, port: int, latency: float, error_rate: float) -> None:
+    """Serve a mock translation endpoint at http://HOST:PORT/."""
+    server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), make_handler(latency, error_rate))
+    click.echo(f'Serving mock translations on http://{host}:{port}/', err=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Pack extractor outputs into a memory-mappable ``.pack`` file.
+
+    mirai pack corpus.pack fsa/*.json meti/*.json
+    mirai sentences sentences.jsonl corpus.pack
+
+Commands that fan documents out to a process pool map a ``.pack`` file given
+as their only input instead of packing the records into shared memory on
+every run; see :mod:`mirai.packed` for the layout.
+"""
+import time
+from pathlib import Path
+import click
+
+from mirai.packed import pack_file
+from mirai.records import iter_records
+
+
+@click.command()
+@click.argument('output_pack', type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def main(output_pack: Path, input_files: tuple[Path, ...]) -> None:
+    """Pack the records of INPUT_FILES into OUTPUT_PACK."""
+    start: float = time.perf_counter()
+    count: int = pack_file(iter_records(input_files), output_pack)
+    click.echo(f'Packed {count} documents ({output_pack.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s', err=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Draw a reproducible stratified subset of the dataset in one pass.
+
+    mirai sample subset.json ../*/json/*.json --per_stratum 5 --seed 2024
+
+Documents are stratified by source, ``ja_date`` month and paragraph-count
+bucket.  Each stratum keeps a bounded reservoir of the documents with the
+smallest ``hash(seed, id)`` priorities, so the selection depends only on the
+seed and the set of documents, not on file order or on how many times the
+files were read, and memory is bounded by the reservoirs.  The subset is
+written with ``write_documents`` (format by suffix) and the manifest records
+the seed, the strata with their sizes and the selected ids.
+"""
+import hashlib
+import heapq
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+import click
+from tqdm import tqdm
+
+from mirai.document import Document, read_documents, write_documents
+from mirai.records import record_source, record_year_month
+
+DEFAULT_BUCKETS: str = '1,2,4,8,16'
+
+
+def parse_buckets(spec: str) -> list[int]:
+    edges: list[int] = sorted({int(edge) for edge in spec.split(',') if edge.strip()})
+    if not edges or edges[0] < 1:
+        raise click.BadParameter('bucket edges must be positive integers', param_hint='--buckets')
+    return edges
+
+
+def bucket_label(num_paragraphs: int, edges: list[int]) -> str:
+    """Label of the paragraph-count bucket, e.g. ``4-7`` for edges 1,2,4,8 (``0`` below the first edge)."""
+    if num_paragraphs < edges[0]:
+        return '0'
+    for lower, upper in zip(edges, edges[1:]):
+        if num_paragraphs < upper:
+            return str(lower) if upper - lower == 1 else f'{lower}-{upper - 1}'
+    return f'{edges[-1]}+'
+
+
+def priority(seed: int, doc_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f'{seed}\t{doc_id}'.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+@dataclass
+class Reservoir:
+    size: int
+    seen: int = 0
+    # 優先度の大きい順に取り出せるよう符号を反転した最大ヒープ
+    heap: list[tuple[int, str]] = field(default_factory=list)
+    documents: dict[str, Document] = field(default_factory=dict)
+
+    def offer(self, key: int, document: Document) -> None:
+        self.seen += 1
+        if document.id in self.documents:
+            self.documents[document.id] = document
+            return
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, (-key, document.id))
+        elif -self.heap[0][0] > key:
+            dropped: str = heapq.heapreplace(self.heap, (-key, document.id))[1]
+            del self.documents[dropped]
+        else:
+            return
+        self.documents[document.id] = document
+
+    def selected(self) -> list[Document]:
+        """The kept documents, lowest priority first."""
+        return [self.documents[doc_id] for _, doc_id in sorted(self.heap, reverse=True)]
+
+
+@click.command()
+@click.argument('output_file', type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--per_stratum', default=10, type=int, help="Documents drawn from each stratum")
+@click.option('--seed', default=0, type=int, help="Sampling seed; the same seed and dataset give the same subset")
+@click.option('--buckets', default=DEFAULT_BUCKETS, help="Lower edges of the paragraph-count buckets")
+@click.option('--manifest', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Manifest path (default: OUTPUT_FILE with .manifest.json)")
+def main(output_file: Path, input_files: tuple[Path, ...], per_stratum: int, seed: int, buckets: str, manifest: Optional[Path]) -> None:
+    """Sample up to PER_STRATUM documents per (source, month, paragraph bucket) from INPUT_FILES into OUTPUT_FILE."""
+    edges: list[int] = parse_buckets(buckets)
+    reservoirs: dict[tuple[str, str, str], Reservoir] = {}
+    for document in tqdm(read_documents(input_files), desc='Scanning', unit='doc'):
+        stratum: tuple[str, str, str] = (record_source(document), record_year_month(document), bucket_label(len(document.en_body), edges))
+        reservoir: Optional[Reservoir] = reservoirs.get(stratum)
+        if reservoir is None:
+            reservoir = reservoirs[stratum] = Reservoir(per_stratum)
+        reservoir.offer(priority(seed, document.id), document)
+
+    strata: list[tuple[str, str, str]] = sorted(reservoirs)
+    subset: list[Document] = [document for stratum in strata for document in reservoirs[stratum].selected()]
+    write_documents(output_file, subset, validate=False)
+
+    manifest = manifest or output_file.with_name(output_file.name.rsplit('.', 1)[0] + '.manifest.json')
+    manifest.write_text(json.dumps({
+        'seed': seed,
+        'per_stratum': per_stratum,
+        'buckets': edges,
+        'inputs': [{'path': str(path), 'bytes': path.stat().st_size, 'mtime_ns': path.stat().st_mtime_ns} for path in input_files],
+        'strata': [{
+            'source': source,
+            'month': month,
+            'bucket': bucket,
+            'documents': reservoirs[(source, month, bucket)].seen,
+            'ids': [document.id for document in reservoirs[(source, month, bucket)].selected()],
+        } for source, month, bucket in strata],
+    }, ensure_ascii=False, indent='\t'), encoding='utf-8')
+    tqdm.write(f'{len(subset)} documents from {len(strata)} strata written to {output_file}; manifest {manifest}')
+
+
+if __name__ == '__main__':
+    main()
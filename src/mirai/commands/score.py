@@ -0,0 +1,345 @@
+"""Document- and corpus-level chrF/BLEU for translate.py hypotheses.
+
+N-grams are hashed to 64-bit integers and counted with NumPy, so a text's
+n-gram table is a pair of sorted arrays (hashes, counts) and clipped matches
+are a ``searchsorted`` away.  Reference tables only depend on the dataset, so
+they are built once per dataset version and kept as ``.npy`` files that pool
+workers memory-map.  Every document is reduced to a vector of sufficient
+statistics; corpus scores, bootstrap confidence intervals and paired
+comparisons between systems are then matrix sums over those vectors.
+
+BLEU on English output uses sacrebleu's default ``13a`` tokenization
+(mteval-v13a: punctuation is split off except ``.``/``,`` between digits), so
+corpus BLEU matches ``sacrebleu`` run on the newline-joined documents.  BLEU
+on Japanese output is computed on characters (runs of ASCII letters and
+digits count as one token) since no morphological analyser is bundled, and is
+not comparable to sacrebleu's ``ja-mecab`` scores.
+"""
+import hashlib
+import itertools
+import json
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+import click
+import numpy as np
+from tqdm import tqdm
+
+from mirai.packed import attach_worker, share_records, worker_corpus
+from mirai.records import Record, iter_records, unique_records
+
+# トークン化やハッシュを変えたら上げる（参照キャッシュの鍵に含まれる）
+CACHE_VERSION: int = 2
+CHAR_ORDER: int = 6
+BLEU_ORDER: int = 4
+BETA: float = 2.0
+MULTIPLIER: np.uint64 = np.uint64(0x9E3779B97F4A7C15)
+TARGET_LANGS: dict[str, str] = {'en-ja': 'ja', 'ja-en': 'en'}
+RE_WHITESPACE: re.Pattern[str] = re.compile(r'\s+')
+# mteval-v13a の置換規則（sacrebleu の tokenizer_re と同じ順）
+RE_13A: tuple[tuple[re.Pattern[str], str], ...] = (
+    (re.compile(r'([\{-\~\[-\` -\&\(-\+\:-\@\/])'), r' \1 '),
+    (re.compile(r'([^0-9])([\.,])'), r'\1 \2 '),
+    (re.compile(r'([\.,])([^0-9])'), r' \1 \2'),
+    (re.compile(r'([0-9])(-)'), r'\1 \2 '),
+)
+RE_JA_TOKEN: re.Pattern[str] = re.compile(r'[A-Za-z0-9]+|\S')
+PUNCTUATION: frozenset[str] = frozenset(string.punctuation)
+
+# ワーカープロセスが参照する参照側テーブル（initializer で memory-map する）
+_reference: dict[str, np.ndarray] = {}
+
+
+def char_symbols(text: str) -> np.ndarray:
+    """Code points of ``text`` with whitespace removed, as chrF does."""
+    return np.frombuffer(RE_WHITESPACE.sub('', text).encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+
+
+def chrf_words(text: str) -> list[str]:
+    """Whitespace tokens with one leading or trailing ASCII punctuation mark split off (chrF++)."""
+    tokens: list[str] = []
+    for word in text.split():
+        if len(word) > 1 and word[-1] in PUNCTUATION:
+            tokens.extend([word[:-1], word[-1]])
+        elif len(word) > 1 and word[0] in PUNCTUATION:
+            tokens.extend([word[0], word[1:]])
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def tokenize_13a(text: str) -> list[str]:
+    """BLEU tokens of English text, as sacrebleu's ``13a`` tokenizer produces them."""
+    text = text.replace('<skipped>', '').replace('-\n', '').replace('\n', ' ')
+    if '&' in text:
+        text = text.replace('&quot;', '"').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+    text = f' {text} '
+    for pattern, replacement in RE_13A:
+        text = pattern.sub(replacement, text)
+    return text.split()
+
+
+BLEU_TOKENIZERS: dict[str, Callable[[str], list[str]]] = {
+    'en': tokenize_13a,
+    'ja': RE_JA_TOKEN.findall,
+}
+
+
+def word_symbols(tokens: list[str]) -> np.ndarray:
+    """Stable 64-bit hashes of tokens (``hash()`` is salted per process)."""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little') for token in tokens],
+        dtype=np.uint64,
+    )
+
+
+def ngram_table(symbols: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return sorted unique n-gram hashes and their counts."""
+    size: int = len(symbols) - n + 1
+    if size <= 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    hashes: np.ndarray = symbols[:size].copy()
+    for k in range(1, n):
+        hashes = hashes * MULTIPLIER + symbols[k:k + size]
+    return np.unique(hashes, return_counts=True)
+
+
+def text_tables(text: str, lang: str, word_order: int) -> tuple[list[tuple[np.ndarray, np.ndarray]], int]:
+    """N-gram tables of one text: chrF characters, chrF++ words, then BLEU tokens. Also returns the BLEU length."""
+    chars: np.ndarray = char_symbols(text)
+    words: np.ndarray = word_symbols(chrf_words(text))
+    bleu_tokens: np.ndarray = word_symbols(BLEU_TOKENIZERS[lang](text))
+    tables: list[tuple[np.ndarray, np.ndarray]] = (
+        [ngram_table(chars, n) for n in range(1, CHAR_ORDER + 1)]
+        + [ngram_table(words, n) for n in range(1, word_order + 1)]
+        + [ngram_table(bleu_tokens, n) for n in range(1, BLEU_ORDER + 1)]
+    )
+    return tables, len(bleu_tokens)
+
+
+def clipped_matches(hyp: tuple[np.ndarray, np.ndarray], ref_hashes: np.ndarray, ref_counts: np.ndarray) -> int:
+    hyp_hashes, hyp_counts = hyp
+    if not len(hyp_hashes) or not len(ref_hashes):
+        return 0
+    positions: np.ndarray = np.minimum(np.searchsorted(ref_hashes, hyp_hashes), len(ref_hashes) - 1)
+    found: np.ndarray = ref_hashes[positions] == hyp_hashes
+    return int(np.minimum(hyp_counts[found], ref_counts[positions[found]]).sum())
+
+
+def reference_digest(records: list[Record], lang: str, word_order: int) -> str:
+    """Identify a dataset version and scoring configuration."""
+    digest = hashlib.sha256(f'{CACHE_VERSION}\t{lang}\t{CHAR_ORDER}\t{word_order}\t{BLEU_ORDER}\n'.encode('utf-8'))
+    for record in records:
+        digest.update(str(record['id']).encode('utf-8') + b'\0')
+        digest.update('\n'.join(record[f'{lang}_body']).encode('utf-8') + b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _reference_tables(args: tuple[int, str, int]) -> tuple[list[tuple[np.ndarray, np.ndarray]], int]:
+    index, lang, word_order = args
+    return text_tables('\n'.join(worker_corpus()[index].paragraphs(lang)), lang, word_order)
+
+
+def build_reference_cache(records: list[Record], lang: str, word_order: int, cache_dir: Path, workers: Optional[int]) -> Path:
+    """Build (or reuse) the reference n-gram tables for a dataset version."""
+    directory: Path = cache_dir / reference_digest(records, lang, word_order)
+    if (directory / 'offsets.npy').exists():
+        tqdm.write(f'Using cached reference statistics in {directory}')
+        return directory
+
+    hashes: list[np.ndarray] = []
+    counts: list[np.ndarray] = []
+    sizes: list[int] = []
+    lengths: list[int] = []
+    # 参照文は共有メモリに一度だけ詰め、ワーカーには番号だけを渡す
+    with share_records(records) as corpus, \
+            ProcessPoolExecutor(max_workers=workers, initializer=attach_worker, initargs=(corpus.handle,)) as executor:
+        results = executor.map(_reference_tables, ((index, lang, word_order) for index in range(len(records))), chunksize=64)
+        for tables, length in tqdm(results, total=len(records), desc='Reference n-grams', unit='doc'):
+            for table_hashes, table_counts in tables:
+                hashes.append(table_hashes)
+                counts.append(table_counts)
+                sizes.append(len(table_hashes))
+            lengths.append(length)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / 'hashes.npy', np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64))
+    np.save(directory / 'counts.npy', np.concatenate(counts).astype(np.int32) if counts else np.empty(0, dtype=np.int32))
+    np.save(directory / 'lengths.npy', np.array(lengths, dtype=np.int64))
+    (directory / 'ids.json').write_text(json.dumps([record['id'] for record in records]), encoding='utf-8')
+    # offsets は最後に書き、途中で中断した場合はキャッシュとして扱わない
+    np.save(directory / 'offsets.npy', np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64))
+    return directory
+
+
+def _attach_reference(directory: str) -> None:
+    for name in ('hashes', 'counts', 'offsets', 'lengths'):
+        _reference[name] = np.load(Path(directory) / f'{name}.npy', mmap_mode='r')
+
+
+def _document_statistics(args: tuple[int, str, str, int]) -> np.ndarray:
+    """Sufficient statistics of one hypothesis against reference document ``index``.
+
+    Layout: (hyp, ref, match) per chrF order, then (match, hyp total) per BLEU
+    order, then hypothesis and reference lengths.
+    """
+    index, text, lang, word_order = args
+    tables, hyp_length = text_tables(text, lang, word_order)
+    num_tables: int = len(tables)
+    offsets: np.ndarray = _reference['offsets']
+    chrf_orders: int = CHAR_ORDER + word_order
+    stats: list[int] = []
+    bleu: list[int] = []
+    for k, table in enumerate(tables):
+        start, end = int(offsets[index * num_tables + k]), int(offsets[index * num_tables + k + 1])
+        ref_hashes: np.ndarray = np.asarray(_reference['hashes'][start:end])
+        ref_counts: np.ndarray = np.asarray(_reference['counts'][start:end])
+        match: int = clipped_matches(table, ref_hashes, ref_counts)
+        if k < chrf_orders:
+            stats.extend([int(table[1].sum()), int(ref_counts.sum()), match])
+        else:
+            bleu.extend([match, int(table[1].sum())])
+    return np.array(stats + bleu + [hyp_length, int(_reference['lengths'][index])], dtype=np.int64)
+
+
+def chrf(stats: np.ndarray, orders: int) -> np.ndarray:
+    """chrF for each row of a statistics matrix (sacrebleu's default definition, beta=2).
+
+    Precision and recall are averaged over the orders with n-grams on both
+    sides, then combined into one F-score.
+    """
+    hyp: np.ndarray = stats[:, 0:3 * orders:3].astype(np.float64)
+    ref: np.ndarray = stats[:, 1:3 * orders:3].astype(np.float64)
+    match: np.ndarray = stats[:, 2:3 * orders:3].astype(np.float64)
+    effective: np.ndarray = (hyp > 0) & (ref > 0)
+    orders_used: np.ndarray = np.maximum(effective.sum(axis=1), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision: np.ndarray = np.where(effective, match / hyp, 0.0).sum(axis=1) / orders_used
+        recall: np.ndarray = np.where(effective, match / ref, 0.0).sum(axis=1) / orders_used
+        denominator: np.ndarray = BETA ** 2 * precision + recall
+        score: np.ndarray = 100 * (1 + BETA ** 2) * precision * recall / denominator
+    return np.where(denominator > 0, score, 0.0)
+
+
+def bleu(stats: np.ndarray, orders: int, smooth: bool) -> np.ndarray:
+    """BLEU for each row of a statistics matrix; ``smooth`` applies sacrebleu's 'exp' smoothing."""
+    offset: int = 3 * orders
+    match: np.ndarray = stats[:, offset:offset + 2 * BLEU_ORDER:2].astype(np.float64)
+    total: np.ndarray = stats[:, offset + 1:offset + 2 * BLEU_ORDER:2].astype(np.float64)
+    hyp_length: np.ndarray = stats[:, -2].astype(np.float64)
+    ref_length: np.ndarray = stats[:, -1].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if smooth:
+            # 一致数0の次数ごとに分母を2倍にしていく
+            factor: np.ndarray = 2.0 ** np.cumsum(match == 0, axis=1)
+            precision: np.ndarray = np.where(match > 0, match / total, 1.0 / (factor * total))
+        else:
+            precision = match / total
+        log_precision: np.ndarray = np.where(precision > 0, np.log(precision), -np.inf).mean(axis=1)
+        brevity: np.ndarray = np.where(hyp_length < ref_length, 1.0 - ref_length / hyp_length, 0.0)
+        score: np.ndarray = 100 * np.exp(log_precision + brevity)
+    return np.where((hyp_length > 0) & (total[:, 0] > 0), np.nan_to_num(score), 0.0)
+
+
+def corpus_scores(stats: np.ndarray, orders: int) -> dict[str, np.ndarray]:
+    return {'chrF': chrf(stats, orders), 'BLEU': bleu(stats, orders, smooth=False)}
+
+
+def load_hypotheses(paths: tuple[Path, ...]) -> tuple[str, dict[str, dict[str, str]]]:
+    """Return the direction and ``{system: {id: hypothesis document}}``."""
+    directions: set[str] = set()
+    systems: dict[str, dict[str, str]] = {}
+    for record in iter_records(paths):
+        directions.add(str(record['direction']))
+        systems.setdefault(str(record['system']), {})[str(record['id'])] = '\n'.join(record['hyp_body'])
+    if len(directions) != 1:
+        raise click.UsageError(f'Hypothesis files must share one direction, got {sorted(directions)}')
+    return directions.pop(), systems
+
+
+@click.command()
+@click.argument('dataset_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--hypotheses', '-h', 'hypothesis_files', multiple=True, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path), help="translate.py output (repeat for each system)")
+@click.option('--output', '-o', 'output_json', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write corpus scores and comparisons as JSON")
+@click.option('--documents', 'documents_jsonl', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write document-level scores as JSONL")
+@click.option('--cache_dir', default=Path('score_cache'), type=click.Path(file_okay=False, path_type=Path), help="Reference n-gram cache")
+@click.option('--word_order', default=0, type=int, help="Word n-gram order for chrF (2 gives chrF++)")
+@click.option('--bootstrap', default=1000, type=int, help="Bootstrap resamples")
+@click.option('--seed', default=12345, type=int)
+@click.option('--workers', default=None, type=int, help="Worker processes (default: CPU count)")
+def main(dataset_files: tuple[Path, ...], hypothesis_files: tuple[Path, ...], output_json: Optional[Path], documents_jsonl: Optional[Path],
+         cache_dir: Path, word_order: int, bootstrap: int, seed: int, workers: Optional[int]) -> None:
+    """Score hypotheses against the references in DATASET_FILES with chrF and BLEU."""
+    direction, systems = load_hypotheses(hypothesis_files)
+    lang: str = TARGET_LANGS[direction]
+    records: list[Record] = unique_records(dataset_files)
+    reference: Path = build_reference_cache(records, lang, word_order, cache_dir, workers)
+
+    # システム間で比較できるよう、全システムに訳がある文書だけを使う
+    common: set[str] = set.intersection(*(set(hypotheses) for hypotheses in systems.values()))
+    indices: list[int] = [i for i, record in enumerate(records) if record['id'] in common]
+    skipped: int = len(set.union(*(set(hypotheses) for hypotheses in systems.values()))) - len(indices)
+    if skipped:
+        tqdm.write(f'Skipping {skipped} documents not translated by every system or missing from the dataset')
+    if not indices:
+        raise click.UsageError('No documents in common between the dataset and the hypotheses')
+
+    orders: int = CHAR_ORDER + word_order
+    statistics: dict[str, np.ndarray] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_attach_reference, initargs=(str(reference),)) as executor:
+        for system, hypotheses in systems.items():
+            jobs = ((i, hypotheses[str(records[i]['id'])], lang, word_order) for i in indices)
+            rows = list(tqdm(executor.map(_document_statistics, jobs, chunksize=64), total=len(indices), desc=system, unit='doc'))
+            statistics[system] = np.stack(rows)
+
+    # 全システムで同じ再標本を使い、対応のあるブートストラップ検定にする
+    rng: np.random.Generator = np.random.default_rng(seed)
+    weights: np.ndarray = rng.multinomial(len(indices), np.full(len(indices), 1.0 / len(indices)), size=bootstrap)
+    summary: dict[str, dict] = {'direction': direction, 'documents': len(indices), 'systems': {}, 'comparisons': []}
+    samples: dict[str, dict[str, np.ndarray]] = {}
+    for system, stats in statistics.items():
+        point: dict[str, np.ndarray] = corpus_scores(stats.sum(axis=0, keepdims=True), orders)
+        samples[system] = corpus_scores(weights @ stats, orders)
+        summary['systems'][system] = {
+            metric: {
+                'score': float(point[metric][0]),
+                'ci95': [float(np.percentile(samples[system][metric], 2.5)), float(np.percentile(samples[system][metric], 97.5))],
+            }
+            for metric in point
+        }
+    for a, b in itertools.combinations(sorted(statistics), 2):
+        for metric in ('chrF', 'BLEU'):
+            difference: np.ndarray = samples[a][metric] - samples[b][metric]
+            observed: float = summary['systems'][a][metric]['score'] - summary['systems'][b][metric]['score']
+            # 観測された差と符号が逆になる再標本の割合
+            p_value: float = float(np.mean(difference <= 0) if observed > 0 else np.mean(difference >= 0))
+            summary['comparisons'].append({'a': a, 'b': b, 'metric': metric, 'difference': observed, 'p_value': p_value})
+
+    click.echo('|system|chrF|95% CI|BLEU|95% CI|')
+    click.echo('|-|-|-|-|-|')
+    for system, scores in summary['systems'].items():
+        click.echo(f"|{system}|{scores['chrF']['score']:.2f}|{scores['chrF']['ci95'][0]:.2f}-{scores['chrF']['ci95'][1]:.2f}"
+                   f"|{scores['BLEU']['score']:.2f}|{scores['BLEU']['ci95'][0]:.2f}-{scores['BLEU']['ci95'][1]:.2f}|")
+    for comparison in summary['comparisons']:
+        click.echo(f"{comparison['a']} - {comparison['b']} ({comparison['metric']}): {comparison['difference']:+.2f} (p={comparison['p_value']:.3f})")
+
+    if output_json:
+        output_json.write_text(json.dumps(summary, ensure_ascii=False, indent='\t'), encoding='utf-8')
+    if documents_jsonl:
+        with documents_jsonl.open('w', encoding='utf-8') as f:
+            for system, stats in statistics.items():
+                chrf_scores: np.ndarray = chrf(stats, orders)
+                bleu_scores: np.ndarray = bleu(stats, orders, smooth=True)
+                for position, i in enumerate(indices):
+                    f.write(json.dumps({
+                        'id': records[i]['id'],
+                        'system': system,
+                        'chrF': round(float(chrf_scores[position]), 4),
+                        'BLEU': round(float(bleu_scores[position]), 4),
+                    }, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Sentence pairs from the aligned paragraphs of the extracted records.
+
+    mirai sentences sentences.jsonl fsa/*.jsonl meti/*.json --workers 8
+
+Each paragraph pair is split into sentences with the rules of
+:mod:`mirai.segment` and the sentences are aligned by length, in a process
+pool.  One JSON line is written per aligned bead::
+
+    {"id": "<doc id>-<paragraph>-<bead>", "doc_id": ..., "paragraph": 0,
+     "en": "...", "ja": "...", "bead": "1-1", "cost": 0.13}
+
+``bead`` is the number of EN and JA sentences joined in the pair and
+``cost`` its length-based alignment cost (0 for a one-sentence paragraph
+pair); pairs with a high cost or a bead other than 1-1 are the first to
+check or drop.  Paragraph pairs with differing line counts are skipped, since
+their lines are not each other's translations.
+
+The records are packed once into shared memory (or a ``.pack`` file given as
+the only input is mapped) and the workers receive document indices, so the
+text is never pickled.
+"""
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+import click
+from tqdm import tqdm
+
+from mirai.packed import PackedCorpus, PackedDocument, attach_worker, open_corpus, worker_corpus
+from mirai.segment import SentencePair, paragraph_pairs
+
+
+def _document_lines(position: int) -> tuple[int, list[str]]:
+    document: PackedDocument = worker_corpus()[position]
+    doc_id: str = document.id
+    en_body: list[str] = document.en_body
+    ja_body: list[str] = document.ja_body
+    lines: list[str] = []
+    for index, (en_paragraph, ja_paragraph) in enumerate(zip(en_body, ja_body)):
+        if en_paragraph.count('\n') != ja_paragraph.count('\n'):
+            continue
+        pair: SentencePair
+        for bead, pair in enumerate(paragraph_pairs(en_paragraph, ja_paragraph)):
+            lines.append(json.dumps({
+                'id': f'{doc_id}-{index}-{bead}',
+                'doc_id': doc_id,
+                'paragraph': index,
+                'en': ' '.join(pair.en),
+                'ja': ''.join(pair.ja),
+                'bead': pair.bead,
+                'cost': round(pair.cost, 3),
+            }, ensure_ascii=False))
+    return min(len(en_body), len(ja_body)), lines
+
+
+@click.command()
+@click.argument('output_jsonl', type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--workers', default=None, type=int, help="Worker processes (default: CPU count)")
+@click.option('--chunksize', default=64, type=int, help="Documents handed to a worker at a time")
+def main(output_jsonl: Path, input_files: tuple[Path, ...], workers: Optional[int], chunksize: int) -> None:
+    """Segment and align the paragraphs of INPUT_FILES into sentence pairs written to OUTPUT_JSONL."""
+    corpus: PackedCorpus = open_corpus(input_files)
+    documents: int = 0
+    paragraphs: int = 0
+    pairs: int = 0
+    start: float = time.perf_counter()
+    output_jsonl.parent.mkdir(parents=True, exist_ok=True)
+    with corpus, ProcessPoolExecutor(max_workers=workers, initializer=attach_worker, initargs=(corpus.handle,)) as executor, \
+            output_jsonl.open('w', encoding='utf-8') as f:
+        results = executor.map(_document_lines, range(len(corpus)), chunksize=chunksize)
+        for count, lines in tqdm(results, total=len(corpus), desc='Aligning', unit='doc'):
+            documents += 1
+            paragraphs += count
+            pairs += len(lines)
+            for line in lines:
+                f.write(line + '\n')
+    seconds: float = time.perf_counter() - start
+    tqdm.write(f'{pairs} sentence pairs from {paragraphs} paragraphs of {documents} documents '
+               f'in {seconds:.1f}s ({paragraphs / seconds * 60 if seconds else 0:.0f} paragraphs/min)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Update the persistent statistics aggregate and render the README table.
+
+    python stats.py stats.json ../fsa/json/*.json --readme ../README.md --summary summary.json
+
+Extractors update the same aggregate themselves when run with ``--stats``.
+"""
+import json
+from pathlib import Path
+from typing import Optional
+import click
+from tqdm import tqdm
+
+from mirai.records import iter_records
+from mirai.stats import locked_stats, replace_readme_table
+
+
+@click.command()
+@click.argument('stats_file', type=click.Path(dir_okay=False, path_type=Path))
+@click.argument('input_files', nargs=-1, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--markdown', 'markdown_file', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write the month x paragraph-count table")
+@click.option('--readme', default=None, type=click.Path(exists=True, dir_okay=False, path_type=Path), help="Replace the statistics table in this README")
+@click.option('--summary', 'summary_file', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write per-source totals and length histograms as JSON")
+def main(stats_file: Path, input_files: tuple[Path, ...], markdown_file: Optional[Path], readme: Optional[Path], summary_file: Optional[Path]) -> None:
+    """Add the records in INPUT_FILES (if any) to STATS_FILE and render it."""
+    with locked_stats(stats_file) as stats:
+        added: int = stats.update(iter_records(input_files))
+        table: str = stats.markdown()
+        summary: dict = stats.summary()
+    tqdm.write(f'{added} new documents, {summary["documents"]} in total')
+
+    if markdown_file:
+        markdown_file.write_text(table + '\n', encoding='utf-8')
+    if readme:
+        readme.write_text(replace_readme_table(readme.read_text(encoding='utf-8'), table), encoding='utf-8')
+    if summary_file:
+        summary_file.write_text(json.dumps(summary, ensure_ascii=False, indent='\t'), encoding='utf-8')
+    if not (markdown_file or readme or summary_file):
+        click.echo(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Maintain the consolidated document store.
+
+    mirai store import ../store ../*/json/*.json
+    mirai store export ../store dataset.parquet --source fsa
+    mirai store compact ../store
+
+The extractors upsert into a store with ``--store``; ``import`` does the same
+for existing dataset files, ``export`` writes the current version of every
+document in any format ``write_documents`` supports, and ``compact`` folds
+the delta segments into the base ahead of the automatic compaction.
+"""
+from pathlib import Path
+from typing import Optional
+import click
+from tqdm import tqdm
+
+from mirai.document import Document, read_documents, write_documents
+from mirai.sources import SOURCES
+from mirai.store import UpsertResult, locked_store
+
+
+@click.group()
+def main() -> None:
+    """Upsert, compact and export the consolidated document store."""
+
+
+@main.command('import')
+@click.argument('store', type=click.Path(file_okay=False, path_type=Path))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--max_deltas', default=8, type=int, help="Compact once the store holds this many delta segments")
+def import_command(store: Path, input_files: tuple[Path, ...], max_deltas: int) -> None:
+    """Upsert the documents of INPUT_FILES into STORE as one delta segment."""
+    with locked_store(store, max_deltas=max_deltas) as document_store:
+        result: UpsertResult = document_store.upsert(tqdm(read_documents(input_files), desc='Reading', unit='doc'))
+        tqdm.write(f'{store}: {result}; {len(document_store)} documents stored')
+
+
+@main.command('compact')
+@click.argument('store', type=click.Path(exists=True, file_okay=False, path_type=Path))
+def compact_command(store: Path) -> None:
+    """Rewrite STORE into a single base segment."""
+    with locked_store(store) as document_store:
+        document_store.compact()
+        tqdm.write(f'{store}: {len(document_store)} documents compacted')
+
+
+@main.command('export')
+@click.argument('store', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument('output_file', type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.option('--source', default=None, type=click.Choice(SOURCES), help="Only export the documents of this source")
+def export_command(store: Path, output_file: Path, source: Optional[str]) -> None:
+    """Write the current version of every document in STORE to OUTPUT_FILE (format by suffix)."""
+    with locked_store(store) as document_store:
+        written: list[Document] = write_documents(output_file, list(document_store.documents(source)), validate=False)
+    tqdm.write(f'{len(written)} documents written to {output_file}')
+
+
+if __name__ == '__main__':
+    main()
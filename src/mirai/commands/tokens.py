@@ -0,0 +1,80 @@
+"""Count tokens per paragraph once and plan model batches from the counts.
+
+    mirai tokens count token_counts fsa/*.json meti/*.json --tokenizer tiktoken:o200k_base
+    mirai tokens plan token_counts --lang en --max_tokens 16000 --context_window 32000 --price 2.5
+
+``count`` keeps the sidecar of :mod:`mirai.tokens` up to date, tokenizing only
+new or changed records.  ``plan`` reads nothing but the sidecar: it reports the
+token totals, the estimated cost and the batches, and can write the batches as
+JSONL for a runner to consume.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Optional
+import click
+
+from mirai.records import iter_records
+from mirai.tokens import LANGS, BatchPlan, TokenCounts, make_tokenizer, plan_batches, update_counts
+
+
+@click.group()
+def main() -> None:
+    """Maintain the token-count sidecar and plan batches from it."""
+
+
+@main.command('count')
+@click.argument('sidecar', type=click.Path(file_okay=False, path_type=Path))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--tokenizer', default='regex', help="regex, chars, tiktoken:ENCODING, hf:NAME_OR_FILE or module:callable")
+@click.option('--workers', default=None, type=int, help="Worker processes (default: CPU count)")
+@click.option('--chunksize', default=64, type=int, help="Documents handed to a worker at a time")
+def count_command(sidecar: Path, input_files: tuple[Path, ...], tokenizer: str, workers: Optional[int], chunksize: int) -> None:
+    """Update the token counts in SIDECAR for the records of INPUT_FILES."""
+    try:
+        make_tokenizer(tokenizer)
+    except (ValueError, ImportError, AttributeError) as e:
+        raise click.BadParameter(str(e), param_hint='--tokenizer')
+    start: float = time.perf_counter()
+    counts, counted, reused = update_counts(sidecar, input_files, tokenizer, workers, chunksize)
+    click.echo(f'{counted} records tokenized, {reused} reused, {len(counts)} in {sidecar} '
+               f'({time.perf_counter() - start:.1f}s)', err=True)
+
+
+@main.command('plan')
+@click.argument('sidecar', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--lang', default='en', type=click.Choice(LANGS), help="Side of the records to plan for")
+@click.option('--unit', default='document', type=click.Choice(['document', 'paragraph']))
+@click.option('--max_tokens', default=16000, type=int, help="Token budget of a batch")
+@click.option('--max_size', default=32, type=int, help="Units per batch")
+@click.option('--context_window', default=None, type=int, help="Drop units longer than this")
+@click.option('--price', default=0.0, type=float, help="Price per million tokens, for the cost estimate")
+@click.option('--records', 'record_files', multiple=True, type=click.Path(exists=True, dir_okay=False, path_type=Path), help="Only plan the records in these files")
+@click.option('--output', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write the batches as JSONL")
+def plan_command(sidecar: Path, lang: str, unit: str, max_tokens: int, max_size: int, context_window: Optional[int],
+                 price: float, record_files: tuple[Path, ...], output: Optional[Path]) -> None:
+    """Plan length-bucketed batches from the counts in SIDECAR."""
+    counts: Optional[TokenCounts] = TokenCounts.load(sidecar)
+    if counts is None:
+        raise click.UsageError(f'{sidecar} holds no token counts; run `mirai tokens count` first')
+    # a record found in several files is planned (and reported missing) once
+    ids: Optional[list[str]] = list(dict.fromkeys(str(record['id']) for record in iter_records(record_files))) if record_files else None
+    if ids is not None and (missing := sum(doc_id not in counts for doc_id in ids)):
+        click.echo(f'{missing} records are not in the sidecar and are left out', err=True)
+    plan: BatchPlan = plan_batches(counts, lang, max_tokens, max_size, unit, context_window, ids)
+
+    click.echo(f'{sum(len(batch.items) for batch in plan.batches)} {unit}s in {len(plan.batches)} batches, '
+               f'{plan.tokens} {lang} tokens ({counts.tokenizer})' + (f', about {plan.tokens / 1e6 * price:.2f} at {price}/M' if price else ''))
+    if plan.dropped:
+        click.echo(f'{len(plan.dropped)} {unit}s over the context window of {context_window} tokens: '
+                   + ', '.join(doc_id if paragraph is None else f'{doc_id}#{paragraph}' for doc_id, paragraph in plan.dropped[:10])
+                   + (' ...' if len(plan.dropped) > 10 else ''))
+    if output:
+        with output.open('w', encoding='utf-8') as f:
+            for batch in plan.batches:
+                items: list = [doc_id if paragraph is None else [doc_id, paragraph] for doc_id, paragraph in batch.items]
+                f.write(json.dumps({'tokens': batch.tokens, 'items': items}, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Run a translation system over the dataset.
+
+Source texts (whole documents or single paragraphs) are sent to an HTTP
+endpoint that accepts
+
+    POST {"system": ..., "source_lang": "en", "target_lang": "ja", "texts": [...]}
+
+and answers ``{"translations": [...]}`` in the same order.  Texts are
+de-duplicated, sorted by length and packed into batches, and up to
+``--concurrency`` batches are in flight at once.  Every finished batch is
+committed to an SQLite cache keyed by (system, direction, sha256 of the text),
+so an interrupted run resumes where it stopped and overlapping slices are never
+translated twice.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+import click
+import requests
+from requests import Response
+from tqdm import tqdm
+
+from mirai.records import Record, unique_records
+from mirai.throttle import AIMDController, PoliteSession, ThrottleConfig
+
+DIRECTIONS: dict[str, tuple[str, str]] = {
+    'en-ja': ('en', 'ja'),
+    'ja-en': ('ja', 'en'),
+}
+# SQLite のプレースホルダ数の上限を超えないように分割して問い合わせる
+LOOKUP_CHUNK: int = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """On-disk translation cache keyed by (system, direction, text hash)."""
+
+    def __init__(self, path: Path) -> None:
+        self.connection: sqlite3.Connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'system TEXT NOT NULL, direction TEXT NOT NULL, text_hash TEXT NOT NULL, translation TEXT NOT NULL, '
+            'PRIMARY KEY (system, direction, text_hash)) WITHOUT ROWID'
+        )
+
+    def get_many(self, system: str, direction: str, hashes: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK):
+            chunk: list[str] = hashes[start:start + LOOKUP_CHUNK]
+            placeholders: str = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f'SELECT text_hash, translation FROM translations WHERE system = ? AND direction = ? AND text_hash IN ({placeholders})',
+                [system, direction, *chunk],
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, system: str, direction: str, items: Iterable[tuple[str, str]]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO translations (system, direction, text_hash, translation) VALUES (?, ?, ?, ?)',
+                [(system, direction, key, translation) for key, translation in items],
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def source_units(record: Record, source_lang: str, unit: str) -> list[str]:
+    """Return the texts to translate for one record."""
+    body: list[str] = list(record[f'{source_lang}_body'])
+    if unit == 'document':
+        return ['\n'.join(body)]
+    return body
+
+
+def make_batches(texts: list[tuple[str, str]], max_chars: int, max_size: int) -> list[list[tuple[str, str]]]:
+    """Pack (hash, text) pairs into batches of similar length.
+
+    Sorting by length keeps short and long texts apart, so one long document
+    does not hold up a batch of short paragraphs.
+    """
+    batches: list[list[tuple[str, str]]] = []
+    current: list[tuple[str, str]] = []
+    current_chars: int = 0
+    for item in sorted(texts, key=lambda item: len(item[1])):
+        if current and (len(current) >= max_size or current_chars + len(item[1]) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(item)
+        current_chars += len(item[1])
+    if current:
+        batches.append(current)
+    return batches
+
+
+def translate_batch(session: PoliteSession, endpoint: str, system: str, direction: str, texts: list[str]) -> list[str]:
+    source_lang, target_lang = DIRECTIONS[direction]
+    response: Response = session.post(endpoint, json={
+        'system': system,
+        'source_lang': source_lang,
+        'target_lang': target_lang,
+        'texts': texts,
+    })
+    response.raise_for_status()
+    translations: list[str] = response.json()['translations']
+    if len(translations) != len(texts):
+        raise ValueError(f'Expected {len(texts)} translations, got {len(translations)}')
+    return translations
+
+
+async def run_batches(
+    batches: list[list[tuple[str, str]]],
+    session: PoliteSession,
+    cache: TranslationCache,
+    endpoint: str,
+    system: str,
+    direction: str,
+    concurrency: int,
+) -> int:
+    """Translate all batches with at most ``concurrency`` in flight. Returns the number of failed batches."""
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+    progress: tqdm = tqdm(total=sum(len(batch) for batch in batches), desc='Translating', unit='text')
+    failures: int = 0
+
+    async def run(batch: list[tuple[str, str]]) -> None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                translations: list[str] = await asyncio.to_thread(translate_batch, session, endpoint, system, direction, [text for _, text in batch])
+            except (requests.RequestException, ValueError, KeyError) as e:
+                failures += 1
+                tqdm.write(f'Batch of {len(batch)} failed: {e}')
+                return
+        # キャッシュへの書き込みはイベントループのスレッドからのみ行う
+        cache.put_many(system, direction, zip((key for key, _ in batch), translations))
+        progress.update(len(batch))
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    progress.close()
+    return failures
+
+
+@click.command()
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--output', '-o', 'output_jsonl', required=True, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Hypotheses JSONL to write")
+@click.option('--endpoint', required=True, help="URL of the translation endpoint")
+@click.option('--system', required=True, help="Name of the system under evaluation (part of the cache key)")
+@click.option('--direction', default='en-ja', type=click.Choice(list(DIRECTIONS)), help="Translation direction")
+@click.option('--unit', default='paragraph', type=click.Choice(['paragraph', 'document']), help="Translate paragraphs or whole documents")
+@click.option('--cache', 'cache_path', default=Path('translation_cache.sqlite3'), type=click.Path(dir_okay=False, path_type=Path), help="SQLite response cache")
+@click.option('--concurrency', default=4, type=int, help="Maximum batches in flight")
+@click.option('--batch_chars', default=8000, type=int, help="Maximum source characters per batch")
+@click.option('--batch_size', default=32, type=int, help="Maximum texts per batch")
+@click.option('--header', 'headers', multiple=True, help='Extra request header, e.g. "Authorization: Bearer ..."')
+@click.option('--timeout', default=300.0, type=float, help="Request timeout in seconds")
+def main(input_files: tuple[Path, ...], output_jsonl: Path, endpoint: str, system: str, direction: str, unit: str, cache_path: Path,
+         concurrency: int, batch_chars: int, batch_size: int, headers: tuple[str, ...], timeout: float) -> None:
+    """Translate the records in INPUT_FILES with an HTTP translation system and write hypotheses as JSONL."""
+    source_lang, _ = DIRECTIONS[direction]
+    records: list[Record] = unique_records(input_files)
+
+    texts: dict[str, str] = {}
+    for record in records:
+        for text in source_units(record, source_lang, unit):
+            texts.setdefault(text_hash(text), text)
+
+    cache: TranslationCache = TranslationCache(cache_path)
+    cached: dict[str, str] = cache.get_many(system, direction, list(texts))
+    pending: list[tuple[str, str]] = [(key, text) for key, text in texts.items() if key not in cached]
+    tqdm.write(f'{len(texts)} unique texts, {len(cached)} cached, {len(pending)} to translate')
+
+    # 同時実行数は semaphore で固定し，PoliteSession には 429/503 と Retry-After の処理だけを任せる
+    config: ThrottleConfig = ThrottleConfig(floor=concurrency, ceiling=concurrency, delay=0.0, timeout=timeout)
+    session: PoliteSession = PoliteSession(AIMDController(config), headers=dict(
+        (name.strip(), value.strip()) for name, value in (header.split(':', 1) for header in headers)
+    ))
+    failures: int = asyncio.run(run_batches(make_batches(pending, batch_chars, batch_size), session, cache, endpoint, system, direction, concurrency))
+    cached = cache.get_many(system, direction, list(texts))
+    cache.close()
+
+    written: int = 0
+    with output_jsonl.open('w', encoding='utf-8') as f:
+        for record in records:
+            hypotheses: list[Optional[str]] = [cached.get(text_hash(text)) for text in source_units(record, source_lang, unit)]
+            if any(hypothesis is None for hypothesis in hypotheses):
+                continue
+            f.write(json.dumps({
+                'id': record['id'],
+                'system': system,
+                'direction': direction,
+                'unit': unit,
+                'hyp_body': hypotheses,
+            }, ensure_ascii=False) + '\n')
+            written += 1
+
+    tqdm.write(f'Wrote {written}/{len(records)} documents to {output_jsonl}')
+    if failures:
+        tqdm.write(f'{failures} batches failed; re-run the same command to resume from the cache.')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Long-running watch mode.
+
+Polls the current index page of every source with conditional requests and,
+when an index has changed, runs that source's download and extraction scripts
+for the current month only (in the same working directories and with the same
+html/tsv/json layout as ``do.sh``, so already-downloaded pages are reused).
+Accepted records whose ``id`` is not in the live dataset yet are appended to it
+as JSON lines.
+"""
+import datetime
+import json
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+import click
+from requests import Response
+from tqdm import tqdm
+
+from mirai.records import Record
+from mirai.sources.kantei.extract import generate_uid
+from mirai.sources.kantei.fetch import uri_filename
+from mirai.stats import locked_stats
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+SRC_DIR: Path = Path(__file__).resolve().parents[2]
+FSA_INDEX_URI: str = 'https://www.fsa.go.jp/en/news/index.html'
+METI_INDEX_URI: str = 'https://www.meti.go.jp/english/press/nBackIssue{yearmonth}.html'
+MOF_INDEX_URI: str = 'https://www.mof.go.jp/english/public_relations/whats_new/{yearmonth}.html'
+KANTEI_INDEX_URI: str = 'https://japan.kantei.go.jp/{pm}/actions/{yearmonth}/index.html'
+KANTEI_BASE_URI: str = 'https://japan.kantei.go.jp'
+
+
+@dataclass
+class Source:
+    name: str
+    index_uri: Callable[[str], str]
+    index_path: Callable[[str], Path]
+    run: Callable[[str, str], Optional[Path]]
+
+
+def shift_month(yearmonth: str, months: int) -> str:
+    """Shift a YYYYMM string by the given number of months."""
+    index: int = int(yearmonth[:4]) * 12 + int(yearmonth[4:]) - 1 + months
+    return f'{index // 12:04d}{index % 12 + 1:02d}'
+
+
+def run_script(source_dir: Path, *args: str, capture: bool = False) -> subprocess.CompletedProcess[str]:
+    """Run one of the per-source scripts in its own directory, as do.sh does."""
+    tqdm.write(f'[watch] {source_dir.name}: {" ".join(args)}')
+    for directory in ('tsv', 'json'):
+        (source_dir / directory).mkdir(parents=True, exist_ok=True)
+    return subprocess.run(list(args), cwd=source_dir, check=True, text=True, stdout=subprocess.PIPE if capture else None)
+
+
+def run_fsa(yearmonth: str, stamp: str, lookback: int, python: str) -> Optional[Path]:
+    source_dir: Path = SRC_DIR / 'fsa'
+    oldest: str = shift_month(yearmonth, -lookback)
+    run_script(source_dir, python, '0_download_indices.py', oldest, f'tsv/watch-{stamp}.tsv', '--html_directory', 'html')
+    run_script(source_dir, python, '1_extract_body.py', f'tsv/watch-{stamp}.tsv', f'json/watch-{stamp}.json', '--html_directory', 'html')
+    return source_dir / 'json' / f'watch-{stamp}.json'
+
+
+def run_meti(yearmonth: str, stamp: str, python: str) -> Optional[Path]:
+    source_dir: Path = SRC_DIR / 'meti'
+    run_script(source_dir, python, '0_download_indices.py', yearmonth, yearmonth, f'tsv/watch-{stamp}.tsv', '--html_directory', 'html')
+    run_script(source_dir, python, '1_extract_body.py', f'tsv/watch-{stamp}.tsv', f'json/watch-{stamp}.json', '--html_directory', 'html')
+    return source_dir / 'json' / f'watch-{stamp}.json'
+
+
+def run_mof(yearmonth: str, stamp: str, python: str) -> Optional[Path]:
+    source_dir: Path = SRC_DIR / 'mof'
+    run_script(source_dir, python, '0_download.py', yearmonth, yearmonth, f'tsv/watch-{stamp}.tsv', 'html', '--only_new')
+    run_script(source_dir, python, '1_extract_body.py', f'tsv/watch-{stamp}.tsv', f'json/watch-{stamp}.json', '--html_directory', 'html')
+    return source_dir / 'json' / f'watch-{stamp}.json'
+
+
+def run_kantei(yearmonth: str, stamp: str, python: str, ids: set[str]) -> Optional[Path]:
+    source_dir: Path = SRC_DIR / 'kantei'
+    uris: list[str] = run_script(source_dir, python, '1_extract_uris.py', 'indices', capture=True).stdout.split()
+    # ライブデータセットに入った文書だけを除外する（ID は 3_extract_body.py と同じく en/<fetch.py と同じファイル名> から作る）．
+    # 英語ページが残っていても日本語ページの取得や抽出に失敗した文書は再処理する．fetch.py は既存ファイルを再取得しない
+    new_uris: list[str] = [uri for uri in uris if uri.startswith(KANTEI_BASE_URI)
+                           and f'kantei_{generate_uid(str(Path("en") / uri_filename(uri)))}' not in ids]
+    if not new_uris:
+        return None
+    (source_dir / 'tsv' / f'watch-{stamp}.txt').write_text('\n'.join(new_uris) + '\n', encoding='utf-8')
+    run_script(source_dir, python, 'fetch.py', f'tsv/watch-{stamp}.txt', 'en', '--delay', '3')
+    (source_dir / 'tsv' / f'watch-{stamp}.include').write_text('\n'.join(uri_filename(uri) for uri in new_uris) + '\n', encoding='utf-8')
+    run_script(source_dir, python, '3_extract_body.py', 'en', 'ja', f'json/watch-{stamp}.json', '--include', f'tsv/watch-{stamp}.include')
+    return source_dir / 'json' / f'watch-{stamp}.json'
+
+
+def build_sources(kantei_pm: str, lookback: int, python: str, ids: set[str]) -> dict[str, Source]:
+    return {
+        'fsa': Source(
+            'fsa',
+            lambda yearmonth: FSA_INDEX_URI,
+            lambda yearmonth: SRC_DIR / 'fsa' / 'index.html',
+            lambda yearmonth, stamp: run_fsa(yearmonth, stamp, lookback, python),
+        ),
+        'meti': Source(
+            'meti',
+            lambda yearmonth: METI_INDEX_URI.format(yearmonth=yearmonth),
+            lambda yearmonth: SRC_DIR / 'meti' / 'indices' / f'{yearmonth}.html',
+            lambda yearmonth, stamp: run_meti(yearmonth, stamp, python),
+        ),
+        'mof': Source(
+            'mof',
+            lambda yearmonth: MOF_INDEX_URI.format(yearmonth=yearmonth),
+            lambda yearmonth: SRC_DIR / 'mof' / 'html' / f'index_{yearmonth}.html',
+            lambda yearmonth, stamp: run_mof(yearmonth, stamp, python),
+        ),
+        'kantei': Source(
+            'kantei',
+            lambda yearmonth: KANTEI_INDEX_URI.format(pm=kantei_pm, yearmonth=yearmonth),
+            lambda yearmonth: SRC_DIR / 'kantei' / 'indices' / f'{kantei_pm}_{yearmonth}.html',
+            lambda yearmonth, stamp: run_kantei(yearmonth, stamp, python, ids),
+        ),
+    }
+
+
+def poll_index(session: PoliteSession, uri: str, index_path: Path, state: dict[str, dict[str, str]]) -> bool:
+    """Fetch ``uri`` conditionally. Returns True and saves the page if it changed."""
+    validators: dict[str, str] = state.get(uri, {})
+    headers: dict[str, str] = {}
+    if 'etag' in validators:
+        headers['If-None-Match'] = validators['etag']
+    if 'last_modified' in validators:
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    response: Response = session.get(uri, headers=headers)
+    if response.status_code == 304:
+        return False
+    if not response.ok:
+        tqdm.write(f'[watch] HTTP {response.status_code}: {uri}')
+        return False
+
+    response.encoding = response.apparent_encoding
+    # 検証子を返さないサーバーでは本文の変化で判定する
+    if 'ETag' not in response.headers and 'Last-Modified' not in response.headers:
+        if index_path.exists() and index_path.read_text(encoding='utf-8') == response.text:
+            return False
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    index_path.write_text(response.text, encoding='utf-8')
+    state[uri] = {
+        key: response.headers[header]
+        for key, header in (('etag', 'ETag'), ('last_modified', 'Last-Modified'))
+        if header in response.headers
+    }
+    return True
+
+
+def load_ids(live_dataset: Path) -> set[str]:
+    ids: set[str] = set()
+    if live_dataset.exists():
+        with live_dataset.open(encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    ids.add(json.loads(line)['id'])
+    return ids
+
+
+def append_new_records(output_json: Path, live_dataset: Path, ids: set[str]) -> list[Record]:
+    """Append records of ``output_json`` that are not in the live dataset yet, and return them."""
+    records: list[Record] = json.loads(output_json.read_text(encoding='utf-8'))
+    added: list[Record] = []
+    with live_dataset.open('a', encoding='utf-8') as f:
+        for record in records:
+            if record['id'] in ids:
+                continue
+            ids.add(record['id'])
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            added.append(record)
+    return added
+
+
+@click.command()
+@click.argument('live_dataset', type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.option('--sources', default='fsa,meti,mof,kantei', help="Comma-separated sources to watch")
+@click.option('--interval', default=600.0, type=float, help="Seconds between polling cycles")
+@click.option('--jitter', default=60.0, type=float, help="Random extra wait added to each cycle in seconds")
+@click.option('--state_file', default=SRC_DIR / 'watch_state.json', type=click.Path(dir_okay=False, path_type=Path), help="Where ETag/Last-Modified validators are kept")
+@click.option('--kantei_pm', default='103', help="Prime-minister prefix of the current kantei archive")
+@click.option('--lookback', default=1, type=int, help="FSA: also accept documents dated this many months back")
+@click.option('--once', is_flag=True, help="Run a single polling cycle and exit")
+@click.option('--stats', default=None, type=click.Path(dir_okay=False, path_type=Path), help="Statistics aggregate to update with appended records")
+@click.option('--delay', default=1.0, type=float, help="Delay between requests in seconds")
+@throttle_options
+def main(live_dataset: Path, sources: str, interval: float, jitter: float, state_file: Path, kantei_pm: str, lookback: int, once: bool, stats: Optional[Path],
+         delay: float, min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path]) -> None:
+    """Poll the sources' current index pages and append newly accepted documents to LIVE_DATASET (JSONL)."""
+    ids: set[str] = load_ids(live_dataset)
+    tqdm.write(f'[watch] {len(ids)} documents in {live_dataset}')
+    available: dict[str, Source] = build_sources(kantei_pm, lookback, sys.executable, ids)
+    selected: list[Source] = [available[name.strip()] for name in sources.split(',') if name.strip()]
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, mirror=mirror, record=record)
+    state: dict[str, dict[str, str]] = json.loads(state_file.read_text(encoding='utf-8')) if state_file.exists() else {}
+
+    while True:
+        started: float = time.monotonic()
+        yearmonth: str = datetime.date.today().strftime('%Y%m')
+        for source in selected:
+            uri: str = source.index_uri(yearmonth)
+            index_path: Path = source.index_path(yearmonth)
+            previous: Optional[dict[str, str]] = state.get(uri)
+            try:
+                if not poll_index(session, uri, index_path, state):
+                    continue
+                stamp: str = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+                output_json: Optional[Path] = source.run(yearmonth, stamp)
+                added: list[Record] = append_new_records(output_json, live_dataset, ids) if output_json and output_json.exists() else []
+                tqdm.write(f'[watch] {source.name}: {len(added)} new documents')
+                if stats and added:
+                    with locked_stats(stats) as aggregate:
+                        aggregate.update(added)
+                state_file.write_text(json.dumps(state, ensure_ascii=False, indent='\t'), encoding='utf-8')
+            except Exception as e:
+                # 一時的な障害でデーモンを止めない．次のサイクルで再取得させるため検証子は戻し，
+                # 検証子のないサーバーでも本文比較で変化ありと判定されるよう保存した目次も消す
+                tqdm.write(f'[watch] {source.name}: error: {e}')
+                if previous is None:
+                    state.pop(uri, None)
+                else:
+                    state[uri] = previous
+                index_path.unlink(missing_ok=True)
+
+        if once:
+            break
+        time.sleep(max(0.0, interval - (time.monotonic() - started)) + random.uniform(0.0, jitter))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""The document model shared by every source.
+
+In process, documents are slotted dataclasses (no per-instance ``__dict__``)
+that also behave as read-only mappings, so helpers written for plain record
+dicts accept them unchanged.  At the output boundary the whole batch is
+validated with a single pydantic ``TypeAdapter`` call instead of building a
+model per record, then written as JSON (the extractors' historical layout),
+JSONL or a single Parquet/Arrow table.
+
+The TSV files produced by the download stages are read here too, so the
+header spellings and per-source ID fix-ups live in one place.
+"""
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, fields
+import datetime
+import json
+import os
+from pathlib import Path
+from typing import Annotated, Any, Callable, Optional
+
+from pydantic import AfterValidator, Field, TypeAdapter, ValidationError
+from tqdm import tqdm
+# pydantic needs typing_extensions.TypedDict before Python 3.12
+from typing_extensions import TypedDict
+
+PAIR_TSV_HEADER: str = 'id\tja_file\ten_file\tja_URI\ten_URI'
+
+# 歴史的経緯による ID の書き換え（古い TSV に残っている）
+ID_FIXUPS: dict[str, tuple[str, str]] = {
+    'meti': ('_news', ''),
+    'mof': ('mf_', 'mof_'),
+}
+
+
+def canonical_id(source: str, raw_id: str) -> str:
+    """Apply the source's historical ID fix-up, if any."""
+    if source in ID_FIXUPS:
+        old, new = ID_FIXUPS[source]
+        return raw_id.replace(old, new)
+    return raw_id
+
+
+@dataclass(slots=True)
+class Pair:
+    """One row of a download stage's TSV: a JA/EN file pair and their URIs."""
+    id: str
+    ja_file: str
+    en_file: str
+    ja_URI: str
+    en_URI: str
+
+
+def read_pairs(tsv_path: Path, source: str) -> list[Pair]:
+    """Read a download TSV, skipping the header, short rows, repeated EN URIs and rows whose EN and JA URIs coincide.
+
+    Column order is fixed; header names are ignored, so older files with
+    ``doc_id``/``ja_filename`` headers read the same way.
+    """
+    pairs: list[Pair] = []
+    seen: set[str] = set()
+    with tsv_path.open(encoding='utf-8') as f:
+        next(f, None)
+        for line in f:
+            parts: list[str] = line.rstrip('\n').split('\t')
+            if len(parts) < 5:
+                continue
+            raw_id, ja_file, en_file, ja_uri, en_uri = (part.strip() for part in parts[:5])
+            if en_uri in seen or en_uri == ja_uri:
+                continue
+            seen.add(en_uri)
+            pairs.append(Pair(canonical_id(source, raw_id), ja_file, en_file, ja_uri, en_uri))
+    return pairs
+
+
+@dataclass(slots=True)
+class Document(Mapping):
+    id: str
+    en_URI: str
+    ja_URI: str
+    en_body: list[str]
+    ja_body: list[str]
+    ja_date: str
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELD_NAMES)
+
+    def __len__(self) -> int:
+        return len(FIELD_NAMES)
+
+    def to_dict(self) -> dict[str, str | list[str]]:
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    @classmethod
+    def from_dict(cls, record: Mapping) -> 'Document':
+        return cls(*(record[name] for name in FIELD_NAMES))
+
+
+FIELD_NAMES: tuple[str, ...] = tuple(field.name for field in fields(Document))
+
+
+def _same_paragraph_count(record: dict) -> dict:
+    if len(record['en_body']) != len(record['ja_body']):
+        raise ValueError('en_body and ja_body have different numbers of paragraphs')
+    return record
+
+
+class DocumentSchema(TypedDict):
+    id: Annotated[str, Field(min_length=1)]
+    en_URI: Annotated[str, Field(pattern=r'^https?://')]
+    ja_URI: Annotated[str, Field(pattern=r'^https?://')]
+    en_body: Annotated[list[str], Field(min_length=1)]
+    ja_body: Annotated[list[str], Field(min_length=1)]
+    ja_date: str
+
+
+DOCUMENTS_ADAPTER: TypeAdapter = TypeAdapter(list[Annotated[DocumentSchema, AfterValidator(_same_paragraph_count)]])
+
+
+def validate_documents(documents: list[Document], log: Callable[[str], None] = tqdm.write) -> list[Document]:
+    """Validate a batch in one call, logging and dropping the documents that fail."""
+    try:
+        DOCUMENTS_ADAPTER.validate_python(documents)
+    except ValidationError as e:
+        invalid: set[int] = set()
+        for error in e.errors():
+            index: int = int(error['loc'][0])
+            invalid.add(index)
+            location: str = '.'.join(str(part) for part in error['loc'][1:])
+            log(f"Schema error: {documents[index].id} {location}: {error['msg']}")
+        return [document for i, document in enumerate(documents) if i not in invalid]
+    return documents
+
+
+def _json_array(documents: Iterable[Document]) -> Iterator[str]:
+    """Yield the same text as ``json.dump(list, ensure_ascii=False, indent='\\t')`` without building the list."""
+    first: bool = True
+    for document in documents:
+        item: str = json.dumps(document.to_dict(), ensure_ascii=False, indent='\t').replace('\n', '\n\t')
+        yield ('[\n\t' if first else ',\n\t') + item
+        first = False
+    yield '[]' if first else '\n]'
+
+
+def documents_to_table(documents: list[Document]) -> Any:
+    """Convert documents into a ``pyarrow.Table`` with list-of-string body columns."""
+    import pyarrow as pa
+
+    return pa.table({name: [getattr(document, name) for document in documents] for name in FIELD_NAMES}, schema=pa.schema([
+        ('id', pa.string()),
+        ('en_URI', pa.string()),
+        ('ja_URI', pa.string()),
+        ('en_body', pa.list_(pa.string())),
+        ('ja_body', pa.list_(pa.string())),
+        ('ja_date', pa.string()),
+    ]))
+
+
+def write_documents(path: Path, documents: list[Document], validate: bool = True, log: Callable[[str], None] = tqdm.write) -> list[Document]:
+    """Validate and write documents; the format follows the suffix (``.jsonl``, ``.parquet``, ``.arrow``, otherwise JSON).
+
+    Returns the documents actually written.
+    """
+    if validate:
+        documents = validate_documents(documents, log=log)
+    if path.suffix == '.jsonl':
+        with path.open('w', encoding='utf-8') as f:
+            for document in documents:
+                f.write(json.dumps(document.to_dict(), ensure_ascii=False) + '\n')
+    elif path.suffix in ('.parquet', '.arrow'):
+        table = documents_to_table(documents)
+        if path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, path)
+    else:
+        with path.open('w', encoding='utf-8') as f:
+            f.writelines(_json_array(documents))
+    return documents
+
+
+def read_documents(paths: Iterable[Path]) -> Iterator[Document]:
+    """Yield documents from any of the formats :func:`write_documents` produces."""
+    from mirai.records import iter_records
+
+    for path in paths:
+        if path.suffix in ('.parquet', '.arrow'):
+            if path.suffix == '.parquet':
+                import pyarrow.parquet as pq
+                table = pq.read_table(path)
+            else:
+                import pyarrow.feather as feather
+                table = feather.read_table(path)
+            for batch in table.to_batches():
+                for row in batch.to_pylist():
+                    yield Document.from_dict(row)
+        else:
+            for record in iter_records([path]):
+                yield Document.from_dict(record)
+
+
+DATA_ROOT_VARIABLE: str = 'MIRAI_DATA'
+
+
+def data_root() -> Path:
+    """The directory holding the per-source ``json`` directories: ``$MIRAI_DATA``, else the working directory."""
+    return Path(os.environ.get(DATA_ROOT_VARIABLE) or Path.cwd())
+
+
+def iter_documents(source: Optional[str] = None, since: Optional[str | datetime.date] = None, root: Optional[Path] = None) -> Iterator[Document]:
+    """Lazily yield extracted documents of one source (all sources if None).
+
+    Reads ``<root>/<source>/json/*`` newest file first (``root`` defaults to
+    :func:`data_root`, e.g. ``src`` of a checkout), so when a document was
+    extracted more than once its latest version is the one yielded.  ``since``
+    (a date, ``YYYY-MM-DD`` or ``YYYYMM``) keeps documents whose ``ja_date`` is
+    on or after it; documents without a date are then skipped.
+    """
+    from mirai.records import SOURCE_HOSTS, record_source
+
+    root = root if root is not None else data_root()
+    sources: list[str] = [source] if source is not None else list(SOURCE_HOSTS.values())
+    threshold: str = ''
+    if isinstance(since, datetime.date):
+        threshold = since.isoformat()
+    elif since:
+        threshold = f'{since[:4]}-{since[4:6]}-01' if len(since) == 6 and since.isdigit() else since
+    seen: set[str] = set()
+    for name in sources:
+        paths: list[Path] = [path for path in (root / name / 'json').glob('*') if path.suffix in ('.json', '.jsonl', '.parquet', '.arrow')]
+        paths.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+        for document in read_documents(paths):
+            if document.id in seen or record_source(document) != name:
+                continue
+            seen.add(document.id)
+            if threshold and (not document.ja_date or document.ja_date < threshold):
+                continue
+            yield document
+
+
+def as_documents(records: Iterable[Mapping]) -> list[Document]:
+    return [record if isinstance(record, Document) else Document.from_dict(record) for record in records]
+
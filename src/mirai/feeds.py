@@ -0,0 +1,274 @@
+"""RSS/Atom feed and XML sitemap discovery for the downloaders.
+
+With ``--discovery auto`` (or ``feed``) a downloader first asks the site's
+feeds for new documents instead of scraping its index pages.  The feeds are
+the ``--feed`` URIs if given, otherwise the ``Sitemap:`` lines of the site's
+robots.txt and the ``<link rel="alternate">`` RSS/Atom links of its index page
+(probed once and remembered in the state file).  RSS 1.0/2.0, Atom, sitemaps
+and sitemap indexes are parsed incrementally while they download, items whose
+``lastmod``/``pubDate``/``updated`` is not newer than the feed's watermark are
+skipped, and child sitemaps are only fetched when they changed since then.
+Watermarks advance only when :meth:`FeedDiscovery.commit` is called with the
+documents that were downloaded, and never past an accepted item that was not,
+so a failed download is offered again on the next run.  If no feed can be read,
+``auto`` falls back to the index scraper and ``feed`` fails.
+"""
+import datetime
+import email.utils
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+import click
+import requests
+from requests import Response
+from tqdm import tqdm
+
+from mirai.throttle import PoliteSession
+
+CHUNK_SIZE: int = 1 << 16
+ITEM_TAGS: frozenset[str] = frozenset({'item', 'entry', 'url', 'sitemap'})
+DATE_TAGS: tuple[str, ...] = ('lastmod', 'updated', 'pubDate', 'published', 'date')
+MAX_SITEMAP_DEPTH: int = 3
+SITEMAP_LINE: re.Pattern[str] = re.compile(r'^\s*sitemap:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+LINK_TAG: re.Pattern[str] = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+FEED_TYPE: re.Pattern[str] = re.compile(r'type="application/(?:rss|atom|rdf)\+xml"', re.IGNORECASE)
+HREF: re.Pattern[str] = re.compile(r'href="([^"]+)"', re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class FeedItem:
+    uri: str
+    modified: Optional[datetime.datetime] = None
+    title: str = ''
+    # サイトマップインデックスの子サイトマップ
+    is_sitemap: bool = False
+
+
+def parse_date(text: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a W3C/ISO 8601 or RFC 822 date; naive values are taken as UTC."""
+    if not text:
+        return None
+    text = text.strip()
+    parsed: Optional[datetime.datetime] = None
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            parsed = email.utils.parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=datetime.timezone.utc)
+
+
+def local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+class FeedParser:
+    """Incremental parser for RSS 1.0/2.0, Atom and sitemap documents.
+
+    Bytes are pushed with :meth:`feed`; every finished item is returned at
+    once and then dropped from the tree, so memory stays flat for large
+    sitemaps.
+    """
+
+    def __init__(self, base_uri: str) -> None:
+        self.base_uri: str = base_uri
+        self.parser: ElementTree.XMLPullParser = ElementTree.XMLPullParser(events=('start', 'end'))
+        self.stack: list[ElementTree.Element] = []
+
+    def _item(self, element: ElementTree.Element) -> Optional[FeedItem]:
+        fields: dict[str, str] = {}
+        uri: Optional[str] = None
+        for child in element:
+            name: str = local_name(child.tag)
+            if name == 'link' and child.get('href') and child.get('rel', 'alternate') == 'alternate':
+                uri = uri or child.get('href')
+            elif (child.text or '').strip():
+                fields.setdefault(name, child.text.strip())
+        uri = fields.get('loc') or fields.get('link') or uri or element.get('{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about')
+        if not uri:
+            return None
+        modified: Optional[datetime.datetime] = next((parse_date(fields[tag]) for tag in DATE_TAGS if tag in fields), None)
+        return FeedItem(urljoin(self.base_uri, uri), modified, fields.get('title', ''), local_name(element.tag) == 'sitemap')
+
+    def _events(self) -> Iterator[FeedItem]:
+        for event, element in self.parser.read_events():
+            if event == 'start':
+                self.stack.append(element)
+                continue
+            self.stack.pop()
+            if local_name(element.tag) not in ITEM_TAGS:
+                continue
+            item: Optional[FeedItem] = self._item(element)
+            if self.stack:
+                self.stack[-1].remove(element)
+            if item is not None:
+                yield item
+
+    def feed(self, data: bytes) -> Iterator[FeedItem]:
+        self.parser.feed(data)
+        return self._events()
+
+    def close(self) -> Iterator[FeedItem]:
+        self.parser.close()
+        return self._events()
+
+
+def read_feed(session: PoliteSession, uri: str) -> Iterator[FeedItem]:
+    """Stream the items of a feed or sitemap (``.gz`` sitemaps are inflated on the fly)."""
+    response: Response = session.get(uri, stream=True)
+    with response:
+        response.raise_for_status()
+        parser: FeedParser = FeedParser(uri)
+        inflate: Optional[Any] = zlib.decompressobj(16 + zlib.MAX_WBITS) if urlsplit(uri).path.endswith('.gz') else None
+        for chunk in response.iter_content(CHUNK_SIZE):
+            yield from parser.feed(inflate.decompress(chunk) if inflate is not None else chunk)
+        yield from parser.close()
+
+
+def find_feeds(session: PoliteSession, page_uri: str) -> list[str]:
+    """Sitemaps listed in robots.txt and feeds linked from ``page_uri`` (an index page of the site)."""
+    feeds: dict[str, None] = {}
+    for uri, extract in ((urljoin(page_uri, '/robots.txt'), lambda text: SITEMAP_LINE.findall(text)),
+                         (page_uri, lambda text: [HREF.search(tag).group(1) for tag in LINK_TAG.findall(text)
+                                                  if FEED_TYPE.search(tag) and HREF.search(tag)])):
+        try:
+            response: Response = session.get(uri)
+        except requests.RequestException as e:
+            tqdm.write(f'Feed probe failed: {uri}: {e}')
+            continue
+        if response.ok:
+            response.encoding = response.apparent_encoding
+            for found in extract(response.text):
+                feeds[urljoin(uri, found)] = None
+    return list(feeds)
+
+
+class FeedState:
+    """Per-feed watermarks and probed feed lists, kept in a small JSON file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        data: dict[str, Any] = json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+        self.watermarks: dict[str, str] = data.get('watermarks', {})
+        self.feeds: dict[str, list[str]] = data.get('feeds', {})
+        self.pending: dict[str, datetime.datetime] = {}
+
+    def watermark(self, feed: str) -> Optional[datetime.datetime]:
+        return parse_date(self.watermarks.get(feed))
+
+    def advance(self, feed: str, modified: datetime.datetime) -> None:
+        if feed not in self.pending or modified > self.pending[feed]:
+            self.pending[feed] = modified
+
+    def save(self, commit: bool) -> None:
+        if commit:
+            for feed, modified in self.pending.items():
+                previous: Optional[datetime.datetime] = self.watermark(feed)
+                if previous is None or modified > previous:
+                    self.watermarks[feed] = modified.isoformat()
+            self.pending.clear()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({'watermarks': self.watermarks, 'feeds': self.feeds}, ensure_ascii=False, indent='\t'), encoding='utf-8')
+
+
+class FeedDiscovery:
+    """What the downloaders hold; :meth:`uris` returns None when the index scraper has to be used."""
+
+    def __init__(self, mode: str, feeds: tuple[str, ...], state: Optional[FeedState], page_uri: str,
+                 log: Callable[[str], None] = tqdm.write) -> None:
+        self.mode: str = mode
+        self.feeds: tuple[str, ...] = feeds
+        self.state: Optional[FeedState] = state
+        self.page_uri: str = page_uri
+        self.log: Callable[[str], None] = log
+        # 受理した日付つきの項目 (feed, uri, modified)。commit で透かしの上限を決める
+        self.accepted: list[tuple[str, str, datetime.datetime]] = []
+
+    def _walk(self, session: PoliteSession, feed: str, uri: str, watermark: Optional[datetime.datetime], depth: int) -> Iterator[FeedItem]:
+        for item in read_feed(session, uri):
+            if item.modified is not None:
+                self.state.advance(feed, item.modified)
+                if watermark is not None and item.modified <= watermark:
+                    continue
+            if not item.is_sitemap:
+                yield item
+            elif depth < MAX_SITEMAP_DEPTH:
+                yield from self._walk(session, feed, item.uri, watermark, depth + 1)
+
+    def uris(self, session: PoliteSession, accept: Callable[[FeedItem], bool]) -> Optional[list[str]]:
+        """Accepted document URIs modified since the watermarks, or None if no feed could be read."""
+        if self.mode == 'index':
+            return None
+        feeds: list[str] = list(self.feeds)
+        if not feeds:
+            if self.page_uri not in self.state.feeds:
+                self.state.feeds[self.page_uri] = find_feeds(session, self.page_uri)
+                self.state.save(commit=False)
+            feeds = self.state.feeds[self.page_uri]
+
+        uris: dict[str, None] = {}
+        read: int = 0
+        for feed in feeds:
+            # 途中で失敗したフィードの項目は使わない（透かしも進めない）
+            try:
+                found: list[FeedItem] = [item for item in self._walk(session, feed, feed, self.state.watermark(feed), 0) if accept(item)]
+            except (requests.RequestException, ElementTree.ParseError, zlib.error) as e:
+                self.log(f'Feed unusable: {feed}: {e}')
+                self.state.pending.pop(feed, None)
+                continue
+            read += 1
+            self.log(f'Feed {feed}: {len(found)} new documents')
+            uris.update(dict.fromkeys(item.uri for item in found))
+            self.accepted.extend((feed, item.uri, item.modified) for item in found if item.modified is not None)
+
+        if not read:
+            if self.mode == 'feed':
+                raise click.ClickException(f'No readable feed for {self.page_uri}')
+            self.log(f'No readable feed for {self.page_uri}; scraping index pages')
+            return None
+        return list(uris)
+
+    def commit(self, done: Iterable[str]) -> None:
+        """Advance the watermarks of the feeds read by :meth:`uris` past the ``done`` documents.
+
+        Call once the documents are downloaded.  A feed's watermark stays below the
+        oldest of its accepted items that is not in ``done``.
+        """
+        if self.state is None:
+            return
+        done = set(done)
+        failed: dict[str, datetime.datetime] = {}
+        for feed, uri, modified in self.accepted:
+            if uri not in done and (feed not in failed or modified < failed[feed]):
+                failed[feed] = modified
+        for feed, oldest in failed.items():
+            below: list[datetime.datetime] = [modified for item_feed, uri, modified in self.accepted
+                                              if item_feed == feed and uri in done and modified < oldest]
+            if below:
+                self.state.pending[feed] = max(below)
+            else:
+                self.state.pending.pop(feed, None)
+        self.state.save(commit=True)
+
+
+def feed_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--discovery``/``--feed``/``--feed_state`` options to a click command."""
+    func = click.option('--feed_state', default=Path('feeds.json'), type=click.Path(dir_okay=False, path_type=Path), help="Watermarks and probed feeds of the feed discovery")(func)
+    func = click.option('--feed', 'feeds', multiple=True, help="RSS/Atom feed or sitemap to use (default: probe robots.txt and the index page)")(func)
+    func = click.option('--discovery', default='index', type=click.Choice(['index', 'feed', 'auto']), help="Find documents by index pages, feeds, or feeds with index fallback")(func)
+    return func
+
+
+def make_discovery(discovery: str, feeds: tuple[str, ...], feed_state: Path, page_uri: str,
+                   log: Callable[[str], None] = tqdm.write) -> FeedDiscovery:
+    """Build a :class:`FeedDiscovery` from the values of :func:`feed_options`."""
+    state: Optional[FeedState] = FeedState(feed_state) if discovery != 'index' else None
+    return FeedDiscovery(discovery, feeds, state, page_uri, log=log)
@@ -0,0 +1,177 @@
+"""Vectorised quality filters for aligned EN/JA paragraph pairs.
+
+All paragraphs of a batch are joined into one string per language and turned
+into a code-point array; a lookup table maps every code point to a character
+class, and one ``bincount`` gives the class counts of all paragraphs at once.
+Per-paragraph filters:
+
+- ``length_ratio``: JA/EN character ratio outside [min_ratio, max_ratio]
+- ``ja_script``: too few kana/kanji among the letters of the JA paragraph
+  (untranslated or swapped paragraph)
+- ``en_script``: too many kana/kanji among the letters of the EN paragraph
+- ``digits``: the digits used on both sides differ too much
+- ``urls``: different numbers of URLs (``://``) or e-mail addresses (``@``)
+
+A document is rejected when any of its paragraphs fails a filter.  Both bodies
+of a record must have the same number of paragraphs, as the extractors ensure.
+"""
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+import numpy as np
+from tqdm import tqdm
+
+from mirai.records import Record
+
+SEPARATOR: str = '\x00'
+
+
+@dataclass
+class FilterConfig:
+    min_ratio: float = 0.1
+    max_ratio: float = 3.0
+    ratio_min_chars: int = 20
+    min_ja_script: float = 0.2
+    max_en_script: float = 0.2
+    script_min_letters: int = 10
+    max_digit_mismatch: float = 0.9
+    digit_min_count: int = 4
+    check_urls: bool = True
+
+    @classmethod
+    def load(cls, path: Path) -> 'FilterConfig':
+        """Load thresholds from a JSON object; missing keys keep their defaults."""
+        values: dict = json.loads(path.read_text(encoding='utf-8'))
+        unknown: set[str] = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f'Unknown filter settings: {sorted(unknown)}')
+        return cls(**values)
+
+
+FILTER_NAMES: tuple[str, ...] = ('length_ratio', 'ja_script', 'en_script', 'digits', 'urls')
+
+
+# 文字種: 0=その他, 1=かな・漢字, 2=ラテン文字, 3..12=数字0..9, 13=@
+OTHER, JAPANESE, LATIN, DIGIT, AT = 0, 1, 2, 3, 13
+NUM_CLASSES: int = 14
+
+
+def _character_classes() -> np.ndarray:
+    """Lookup table from BMP code point to character class (index 0x10000 covers everything above)."""
+    table: np.ndarray = np.zeros(0x10001, dtype=np.int64)
+    for start, end in ((0x3040, 0x30FF), (0xFF66, 0xFF9F), (0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0xF900, 0xFAFF)):
+        table[start:end + 1] = JAPANESE
+    for start, end in ((0x41, 0x5A), (0x61, 0x7A), (0xFF21, 0xFF3A), (0xFF41, 0xFF5A)):
+        table[start:end + 1] = LATIN
+    for start in (0x30, 0xFF10):
+        table[start:start + 10] = np.arange(DIGIT, DIGIT + 10)
+    table[[0x40, 0xFF20]] = AT
+    return table
+
+
+CHARACTER_CLASSES: np.ndarray = _character_classes()
+
+
+def text_features(texts: list[str]) -> dict[str, np.ndarray]:
+    """Per-paragraph character-class counts and digit histograms."""
+    lengths: np.ndarray = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    codes: np.ndarray = np.frombuffer(SEPARATOR.join(texts).encode('utf-32-le'), dtype='<u4')
+    # 各文字がどの段落に属するか（区切り文字は直前の段落に含まれるが、文字種は「その他」）
+    paragraph: np.ndarray = np.repeat(np.arange(len(texts), dtype=np.int64) * NUM_CLASSES, lengths + 1)[:len(codes)]
+    classes: np.ndarray = CHARACTER_CLASSES[np.minimum(codes, 0x10000)]
+    counts: np.ndarray = np.bincount(paragraph + classes, minlength=len(texts) * NUM_CLASSES).reshape(len(texts), NUM_CLASSES)
+
+    # "://" は先頭の ":" の位置だけ調べる
+    colons: np.ndarray = np.flatnonzero(codes[:-2] == 0x3A)
+    colons = colons[(codes[colons + 1] == 0x2F) & (codes[colons + 2] == 0x2F)]
+    urls: np.ndarray = np.bincount(paragraph[colons] // NUM_CLASSES, minlength=len(texts))
+
+    return {
+        'length': lengths,
+        'japanese': counts[:, JAPANESE],
+        'letters': counts[:, JAPANESE] + counts[:, LATIN],
+        'digits': counts[:, DIGIT:DIGIT + 10],
+        'urls': urls,
+        'emails': counts[:, AT],
+    }
+
+
+def paragraph_failures(en_texts: list[str], ja_texts: list[str], config: FilterConfig) -> dict[str, np.ndarray]:
+    """Boolean failure arrays, one per filter, over aligned paragraph pairs."""
+    en: dict[str, np.ndarray] = text_features(en_texts)
+    ja: dict[str, np.ndarray] = text_features(ja_texts)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio: np.ndarray = ja['length'] / en['length']
+        ja_script: np.ndarray = ja['japanese'] / ja['letters']
+        en_script: np.ndarray = en['japanese'] / en['letters']
+        digit_total: np.ndarray = en['digits'].sum(axis=1) + ja['digits'].sum(axis=1)
+        digit_mismatch: np.ndarray = np.abs(en['digits'] - ja['digits']).sum(axis=1) / digit_total
+
+    long_enough: np.ndarray = (en['length'] >= config.ratio_min_chars) | (ja['length'] >= config.ratio_min_chars)
+    failures: dict[str, np.ndarray] = {
+        'length_ratio': long_enough & ((en['length'] == 0) | (ratio < config.min_ratio) | (ratio > config.max_ratio)),
+        'ja_script': (ja['letters'] >= config.script_min_letters) & (ja_script < config.min_ja_script),
+        'en_script': (en['letters'] >= config.script_min_letters) & (en_script > config.max_en_script),
+        'digits': (digit_total >= config.digit_min_count) & (digit_mismatch > config.max_digit_mismatch),
+        'urls': np.zeros(len(en_texts), dtype=bool),
+    }
+    if config.check_urls:
+        failures['urls'] = (en['urls'] != ja['urls']) | (en['emails'] != ja['emails'])
+    return failures
+
+
+def filter_records(records: list[Record], config: Optional[FilterConfig] = None) -> tuple[list[Record], dict[str, int], dict[str, list[str]]]:
+    """Apply all filters to a batch of records.
+
+    Returns the kept records, the number of documents each filter rejected,
+    and the failed filter names of every rejected document id.
+    """
+    config = config or FilterConfig()
+    counts: dict[str, int] = {name: 0 for name in FILTER_NAMES}
+    if not records:
+        return [], counts, {}
+
+    en_texts: list[str] = [text for record in records for text in record['en_body']]
+    ja_texts: list[str] = [text for record in records for text in record['ja_body']]
+    sizes: np.ndarray = np.fromiter((len(record['en_body']) for record in records), dtype=np.int64, count=len(records))
+    document: np.ndarray = np.repeat(np.arange(len(records)), sizes)
+
+    failed: dict[str, np.ndarray] = {
+        name: np.bincount(document, weights=paragraph_failure, minlength=len(records)) > 0
+        for name, paragraph_failure in paragraph_failures(en_texts, ja_texts, config).items()
+    }
+    for name, documents in failed.items():
+        counts[name] = int(documents.sum())
+
+    kept: list[Record] = []
+    rejected: dict[str, list[str]] = {}
+    for i, record in enumerate(records):
+        reasons: list[str] = [name for name in FILTER_NAMES if failed[name][i]]
+        if reasons:
+            rejected[str(record['id'])] = reasons
+        else:
+            kept.append(record)
+    return kept, counts, rejected
+
+
+def filter_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--quality_filter``/``--filter_config`` options to a click command."""
+    func = click.option('--filter_config', default=None, type=click.Path(exists=True, dir_okay=False, path_type=Path), help="JSON file with quality filter thresholds (implies --quality_filter)")(func)
+    func = click.option('--quality_filter', is_flag=True, help="Drop documents failing the paragraph-pair quality filters")(func)
+    return func
+
+
+def apply_filters(records: list[Record], quality_filter: bool, filter_config: Optional[Path], log: Callable[[str], None] = tqdm.write) -> list[Record]:
+    """Filter records according to the values of :func:`filter_options`, logging each rejection and the per-filter counts."""
+    if filter_config is None and not quality_filter:
+        return records
+    config: FilterConfig = FilterConfig.load(filter_config) if filter_config is not None else FilterConfig()
+    kept, counts, rejected = filter_records(records, config)
+    for doc_id, reasons in rejected.items():
+        log(f"Quality filter: {doc_id} ({', '.join(reasons)})")
+    log(f"Quality filter rejected {len(rejected)}/{len(records)}: " + ', '.join(f'{name}={count}' for name, count in counts.items()))
+    return kept
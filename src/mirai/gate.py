@@ -0,0 +1,111 @@
+"""EN-first gating of the JA downloads.
+
+A JA page is only worth fetching when its EN page would survive extraction,
+so the downloaders (and kantei's extractor, which fetches the JA pages
+itself) run the source's EN extraction as soon as the EN page is on disk and
+queue the JA fetch only if the EN body is non-empty and does not look like an
+error page.  The EN paragraph count is recorded as the expectation for the JA
+page, which is checked the moment it arrives.  A JA count that differs is
+only reported: the extractor's boilerplate stripping may still reconcile it.
+
+With ``--gate_file`` the verdicts are written to a TSV (``en_file``,
+``en_paragraphs``, ``ja_paragraphs``, ``status``) so rejected pages can be
+inspected; they are re-evaluated on every run, since the extractors change
+more often than the cached pages.
+"""
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+from tqdm import tqdm
+
+GATE_HEADER: str = 'en_file\ten_paragraphs\tja_paragraphs\tstatus'
+ERROR_PAGE_MARKERS: tuple[str, ...] = ('404 Not Found', 'Page Not Found', 'ページが見つかりません')
+QUEUED: str = 'queued'
+OK: str = 'ok'
+
+
+@dataclass(slots=True)
+class GateEntry:
+    en_paragraphs: int = 0
+    ja_paragraphs: Optional[int] = None
+    status: str = QUEUED
+
+
+def en_rejection(paragraphs: Optional[list[str]]) -> Optional[str]:
+    """Why an extracted EN body is not worth a JA fetch, or None."""
+    if not paragraphs:
+        return 'no EN body'
+    # エラーページは冒頭の数段落に現れる
+    if any(marker in paragraph for paragraph in paragraphs[:5] for marker in ERROR_PAGE_MARKERS):
+        return 'EN page is an error page'
+    return None
+
+
+class PairGate:
+    """Decides which JA pages to fetch and checks them against the EN paragraph count."""
+
+    def __init__(self, path: Optional[Path], enabled: bool = True, log: Callable[[str], None] = tqdm.write) -> None:
+        self.path: Optional[Path] = path
+        self.enabled: bool = enabled
+        self.log: Callable[[str], None] = log
+        self.entries: dict[str, GateEntry] = {}
+        self.lock: threading.Lock = threading.Lock()
+        if path is not None and path.exists():
+            with path.open(encoding='utf-8') as f:
+                next(f, None)
+                for line in f:
+                    en_file, en_paragraphs, ja_paragraphs, status = line.rstrip('\n').split('\t')
+                    self.entries[en_file] = GateEntry(int(en_paragraphs), int(ja_paragraphs) if ja_paragraphs else None, status)
+
+    def check_en(self, en_file: str, paragraphs: Optional[list[str]], reason: Optional[str] = None) -> bool:
+        """Record the verdict on an EN page; True if its JA page should be fetched."""
+        reason = reason or en_rejection(paragraphs)
+        with self.lock:
+            self.entries[en_file] = GateEntry(len(paragraphs or []), None, reason or QUEUED)
+        if reason is None or not self.enabled:
+            return True
+        self.log(f'EN gate: {en_file}: {reason}; JA page not fetched')
+        return False
+
+    def check_ja(self, en_file: str, paragraphs: Optional[list[str]]) -> bool:
+        """Compare a freshly downloaded JA page with the expected EN paragraph count."""
+        with self.lock:
+            entry: Optional[GateEntry] = self.entries.get(en_file)
+            if entry is None:
+                return True
+            entry.ja_paragraphs = len(paragraphs or [])
+            entry.status = OK if entry.ja_paragraphs == entry.en_paragraphs else 'paragraph count mismatch'
+        if entry.status != OK:
+            self.log(f'EN gate: {en_file}: expected {entry.en_paragraphs} JA paragraphs, got {entry.ja_paragraphs}')
+        return entry.status == OK
+
+    def summary(self) -> str:
+        counts: dict[str, int] = {}
+        for entry in self.entries.values():
+            counts[entry.status] = counts.get(entry.status, 0) + 1
+        return 'EN gate: ' + (', '.join(f'{count} {status}' for status, count in sorted(counts.items())) or 'no pages checked')
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('w', encoding='utf-8') as f:
+            f.write(GATE_HEADER + '\n')
+            for en_file, entry in sorted(self.entries.items()):
+                ja_paragraphs: str = '' if entry.ja_paragraphs is None else str(entry.ja_paragraphs)
+                f.write(f'{en_file}\t{entry.en_paragraphs}\t{ja_paragraphs}\t{entry.status}\n')
+
+
+def gate_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--en_gate/--no_en_gate`` and ``--gate_file`` options to a click command."""
+    func = click.option('--gate_file', default=None, type=click.Path(dir_okay=False, path_type=Path), help="TSV recording the EN verdicts and expected JA paragraph counts")(func)
+    func = click.option('--en_gate/--no_en_gate', default=True, help="Fetch a JA page only when its EN page passes extraction")(func)
+    return func
+
+
+def make_gate(en_gate: bool, gate_file: Optional[Path], log: Callable[[str], None] = tqdm.write) -> PairGate:
+    """Build a :class:`PairGate` from the values of :func:`gate_options`."""
+    return PairGate(gate_file, enabled=en_gate, log=log)
@@ -0,0 +1,206 @@
+"""Local mirror of the sites: a recorded archive and a replay server.
+
+Any command with the throttle options records what it fetches with
+``--record ARCHIVE`` and fetches from a replay server instead of the live site
+with ``--mirror http://HOST:PORT``.  The mirror URL carries the original one
+(``/https/www.fsa.go.jp/en/news/index.html``), so per-host throttling, the
+document URIs and the saved files are the same as against the live sites.
+
+An archive is a directory holding ``index.jsonl`` (URL, status, content type,
+body digest, size and the recorded latency; the last line of a URL wins) and
+the bodies under ``bodies/``, stored once per digest.  The replay server can
+add latency, limit the bandwidth per response, inject error statuses and
+serve the HTML re-encoded as UTF-8 or Shift_JIS; its random choices come from
+one seeded generator, so a run with the same seed and request order sees the
+same errors.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+from requests import Response
+
+ENCODINGS: tuple[str, ...] = ('keep', 'utf-8', 'shift_jis', 'mixed')
+# 官公庁のページの Shift_JIS は実際には CP932
+CODECS: dict[str, tuple[str, str]] = {'utf-8': ('utf-8', 'UTF-8'), 'shift_jis': ('cp932', 'Shift_JIS')}
+CHARSET: re.Pattern[str] = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+META_CHARSET: re.Pattern[str] = re.compile(r'(<meta[^>]+charset=["\']?)([\w-]+)', re.IGNORECASE)
+
+
+def mirror_url(mirror: str, url: str) -> str:
+    """The replay-server URL standing in for ``url``."""
+    parts = urlsplit(url)
+    return f'{mirror.rstrip("/")}/{parts.scheme}/{parts.netloc}{parts.path or "/"}' + (f'?{parts.query}' if parts.query else '')
+
+
+def original_url(path: str) -> Optional[str]:
+    """The URL a replay-server path stands for, or None if it is not a mirror path."""
+    scheme, _, rest = path.lstrip('/').partition('/')
+    if scheme not in ('http', 'https') or not rest:
+        return None
+    return f'{scheme}://{rest}'
+
+
+def archive_key(url: str) -> str:
+    return url.partition('#')[0]
+
+
+@dataclass(slots=True)
+class MirrorEntry:
+    url: str
+    status: int
+    content_type: str
+    digest: str
+    size: int
+    elapsed: float
+
+
+class MirrorArchive:
+    """Recorded responses keyed by URL; safe to record into from several threads."""
+
+    def __init__(self, root: Path) -> None:
+        self.root: Path = root
+        self.entries: dict[str, MirrorEntry] = {}
+        self.lock: threading.Lock = threading.Lock()
+        index: Path = root / 'index.jsonl'
+        if index.exists():
+            with index.open(encoding='utf-8') as f:
+                for line in f:
+                    entry: MirrorEntry = MirrorEntry(**json.loads(line))
+                    self.entries[entry.url] = entry
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, url: str) -> Optional[MirrorEntry]:
+        return self.entries.get(archive_key(url))
+
+    def body(self, entry: MirrorEntry) -> bytes:
+        return (self.root / 'bodies' / entry.digest).read_bytes()
+
+    def record(self, url: str, response: Response) -> None:
+        content: bytes = response.content
+        entry: MirrorEntry = MirrorEntry(
+            archive_key(url), response.status_code, response.headers.get('Content-Type', ''),
+            hashlib.blake2b(content, digest_size=16).hexdigest(), len(content), round(response.elapsed.total_seconds(), 3),
+        )
+        with self.lock:
+            body: Path = self.root / 'bodies' / entry.digest
+            if not body.exists():
+                body.parent.mkdir(parents=True, exist_ok=True)
+                body.write_bytes(content)
+            with (self.root / 'index.jsonl').open('a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(entry), ensure_ascii=False) + '\n')
+            self.entries[entry.url] = entry
+
+
+def decode_html(body: bytes, content_type: str) -> str:
+    """Decode a recorded page by its declared charset, falling back to UTF-8 and then CP932."""
+    declared: Optional[re.Match[str]] = CHARSET.search(content_type) or CHARSET.search(body[:2048].decode('ascii', errors='ignore'))
+    candidates: list[str] = ([declared.group(1)] if declared else []) + ['utf-8', 'cp932']
+    for candidate in candidates:
+        try:
+            return body.decode('cp932' if candidate.lower() in ('shift_jis', 'sjis', 'x-sjis') else candidate)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return body.decode('utf-8', errors='replace')
+
+
+def transcode(url: str, body: bytes, content_type: str, encoding: str) -> tuple[bytes, str]:
+    """Serve an HTML body in the requested encoding variant, fixing its Content-Type and ``<meta charset>``."""
+    if encoding == 'keep' or not content_type.startswith('text/html'):
+        return body, content_type
+    if encoding == 'mixed':
+        # URL ごとに固定（実行のたびに変わらないようにする）
+        encoding = 'shift_jis' if hashlib.blake2b(url.encode('utf-8'), digest_size=1).digest()[0] & 1 else 'utf-8'
+    codec, label = CODECS[encoding]
+    text: str = META_CHARSET.sub(lambda match: match.group(1) + label, decode_html(body, content_type))
+    return text.encode(codec, errors='xmlcharrefreplace'), f'text/html; charset={label}'
+
+
+@dataclass
+class ReplayConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    bandwidth: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    encoding: str = 'keep'
+    seed: int = 0
+
+
+@dataclass
+class ReplayStats:
+    requests: int = 0
+    bytes: int = 0
+    misses: int = 0
+    errors: int = 0
+
+
+def make_handler(archive: MirrorArchive, config: ReplayConfig, stats: ReplayStats) -> type[BaseHTTPRequestHandler]:
+    rng: random.Random = random.Random(config.seed)
+    lock: threading.Lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        # requests.Session の keep-alive を効かせる
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:
+            url: Optional[str] = original_url(self.path)
+            with lock:
+                draw: float = rng.random()
+                delay: float = config.latency + config.jitter * rng.random()
+                stats.requests += 1
+            time.sleep(delay)
+            entry: Optional[MirrorEntry] = archive.get(url) if url else None
+            if draw < config.error_rate:
+                with lock:
+                    stats.errors += 1
+                self._send(config.error_status, b'', 'text/plain', retry_after=config.error_status in (429, 503))
+            elif entry is None:
+                with lock:
+                    stats.misses += 1
+                self._send(404, b'', 'text/plain')
+            else:
+                body, content_type = transcode(entry.url, archive.body(entry), entry.content_type, config.encoding)
+                self._send(entry.status, body, content_type)
+
+        def _send(self, status: int, body: bytes, content_type: str, retry_after: bool = False) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if retry_after:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            if config.bandwidth <= 0:
+                self.wfile.write(body)
+            else:
+                # 帯域制限は 50ms 分ずつ書いて待つ
+                step: int = max(1, int(config.bandwidth / 20))
+                for start in range(0, len(body), step):
+                    piece: bytes = body[start:start + step]
+                    self.wfile.write(piece)
+                    time.sleep(len(piece) / config.bandwidth)
+            with lock:
+                stats.bytes += len(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
+
+
+def make_server(archive: MirrorArchive, config: ReplayConfig, host: str = '127.0.0.1', port: int = 0) -> tuple[ThreadingHTTPServer, ReplayStats]:
+    """A replay server for ``archive`` (port 0 picks a free port); call ``serve_forever`` to run it."""
+    stats: ReplayStats = ReplayStats()
+    server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), make_handler(archive, config, stats))
+    server.daemon_threads = True
+    return server, stats
@@ -0,0 +1,246 @@
+"""Records packed into one buffer that pool workers share without copying.
+
+The records' strings are encoded once, back to back, into a contiguous UTF-8
+buffer; 64-bit offset arrays locate each string and each document's strings
+(``id``, ``en_URI``, ``ja_URI``, ``ja_date``, the English paragraphs, then the
+Japanese ones).  The buffer lives in ``multiprocessing.shared_memory`` or in
+a ``.pack`` file that is memory-mapped, so a worker attaches by name or path
+in a few milliseconds and reads pages on demand; only the strings it actually
+decodes are copied into its own memory.
+
+Layout (little endian)::
+
+    header   magic, documents, strings, text size   (64 bytes)
+    text     UTF-8 bytes of every string
+    strings  int64[strings + 1]   byte offsets into text
+    docs     int64[documents + 1] first string of each document
+    en       int32[documents]     number of English paragraphs
+
+Use :func:`share_records` or :func:`open_corpus` in the parent and pass
+``corpus.handle`` as ``initargs`` to :func:`attach_worker`; tasks then carry
+document indices and read the text through :func:`worker_corpus`.
+"""
+import mmap
+import struct
+import tempfile
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import numpy as np
+
+from mirai.document import Document
+from mirai.records import Record, iter_records
+
+MAGIC: bytes = b'MIRAIPK1'
+HEADER: struct.Struct = struct.Struct('<8sqqq')
+HEADER_SIZE: int = 64
+METADATA_FIELDS: tuple[str, ...] = ('id', 'en_URI', 'ja_URI', 'ja_date')
+SHM_PREFIX: str = 'shm:'
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def pack_records(records: Iterable[Record], f: BinaryIO) -> int:
+    """Write ``records`` to the seekable binary file ``f`` in the packed layout; returns the number of documents."""
+    string_offsets: list[int] = [0]
+    document_offsets: list[int] = [0]
+    en_counts: list[int] = []
+    f.write(b'\0' * HEADER_SIZE)
+    position: int = 0
+    for record in records:
+        en_body: list[str] = list(record['en_body'])
+        strings: list[str] = [str(record.get(field) or '') for field in METADATA_FIELDS] + en_body + list(record['ja_body'])
+        for string in strings:
+            data: bytes = string.encode('utf-8')
+            f.write(data)
+            position += len(data)
+            string_offsets.append(position)
+        document_offsets.append(len(string_offsets) - 1)
+        en_counts.append(len(en_body))
+
+    f.write(b'\0' * (_aligned(HEADER_SIZE + position) - HEADER_SIZE - position))
+    f.write(np.array(string_offsets, dtype='<i8').tobytes())
+    f.write(np.array(document_offsets, dtype='<i8').tobytes())
+    f.write(np.array(en_counts, dtype='<i4').tobytes())
+    end: int = f.tell()
+    # ヘッダは最後に書き、途中で中断したファイルは開けないようにする
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, len(en_counts), len(string_offsets) - 1, position))
+    f.seek(end)
+    return len(en_counts)
+
+
+class PackedDocument:
+    """A document of a :class:`PackedCorpus`; fields are decoded when accessed."""
+    __slots__ = ('corpus', 'index')
+
+    def __init__(self, corpus: 'PackedCorpus', index: int) -> None:
+        self.corpus: PackedCorpus = corpus
+        self.index: int = index
+
+    def _field(self, k: int) -> str:
+        return self.corpus.string(int(self.corpus.documents[self.index]) + k)
+
+    @property
+    def id(self) -> str:
+        return self._field(0)
+
+    @property
+    def en_URI(self) -> str:
+        return self._field(1)
+
+    @property
+    def ja_URI(self) -> str:
+        return self._field(2)
+
+    @property
+    def ja_date(self) -> str:
+        return self._field(3)
+
+    def _range(self, lang: str) -> range:
+        start: int = int(self.corpus.documents[self.index]) + len(METADATA_FIELDS)
+        middle: int = start + int(self.corpus.en_counts[self.index])
+        if lang == 'en':
+            return range(start, middle)
+        return range(middle, int(self.corpus.documents[self.index + 1]))
+
+    def paragraphs(self, lang: str) -> list[str]:
+        return [self.corpus.string(k) for k in self._range(lang)]
+
+    def paragraph_count(self, lang: str) -> int:
+        return len(self._range(lang))
+
+    @property
+    def en_body(self) -> list[str]:
+        return self.paragraphs('en')
+
+    @property
+    def ja_body(self) -> list[str]:
+        return self.paragraphs('ja')
+
+    def to_document(self) -> Document:
+        return Document(self.id, self.en_URI, self.ja_URI, self.en_body, self.ja_body, self.ja_date)
+
+
+class PackedCorpus:
+    """Read-only view of packed records over a shared-memory block or a memory-mapped file."""
+
+    def __init__(self, buffer: memoryview, handle: str, shm: Optional[shared_memory.SharedMemory] = None,
+                 mapping: Optional[mmap.mmap] = None, owner: bool = False) -> None:
+        magic, documents, strings, text_size = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f'{handle}: not a packed corpus')
+        self.handle: str = handle
+        self._buffer: memoryview = buffer
+        self._shm: Optional[shared_memory.SharedMemory] = shm
+        self._mmap: Optional[mmap.mmap] = mapping
+        self._owner: bool = owner
+        self._ids: Optional[dict[str, int]] = None
+        self.text: memoryview = buffer[HEADER_SIZE:HEADER_SIZE + text_size]
+        offset: int = _aligned(HEADER_SIZE + text_size)
+        self.strings: np.ndarray = np.frombuffer(buffer, dtype='<i8', count=strings + 1, offset=offset)
+        offset += 8 * (strings + 1)
+        self.documents: np.ndarray = np.frombuffer(buffer, dtype='<i8', count=documents + 1, offset=offset)
+        offset += 8 * (documents + 1)
+        self.en_counts: np.ndarray = np.frombuffer(buffer, dtype='<i4', count=documents, offset=offset)
+
+    @classmethod
+    def open(cls, path: Path) -> 'PackedCorpus':
+        """Memory-map a ``.pack`` file written by :func:`pack_file`."""
+        with path.open('rb') as f:
+            mapping: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(memoryview(mapping), str(path), mapping=mapping)
+
+    @classmethod
+    def attach(cls, handle: str) -> 'PackedCorpus':
+        """Attach to the corpus another process created, given its ``handle``."""
+        if not handle.startswith(SHM_PREFIX):
+            return cls.open(Path(handle))
+        shm: shared_memory.SharedMemory = shared_memory.SharedMemory(name=handle[len(SHM_PREFIX):])
+        return cls(shm.buf, handle, shm=shm)
+
+    def __len__(self) -> int:
+        return len(self.en_counts)
+
+    def __getitem__(self, index: int) -> PackedDocument:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return PackedDocument(self, index)
+
+    def __iter__(self) -> Iterator[PackedDocument]:
+        return (PackedDocument(self, index) for index in range(len(self)))
+
+    def string(self, k: int) -> str:
+        return str(self.text[int(self.strings[k]):int(self.strings[k + 1])], 'utf-8')
+
+    def index(self, doc_id: str) -> int:
+        """Position of the document ``doc_id`` (the id table is built on first use)."""
+        if self._ids is None:
+            self._ids = {self.string(int(start)): i for i, start in enumerate(self.documents[:-1])}
+        return self._ids[doc_id]
+
+    def close(self) -> None:
+        """Release the views; the owner of a shared-memory corpus also frees the block."""
+        # numpy のビューが残っていると共有メモリを閉じられない
+        del self.text, self.strings, self.documents, self.en_counts
+        self._buffer.release()
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self) -> 'PackedCorpus':
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def pack_file(records: Iterable[Record], path: Path) -> int:
+    """Pack ``records`` into the file ``path``; returns the number of documents."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary: Path = path.with_name(path.name + '.tmp')
+    with temporary.open('wb') as f:
+        count: int = pack_records(records, f)
+    temporary.replace(path)
+    return count
+
+
+def share_records(records: Iterable[Record]) -> PackedCorpus:
+    """Pack ``records`` into a new shared-memory block owned by the returned corpus (close it to free the block)."""
+    # 一時ファイル経由で詰め、親プロセスでも二重に持たないようにする
+    with tempfile.TemporaryFile() as f:
+        pack_records(records, f)
+        size: int = f.tell()
+        shm: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=size)
+        f.seek(0)
+        f.readinto(shm.buf[:size])
+    return PackedCorpus(shm.buf, SHM_PREFIX + shm.name, shm=shm, owner=True)
+
+
+def open_corpus(paths: Iterable[Path]) -> PackedCorpus:
+    """A single ``.pack`` file is mapped as is; extractor outputs are packed into shared memory."""
+    paths = list(paths)
+    if len(paths) == 1 and paths[0].suffix == '.pack':
+        return PackedCorpus.open(paths[0])
+    return share_records(iter_records(paths))
+
+
+_worker_corpus: Optional[PackedCorpus] = None
+
+
+def attach_worker(handle: str) -> None:
+    """Pool initializer: attach this worker to the corpus behind ``handle``."""
+    global _worker_corpus
+    _worker_corpus = PackedCorpus.attach(handle)
+
+
+def worker_corpus() -> PackedCorpus:
+    if _worker_corpus is None:
+        raise RuntimeError('attach_worker() has not been called in this process')
+    return _worker_corpus
@@ -0,0 +1,135 @@
+"""Cheap rejection of pages before any DOM is built.
+
+At fetch time a response is rejected when its status is an error or its
+``<title>`` carries a soft-404 signature, and the page is not saved.  At
+extract time the raw bytes of a saved page are searched for the site's
+container marker (``div#main``, ``section.content-section``, ...); a page
+without it would extract to nothing, so it is rejected before BeautifulSoup
+sees it.  The markers only ever err on the side of keeping a page: they match
+the attribute anywhere in the file, whatever element carries it.
+
+With ``--rejections`` the rejections are kept in a TSV (``stage``, ``key``,
+``reason``) shared by the downloaders and the extractors; a page that passes
+a stage drops out of it.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+from requests import Response
+from tqdm import tqdm
+
+REJECTIONS_HEADER: str = 'stage\tkey\treason'
+# ソフト 404 の判定はページ先頭（<title>）だけを見る
+HEAD_BYTES: int = 1 << 14
+SOFT_404: re.Pattern[bytes] = re.compile(
+    rb'<title[^>]*>[^<]*(?:\b404\b|not found|' + 'ページが見つかりません|お探しのページ'.encode('utf-8') + rb')[^<]*</title>',
+    re.IGNORECASE,
+)
+
+
+def id_marker(value: str) -> re.Pattern[bytes]:
+    return re.compile(rb'(?i:\bid)\s*=\s*["\']?' + re.escape(value.encode('utf-8')) + rb'(?![\w-])')
+
+
+def class_marker(value: str) -> re.Pattern[bytes]:
+    return re.compile(rb'(?i:\bclass)\s*=\s*["\']?[^"\'>]*?(?<![\w-])' + re.escape(value.encode('utf-8')) + rb'(?![\w-])')
+
+
+@dataclass(frozen=True)
+class ContainerMarker:
+    """A container the extractor needs; present when any of ``patterns`` occurs in the page."""
+    name: str
+    patterns: tuple[re.Pattern[bytes], ...]
+
+    def present(self, data: bytes) -> bool:
+        return any(pattern.search(data) for pattern in self.patterns)
+
+
+def fetch_rejection(response: Response) -> Optional[str]:
+    """Why a fetched page should not be saved, or None."""
+    if response.status_code >= 400:
+        return f'HTTP {response.status_code}'
+    if SOFT_404.search(response.content[:HEAD_BYTES]):
+        return 'soft 404'
+    return None
+
+
+def container_rejection(data: bytes, markers: tuple[ContainerMarker, ...]) -> Optional[str]:
+    """Why a saved page cannot contain the extractor's container, or None."""
+    for marker in markers:
+        if not marker.present(data):
+            return f'no {marker.name}'
+    return None
+
+
+class PreFilter:
+    """Applies the fetch-time and extract-time checks and records the rejections."""
+
+    def __init__(self, path: Optional[Path], enabled: bool = True, log: Callable[[str], None] = tqdm.write) -> None:
+        self.path: Optional[Path] = path
+        self.enabled: bool = enabled
+        self.log: Callable[[str], None] = log
+        self.rejections: dict[tuple[str, str], str] = {}
+        self.counts: dict[str, int] = {}
+        self.lock: threading.Lock = threading.Lock()
+        if path is not None and path.exists():
+            with path.open(encoding='utf-8') as f:
+                next(f, None)
+                for line in f:
+                    stage, key, reason = line.rstrip('\n').split('\t')
+                    self.rejections[(stage, key)] = reason
+
+    def _record(self, stage: str, key: str, reason: Optional[str]) -> bool:
+        with self.lock:
+            if reason is None:
+                self.rejections.pop((stage, key), None)
+                return True
+            self.rejections[(stage, key)] = reason
+            self.counts[reason] = self.counts.get(reason, 0) + 1
+        self.log(f'Rejected ({stage}): {key}: {reason}')
+        return False
+
+    def check_response(self, key: str, response: Response) -> bool:
+        """True if the response is worth saving; ``key`` is usually the URI."""
+        if not self.enabled:
+            return True
+        return self._record('fetch', key, fetch_rejection(response))
+
+    def read_page(self, path: Path, markers: tuple[ContainerMarker, ...]) -> Optional[str]:
+        """The decoded page, or None if it is missing or lacks one of the container markers."""
+        if not path.exists():
+            self.log(f'Missing page: {path}')
+            return None
+        data: bytes = path.read_bytes()
+        if self.enabled and not self._record('extract', path.name, container_rejection(data, markers)):
+            return None
+        # read_text と同じく改行を \n に揃える
+        return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+    def summary(self) -> str:
+        return 'Pre-filter: ' + (', '.join(f'{count} {reason}' for reason, count in sorted(self.counts.items())) or 'nothing rejected')
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('w', encoding='utf-8') as f:
+            f.write(REJECTIONS_HEADER + '\n')
+            for (stage, key), reason in sorted(self.rejections.items()):
+                f.write(f'{stage}\t{key}\t{reason}\n')
+
+
+def prefilter_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--prefilter/--no_prefilter`` and ``--rejections`` options to a click command."""
+    func = click.option('--rejections', default=None, type=click.Path(dir_okay=False, path_type=Path), help="TSV recording the pages rejected before parsing, with reasons")(func)
+    func = click.option('--prefilter/--no_prefilter', default=True, help="Reject error pages and pages without the content container before parsing")(func)
+    return func
+
+
+def make_prefilter(prefilter: bool, rejections: Optional[Path], log: Callable[[str], None] = tqdm.write) -> PreFilter:
+    """Build a :class:`PreFilter` from the values of :func:`prefilter_options`."""
+    return PreFilter(rejections, enabled=prefilter, log=log)
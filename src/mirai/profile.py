@@ -0,0 +1,196 @@
+"""Per-document cost profiling for the extractors.
+
+With ``--profile REPORT`` every document gets its input size, DOM node count,
+parse and extract time and tracemalloc peak recorded, and the report ranks
+the worst offenders.  ``--profile_cprofile DIR`` additionally runs cProfile
+around the parse/extract stages of each document and keeps the ``.prof``
+dumps of the top-N documents only.  Both add overhead (tracemalloc roughly
+doubles parse time), so timings are comparable between documents of one run
+rather than to unprofiled runs.  Without ``--profile`` the hooks do nothing.
+Stages run in the watchdog's worker process report their times and node
+counts back, but not their tracemalloc peak or cProfile data.
+"""
+import cProfile
+import heapq
+import io
+import json
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+import click
+from tqdm import tqdm
+
+SORT_KEYS: dict[str, Callable[['DocumentProfile'], float]] = {
+    'time': lambda doc: doc.parse + doc.extract,
+    'memory': lambda doc: doc.peak,
+    'nodes': lambda doc: doc.nodes,
+    'bytes': lambda doc: doc.bytes,
+}
+
+
+@dataclass(slots=True)
+class DocumentProfile:
+    id: str
+    bytes: int = 0
+    nodes: int = 0
+    parse: float = 0.0
+    extract: float = 0.0
+    peak: int = 0
+    profile: Optional[cProfile.Profile] = field(default=None, repr=False)
+    enabled: bool = True
+
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+        try:
+            yield
+        finally:
+            if self.profile is not None:
+                self.profile.disable()
+            setattr(self, stage, getattr(self, stage) + time.perf_counter() - start)
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Time a ``parse`` or ``extract`` stage; may be entered several times per document."""
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def add_input(self, *paths: Path) -> None:
+        """Add the sizes of input files (missing ones are ignored)."""
+        if self.enabled:
+            self.bytes += sum(path.stat().st_size for path in paths if path.exists())
+
+    def count_nodes(self, *soups: Any) -> None:
+        """Add the number of DOM nodes of the given BeautifulSoup trees."""
+        if self.enabled:
+            self.nodes += sum(sum(1 for _ in soup.descendants) for soup in soups)
+
+    def detached(self) -> 'DocumentProfile':
+        """A blank profile of the same document for stages run in another process."""
+        return DocumentProfile(self.id, enabled=self.enabled)
+
+    def absorb(self, other: 'DocumentProfile') -> None:
+        """Add the node count and stage times of a :meth:`detached` profile."""
+        self.nodes += other.nodes
+        self.parse += other.parse
+        self.extract += other.extract
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'id': self.id,
+            'bytes': self.bytes,
+            'nodes': self.nodes,
+            'parse': round(self.parse, 6),
+            'extract': round(self.extract, 6),
+            'peak': self.peak,
+        }
+
+
+class ExtractionProfiler:
+    def __init__(self, report: Optional[Path] = None, top: int = 20, sort: str = 'time', cprofile_dir: Optional[Path] = None,
+                 log: Callable[[str], None] = tqdm.write) -> None:
+        self.report: Optional[Path] = report
+        self.top: int = top
+        self.key: Callable[[DocumentProfile], float] = SORT_KEYS[sort]
+        self.sort: str = sort
+        self.cprofile_dir: Optional[Path] = cprofile_dir
+        self.log: Callable[[str], None] = log
+        self.documents: list[DocumentProfile] = []
+        # cProfile を保持するのは上位 N 件だけ（最小ヒープ）
+        self._worst: list[tuple[float, int, DocumentProfile]] = []
+        self._inert: DocumentProfile = DocumentProfile('', enabled=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.report is not None
+
+    @contextmanager
+    def document(self, doc_id: str, *paths: Path) -> Iterator[DocumentProfile]:
+        """Profile one document; ``paths`` are its input files, whose sizes are recorded."""
+        if not self.enabled:
+            yield self._inert
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline: int = tracemalloc.get_traced_memory()[0]
+        doc: DocumentProfile = DocumentProfile(str(doc_id))
+        doc.add_input(*paths)
+        if self.cprofile_dir is not None:
+            doc.profile = cProfile.Profile()
+        try:
+            yield doc
+        finally:
+            doc.peak = tracemalloc.get_traced_memory()[1] - baseline
+            self.documents.append(doc)
+            if doc.profile is not None:
+                self._keep_profile(doc)
+
+    def _keep_profile(self, doc: DocumentProfile) -> None:
+        entry: tuple[float, int, DocumentProfile] = (self.key(doc), len(self.documents), doc)
+        if len(self._worst) < self.top:
+            heapq.heappush(self._worst, entry)
+            return
+        dropped: DocumentProfile = heapq.heappushpop(self._worst, entry)[2]
+        dropped.profile = None
+
+    def ranked(self) -> list[DocumentProfile]:
+        return sorted(self.documents, key=self.key, reverse=True)[:self.top]
+
+    def write_report(self) -> None:
+        """Write the JSON report, log the top-N table and dump the kept cProfile data."""
+        if not self.enabled:
+            return
+        tracemalloc.stop()
+        worst: list[DocumentProfile] = self.ranked()
+        total: dict[str, float] = {
+            'documents': len(self.documents),
+            'bytes': sum(doc.bytes for doc in self.documents),
+            'parse': round(sum(doc.parse for doc in self.documents), 6),
+            'extract': round(sum(doc.extract for doc in self.documents), 6),
+        }
+        self.report.parent.mkdir(parents=True, exist_ok=True)
+        self.report.write_text(json.dumps({
+            'sort': self.sort,
+            'total': total,
+            'top': [doc.as_dict() for doc in worst],
+            'documents': [doc.as_dict() for doc in self.documents],
+        }, ensure_ascii=False, indent='\t'), encoding='utf-8')
+
+        self.log(f"Profiled {total['documents']} documents: parse {total['parse']:.2f}s, extract {total['extract']:.2f}s")
+        self.log(f"{'rank':>4} {'parse':>8} {'extract':>8} {'peak MiB':>9} {'nodes':>8} {'KiB':>8}  id")
+        for rank, doc in enumerate(worst, start=1):
+            self.log(f'{rank:>4} {doc.parse:>8.3f} {doc.extract:>8.3f} {doc.peak / 2**20:>9.1f} {doc.nodes:>8} {doc.bytes / 1024:>8.0f}  {doc.id}')
+
+        if self.cprofile_dir is not None:
+            self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+            for rank, doc in enumerate(worst, start=1):
+                if doc.profile is None:
+                    continue
+                stem: str = f'{rank:03d}_' + re.sub(r'[^\w.-]', '_', doc.id)
+                doc.profile.dump_stats(self.cprofile_dir / f'{stem}.prof')
+                text: io.StringIO = io.StringIO()
+                pstats.Stats(doc.profile, stream=text).sort_stats('cumulative').print_stats(30)
+                (self.cprofile_dir / f'{stem}.txt').write_text(text.getvalue(), encoding='utf-8')
+            self.log(f'cProfile output written to {self.cprofile_dir}')
+
+
+def profile_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--profile``/``--profile_top``/``--profile_sort``/``--profile_cprofile`` options to a click command."""
+    func = click.option('--profile_cprofile', default=None, type=click.Path(file_okay=False, path_type=Path), help="Also write cProfile output of the top documents to this directory")(func)
+    func = click.option('--profile_sort', default='time', type=click.Choice(list(SORT_KEYS)), help="Ranking of the profile report")(func)
+    func = click.option('--profile_top', default=20, type=int, help="Number of documents in the profile report")(func)
+    func = click.option('--profile', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Write a per-document cost report (JSON) to this file")(func)
+    return func
+
+
+def make_profiler(profile: Optional[Path], profile_top: int, profile_sort: str, profile_cprofile: Optional[Path],
+                  log: Callable[[str], None] = tqdm.write) -> ExtractionProfiler:
+    """Build an :class:`ExtractionProfiler` from the values of :func:`profile_options`."""
+    return ExtractionProfiler(profile, top=profile_top, sort=profile_sort, cprofile_dir=profile_cprofile if profile else None, log=log)
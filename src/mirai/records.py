@@ -0,0 +1,84 @@
+"""Reading the records written by the per-source extractors."""
+import json
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import urlsplit
+
+Record = dict[str, str | list[str]]
+
+SOURCE_HOSTS: dict[str, str] = {
+    'fsa.go.jp': 'fsa',
+    'meti.go.jp': 'meti',
+    'mof.go.jp': 'mof',
+    'kantei.go.jp': 'kantei',
+}
+
+
+def record_source(record: Record) -> str:
+    """Return the source name of a record, judged from the host of its English URI.
+
+    IDs are not reliable for this: MOF IDs are bare hashes without a prefix.
+    """
+    host: str = urlsplit(str(record['en_URI'])).netloc
+    for suffix, source in SOURCE_HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return source
+    return 'unknown'
+
+
+def record_year_month(record: Record) -> str:
+    """Return YYYYMM of the record's ``ja_date``, or ``unknown`` if it has none."""
+    date: str = str(record.get('ja_date') or '')
+    if len(date) >= 7 and date[:4].isdigit() and date[5:7].isdigit():
+        return date[:4] + date[5:7]
+    return 'unknown'
+
+
+def iter_json_array(path: Path, chunk_size: int = 1 << 20) -> Iterator[Record]:
+    """Yield the elements of a JSON array file one by one, reading it in chunks."""
+    decoder: json.JSONDecoder = json.JSONDecoder()
+    with path.open(encoding='utf-8') as f:
+        buffer: str = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{path}: not a JSON array')
+        position: int = 1
+        eof: bool = False
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # 要素が読み込み済みの範囲をまたいでいる
+                if eof:
+                    raise
+                chunk: str = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+            position = end
+
+
+def iter_records(paths: Iterable[Path]) -> Iterator[Record]:
+    """Yield records from extractor outputs (JSON arrays) and live datasets (JSONL), streaming both."""
+    for path in paths:
+        if path.suffix == '.jsonl':
+            with path.open(encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from iter_json_array(path)
+
+
+def unique_records(paths: Iterable[Path]) -> list[Record]:
+    """Load records, keeping only the last occurrence of each ``id``."""
+    records: dict[str, Record] = {}
+    for record in iter_records(paths):
+        records.pop(str(record['id']), None)
+        records[str(record['id'])] = record
+    return list(records.values())
@@ -0,0 +1,149 @@
+"""Rule-based sentence segmentation and length-based sentence alignment.
+
+English sentences end at ``.``, ``!`` or ``?`` (with any closing quotes or
+brackets) followed by whitespace and an upper-case letter, digit or opening
+quote, unless the word before the period is a known abbreviation, an initial
+or an initialism such as ``U.S.``; decimals never match because no
+whitespace follows their point.  Japanese sentences end at ``。``, ``！``,
+``？``, ``!`` or ``?`` outside 「」『』（）【】〔〕 and curly quotes, so a quoted
+sentence stays part of the sentence that quotes it.  Line breaks inside a
+paragraph (list items) always end a sentence in both languages.
+
+Within an aligned paragraph pair, sentences are aligned with a Gale-Church
+style dynamic program over character lengths.  The expected EN/JA length
+ratio is taken from the paragraph pair itself, so no corpus-wide model is
+needed.  Beads are 1-1, 1-2, 2-1, 2-2, 1-0 and 0-1; sentences in 1-0 and 0-1
+beads are left unaligned.
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+EN_ABBREVIATIONS: frozenset[str] = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'no', 'nos', 'art', 'arts', 'para', 'paras', 'sec', 'secs',
+    'vol', 'vols', 'fig', 'figs', 'p', 'pp', 'approx', 'e.g', 'i.e', 'cf', 'vs', 'inc', 'ltd', 'co', 'corp', 'dept', 'govt',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec', 'est', 'min', 'max', 'op',
+})
+EN_BOUNDARY: re.Pattern[str] = re.compile(r'[.!?]+["\'”’)\]]*\s+(?=["\'“‘(\[]?[A-Z0-9])')
+EN_INITIALISM: re.Pattern[str] = re.compile(r'(?:[A-Za-z]\.)+[A-Za-z]|[A-Z]')
+JA_TOKEN: re.Pattern[str] = re.compile(r'[「『（(【〔“‘]|[」』）)】〕”’]|[。！？!?]+')
+JA_OPENERS: frozenset[str] = frozenset('「『（(【〔“‘')
+JA_CLOSERS: frozenset[str] = frozenset('」』）)】〕”’')
+
+# (JA 文数, EN 文数) と事前確率（Gale & Church 1993）
+BEADS: tuple[tuple[int, int, float], ...] = (
+    (1, 1, -math.log(0.89)),
+    (1, 0, -math.log(0.0099 / 2)),
+    (0, 1, -math.log(0.0099 / 2)),
+    (2, 1, -math.log(0.089 / 2)),
+    (1, 2, -math.log(0.089 / 2)),
+    (2, 2, -math.log(0.011)),
+)
+LENGTH_VARIANCE: float = 6.8
+
+
+def segment_en(paragraph: str) -> list[str]:
+    """Split an English paragraph into sentences."""
+    sentences: list[str] = []
+    for line in paragraph.split('\n'):
+        start: int = 0
+        for match in EN_BOUNDARY.finditer(line):
+            if line[match.start()] == '.':
+                word: str = line[line.rfind(' ', 0, match.start()) + 1:match.start()].lstrip('("\'“‘[')
+                if word.lower() in EN_ABBREVIATIONS or EN_INITIALISM.fullmatch(word):
+                    continue
+            sentence: str = line[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        sentence = line[start:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def segment_ja(paragraph: str) -> list[str]:
+    """Split a Japanese paragraph into sentences, keeping quoted sentences inside their sentence."""
+    sentences: list[str] = []
+    for line in paragraph.split('\n'):
+        start: int = 0
+        depth: int = 0
+        for match in JA_TOKEN.finditer(line):
+            token: str = match.group()
+            if token in JA_OPENERS:
+                depth += 1
+            elif token in JA_CLOSERS:
+                depth = max(0, depth - 1)
+            elif depth == 0:
+                sentence: str = line[start:match.end()].strip()
+                if sentence:
+                    sentences.append(sentence)
+                start = match.end()
+        sentence = line[start:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def bead_cost(ja_length: int, en_length: int, ratio: float) -> float:
+    """Negative log probability of the length pair, given the expected EN/JA ratio."""
+    expected: float = ja_length * ratio
+    mean: float = (expected + en_length) / 2
+    if mean == 0:
+        return 0.0
+    delta: float = (en_length - expected) / math.sqrt(LENGTH_VARIANCE * ratio * mean)
+    return -math.log(max(math.erfc(abs(delta) / math.sqrt(2)), 1e-300))
+
+
+@dataclass(slots=True)
+class SentencePair:
+    en: list[str]
+    ja: list[str]
+    cost: float
+
+    @property
+    def bead(self) -> str:
+        return f'{len(self.en)}-{len(self.ja)}'
+
+
+def align_sentences(en_sentences: list[str], ja_sentences: list[str]) -> list[SentencePair]:
+    """Align the sentences of one paragraph pair; returns the beads with sentences on both sides."""
+    if not en_sentences or not ja_sentences:
+        return []
+    if len(en_sentences) == 1 and len(ja_sentences) == 1:
+        return [SentencePair(en_sentences, ja_sentences, 0.0)]
+    en_lengths: list[int] = [len(sentence) for sentence in en_sentences]
+    ja_lengths: list[int] = [len(sentence) for sentence in ja_sentences]
+    ratio: float = max(sum(en_lengths), 1) / max(sum(ja_lengths), 1)
+
+    rows: int = len(ja_sentences) + 1
+    columns: int = len(en_sentences) + 1
+    cost: list[list[float]] = [[math.inf] * columns for _ in range(rows)]
+    back: list[list[Optional[tuple[int, int, float]]]] = [[None] * columns for _ in range(rows)]
+    cost[0][0] = 0.0
+    for i in range(rows):
+        for j in range(columns):
+            if cost[i][j] == math.inf:
+                continue
+            for di, dj, prior in BEADS:
+                if i + di >= rows or j + dj >= columns:
+                    continue
+                step: float = prior + bead_cost(sum(ja_lengths[i:i + di]), sum(en_lengths[j:j + dj]), ratio)
+                if cost[i][j] + step < cost[i + di][j + dj]:
+                    cost[i + di][j + dj] = cost[i][j] + step
+                    back[i + di][j + dj] = (di, dj, step)
+
+    pairs: list[SentencePair] = []
+    i, j = rows - 1, columns - 1
+    while i or j:
+        di, dj, step = back[i][j]
+        if di and dj:
+            pairs.append(SentencePair(en_sentences[j - dj:j], ja_sentences[i - di:i], step))
+        i, j = i - di, j - dj
+    pairs.reverse()
+    return pairs
+
+
+def paragraph_pairs(en_paragraph: str, ja_paragraph: str) -> list[SentencePair]:
+    return align_sentences(segment_en(en_paragraph), segment_ja(ja_paragraph))
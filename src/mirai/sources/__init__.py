@@ -0,0 +1,22 @@
+"""Per-source download and extraction stages.
+
+Every source package has a download stage (``mirai fetch <source>``) and an
+extract stage (``mirai extract <source>``), each a click command named
+``main``.  Like the numbered scripts they replace, they are meant to be run
+from the source's working directory (``src/<source>``).
+"""
+SOURCES: tuple[str, ...] = ('fsa', 'meti', 'mof', 'kantei')
+
+FETCH_COMMANDS: dict[str, str] = {
+    'fsa': 'mirai.sources.fsa.download:main',
+    'meti': 'mirai.sources.meti.download:main',
+    'mof': 'mirai.sources.mof.download:main',
+    'kantei': 'mirai.sources.kantei.backfill:main',
+}
+
+EXTRACT_COMMANDS: dict[str, str] = {
+    'fsa': 'mirai.sources.fsa.extract:main',
+    'meti': 'mirai.sources.meti.extract:main',
+    'mof': 'mirai.sources.mof.extract:main',
+    'kantei': 'mirai.sources.kantei.extract:main',
+}
@@ -0,0 +1 @@
+"""Financial Services Agency (fsa)."""
@@ -0,0 +1,161 @@
+import hashlib
+import re
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import click
+from bs4 import BeautifulSoup
+from requests import Response
+from typing import Optional
+from re import Match
+from tqdm import tqdm
+
+from mirai.document import PAIR_TSV_HEADER
+from mirai.feeds import FeedDiscovery, feed_options, make_discovery
+from mirai.gate import PairGate, gate_options, make_gate
+from mirai.prefilter import PreFilter, make_prefilter, prefilter_options
+from mirai.sources.fsa.extract import contains_not_found, extract_main_text_from_html
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+DOC_ID_PREFIX: str = 'fsa_'
+DEFAULT_HTML_DIR: str = 'html'
+DEFAULT_BASE_URI: str = 'https://www.fsa.go.jp/'
+DEFAULT_INDEX_URI: str = 'https://www.fsa.go.jp/en/news/index.html'
+DEFAULT_INDEX_FILE: str = 'index.html'
+DEFAULT_DELAY: float = 1.0
+
+
+def download_file(session: PoliteSession, url: str, destination: Path, prefilter: PreFilter) -> bool:
+    """指定URLからコンテンツを取得し、ファイルへ保存する。エラーページは保存しない。"""
+    response: Response = session.get(url)
+    if not prefilter.check_response(url, response):
+        return False
+    response.encoding = response.apparent_encoding
+    # 再ダウンロードを避けるため、取得結果をファイルへ書き出す
+    with open(destination, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    tqdm.write(f'Saved to {destination}')
+    return True
+
+
+def read_paragraphs(path: Path) -> list[str]:
+    """抽出処理と同じ手順で本文の段落を取り出す。"""
+    return extract_main_text_from_html(BeautifulSoup(path.read_text(encoding='utf-8'), 'html.parser'))
+
+
+def process_document(session: PoliteSession, en_uri: str, base_uri: str, html_directory: Path, gate: PairGate,
+                     prefilter: PreFilter) -> Optional[str]:
+    """英語ページと、そこからリンクされた日本語ページを取得し、TSV の1行を返す。
+
+    対訳にならないページは空文字列、取得に失敗したページは None を返す。
+    """
+    doc_id: str = DOC_ID_PREFIX + hashlib.md5(en_uri.encode()).hexdigest()[:8]
+    base_filename: str = Path(en_uri).stem
+    en_file: Path = html_directory / f'{base_filename}.en'
+    ja_file: Path = html_directory / f'{base_filename}.ja'
+    if not en_file.exists() and not download_file(session, en_uri, en_file, prefilter):
+        return None
+
+    with open(en_file, encoding='utf-8') as f:
+        for line in f:
+            ja_match: Optional[Match[str]] = re.search(r'<a target="_blank" href="(.+?)">Japanese(<img.+?)?</a>', line) # relative uri
+            if ja_match:
+                ja_uri: str = urllib.parse.urljoin(base_uri, ja_match.group(1))
+                tqdm.write(f'Japanese Link Extracted: {ja_uri}')
+                if not ja_file.exists():
+                    # 英語側の抽出に失敗する文書の日本語ページは取得しない
+                    en_paragraphs: list[str] = read_paragraphs(en_file)
+                    if not gate.check_en(en_file.name, en_paragraphs, 'not found' if contains_not_found(en_paragraphs) else None):
+                        return ''
+                    if not download_file(session, ja_uri, ja_file, prefilter):
+                        return None
+                    gate.check_ja(en_file.name, read_paragraphs(ja_file))
+                    return f"{doc_id}\t{ja_file.name}\t{en_file.name}\t{ja_uri}\t{en_uri}"
+                break
+    return ''
+
+
+def is_recent_document(en_uri: str, oldest_yearmonth: int) -> bool:
+    """URI に含まれる日付（YYYYMMDD）が oldest_yearmonth 以降かどうか。"""
+    yearmonth_match: Optional[Match[str]] = re.search(r'(20\d{6})(-\d+)?\.html', en_uri)
+    return bool(yearmonth_match) and int(yearmonth_match.group(1)[:6]) >= oldest_yearmonth
+
+
+def count_lines(filename: Path, encoding: str ='utf-8') -> int:
+    with open(filename, 'r', encoding=encoding) as f:
+        return sum(1 for _ in f)
+
+
+@click.command()
+@click.argument('oldest_yearmonth', type=int)
+@click.argument('output_tsv', type=click.Path(writable=True, path_type=Path))
+@click.option('--html_directory', default=DEFAULT_HTML_DIR, type=click.Path(file_okay=False, path_type=Path))
+@click.option('--base_uri', default=DEFAULT_BASE_URI, type=str)
+@click.option('--index_uri', default=DEFAULT_INDEX_URI, type=str)
+@click.option('--index_file', default=DEFAULT_INDEX_FILE, type=click.Path(path_type=Path))
+@click.option('--delay', default=DEFAULT_DELAY, type=float)
+@throttle_options
+@feed_options
+@gate_options
+@prefilter_options
+def main(oldest_yearmonth: int, output_tsv: Path, html_directory: Path, base_uri: str, index_uri: str, index_file: Path, delay: float,
+         min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path],
+         discovery: str, feeds: tuple[str, ...], feed_state: Path,
+         en_gate: bool, gate_file: Optional[Path], prefilter: bool, rejections: Optional[Path]) -> None:
+    """
+    指定された年月（oldest_yearmonth 以上）より新しい文書のリンクをスクレイピングし、
+    TSV 形式で出力する。
+    """
+    # HTML を保存するディレクトリがなければ作成
+    html_directory.mkdir(parents=True, exist_ok=True)
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, mirror=mirror, record=record)
+    gate: PairGate = make_gate(en_gate, gate_file)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+
+    # フィードが読めればインデックスページは取得しない
+    feed_discovery: FeedDiscovery = make_discovery(discovery, feeds, feed_state, index_uri)
+    english_prefix: str = urllib.parse.urljoin(base_uri, 'en/')
+    feed_uris: Optional[list[str]] = feed_discovery.uris(
+        session, lambda item: item.uri.startswith(english_prefix) and is_recent_document(item.uri, oldest_yearmonth))
+    en_uris: dict[str, None] = dict.fromkeys(feed_uris or [])
+
+    if feed_uris is None:
+        # インデックスファイルが存在しなければダウンロード
+        if not index_file.exists() and not download_file(session, index_uri, index_file, page_filter):
+            raise click.ClickException(f'インデックスページを取得できませんでした: {index_uri}')
+
+        total_lines: int = count_lines(index_file)
+        with open(index_file, 'r', encoding='utf-8') as f:
+            for line in tqdm(f, total=total_lines):
+                match: Optional[Match[str]] = re.search(r'<a href="(.+?)"', line)
+
+                if match:
+                    en_uri: str = urllib.parse.urljoin(base_uri, match.group(1))
+                    if is_recent_document(en_uri, oldest_yearmonth):
+                        tqdm.write(f'English Link Extracted: {en_uri}')
+                        en_uris[en_uri] = None
+
+    # 同一ホストへの同時接続数は PoliteSession 側で制御する
+    tsv_entries: list[str] = []
+    done: list[str] = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        entries = executor.map(lambda uri: process_document(session, uri, base_uri, html_directory, gate, page_filter), en_uris)
+        for en_uri, entry in tqdm(zip(en_uris, entries), total=len(en_uris)):
+            if entry is not None:
+                done.append(en_uri)
+            if entry:
+                tsv_entries.append(entry)
+    tqdm.write(session.controller.summary())
+    tqdm.write(gate.summary())
+    gate.save()
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+
+    with output_tsv.open('w', encoding='utf-8') as f:
+        f.write(PAIR_TSV_HEADER + '\n')
+        f.write('\n'.join(tsv_entries))
+    feed_discovery.commit(done)
+
+
+if __name__ == '__main__':
+    main()
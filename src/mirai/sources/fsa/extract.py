@@ -0,0 +1,466 @@
+import datetime
+import re
+from re import Match, Pattern
+import unicodedata
+from pathlib import Path
+from typing import Iterator, Optional
+import click
+from bs4 import BeautifulSoup, PageElement, Tag
+from tqdm import tqdm
+
+from mirai.boilerplate import BoilerplateStripper, boilerplate_options, make_stripper
+from mirai.document import Document, Pair, read_pairs, write_documents
+from mirai.filters import apply_filters, filter_options
+from mirai.prefilter import ContainerMarker, PreFilter, class_marker, id_marker, make_prefilter, prefilter_options
+from mirai.profile import DocumentProfile, ExtractionProfiler, make_profiler, profile_options
+from mirai.stats import locked_stats
+from mirai.store import locked_store
+from mirai.watchdog import Watchdog, make_watchdog, watchdog_options
+
+# 正規表現パターン（例："平成22年6月30日", "令和元年5月1日", "2010年6月30日"）
+JAPANESE_DATE_REGEX: Pattern[str] = re.compile(
+    r'(?:(平成|令和)(\d{1,2}|元)|(\d{4}))(?:年|月)(\d+)月(\d+)日'
+)
+
+# 本文抽出に必要なコンテナ（<div id="main"> 内の <div class="inner">）
+CONTAINER_MARKERS: tuple[ContainerMarker, ...] = (
+    ContainerMarker("div#main", (id_marker("main"),)),
+    ContainerMarker("div.inner", (class_marker("inner"),)),
+)
+
+
+def parse_japanese_date(match: Optional[Match[str]]) -> str:
+    """正規表現のマッチ結果から日付文字列（YYYY-MM-DD）を生成する．
+
+    Args:
+        match: 日付にマッチした正規表現のMatchオブジェクト
+
+    Returns:
+        マッチした場合はYYYY-MM-DD形式の日付文字列、マッチしなかった場合は空文字
+    """
+    if not match:
+        return ""
+    year: int = 0
+    month: int
+    day: int
+
+    if match.group(1) in ("平成", "令和"):
+        era: str = match.group(1)
+        era_year: str = match.group(2)
+        if era == "平成":
+            base_year: int = 1988
+        else:  # "令和"
+            base_year = 2018
+        if era_year != "元":
+            year = base_year + int(era_year)
+        else:
+            year = base_year
+    else:
+        year = int(match.group(3))
+    month = int(match.group(4))
+    day = int(match.group(5))
+    try:
+        dt: datetime.date = datetime.date(year, month, day)
+    except ValueError:
+        return ""
+    return dt.strftime("%Y-%m-%d")
+
+
+def is_style_right_aligned(element: Tag) -> bool:
+    """style属性が 'text-align:right' であるか判定する．
+    空白や末尾のセミコロンを除去して判定する．
+    """
+    style: str = element.get("style", "")
+    normalized_style: str = style.replace(" ", "").rstrip(";")
+    return normalized_style == "text-align:right"
+
+
+def is_right_aligned(element: Tag) -> bool:
+    """要素が右寄せと判定できるかどうかを返す．
+    具体的には style 属性が 'text-align: right' 系であるか，
+    またはクラスに 'a-right' が含まれているかどうかで判定する．
+    """
+    if is_style_right_aligned(element):
+        return True
+    classes: Optional[list[str] | str] = element.get("class")
+    if isinstance(classes, list) and "a-right" in classes:
+        return True
+    return False
+
+
+def extract_date_from_html(soup: BeautifulSoup) -> str:
+    """HTMLから日付文字列（YYYY-MM-DD）を抽出する．
+    まず<p class="mb0 mt0">内を探し，
+    次に右寄せまたは'a-right'クラスのある<p>や<div>を探索し，
+    最後に'a-center'クラスのある要素から探す．
+    """
+    # 優先: <p class="mb0 mt0">
+    date_element: Optional[Tag] = soup.find("p", class_="mb0 mt0")
+    if date_element:
+        text: str = unicodedata.normalize("NFKC", date_element.get_text('', strip=True).strip())
+        date_str: str = parse_japanese_date(JAPANESE_DATE_REGEX.search(text))
+        if date_str:
+            return date_str
+
+    # 右寄せ、または 'a-right' クラスの要素から探索
+    for element in soup.find_all(["p", "div"]):
+        if is_right_aligned(element):
+            text = unicodedata.normalize("NFKC", element.get_text('', strip=True).strip())
+            date_str = parse_japanese_date(JAPANESE_DATE_REGEX.search(text))
+            if date_str:
+                return date_str
+
+    # 'a-center' クラスの要素から探索
+    for element in soup.find_all(["p", "div"]):
+        classes: Optional[list[str]] = element.get("class")
+        if classes and "a-center" in classes:
+            text = unicodedata.normalize("NFKC", element.get_text('', strip=True).strip())
+            date_str = parse_japanese_date(JAPANESE_DATE_REGEX.search(text))
+            if date_str:
+                return date_str
+
+    return ""
+
+
+def add_trailing_space(text: str) -> str:
+    """文字列の末尾が英字の場合、末尾に半角スペースを追加して返す．"""
+    if text and text[-1].isalpha():
+        return text + " "
+    return text
+
+
+def extract_list_text(list_element: Tag) -> str:
+    """リスト要素(<ul>または<ol>)から各<li>のテキストを取得する．
+
+    入れ子の<li>は明示的なスタックで後順に処理し，入れ子の深さに依存しない．
+    """
+    results: dict[int, str] = {}
+    # (要素, 直下の<li>, 各<li>が内側にリストを持つか, 展開済みか)
+    stack: list[tuple[Tag, list[Tag], list[bool], bool]] = []
+
+    def push(element: Tag) -> None:
+        items: list[Tag] = element.find_all("li", recursive=False)
+        stack.append((element, items, [li.find(["ul", "ol"]) is not None for li in items], False))
+
+    push(list_element)
+    while stack:
+        element, items, nested, expanded = stack.pop()
+        if not expanded:
+            stack.append((element, items, nested, True))
+            for li, has_list in zip(items, nested):
+                if has_list:
+                    push(li)
+            continue
+        result: str = ""
+        for li, has_list in zip(items, nested):
+            # リスト内にさらにリストがあれば，その<li>の結果を使う
+            if has_list:
+                result += results.pop(id(li)) + "\n"
+            else:
+                result += li.get_text('', strip=True).strip() + "\n"
+        results[id(element)] = result.strip()
+    return results[id(list_element)]
+
+
+def extract_text_elements(container: Tag) -> list[str]:
+    """
+    container 内の各要素ごとにテキストを抽出する．
+    見出し、段落、リスト、定義リスト、表などを処理する．
+    入れ子の<div>は子要素のイテレータのスタックで辿り，深さに依存しない．
+    """
+    paragraphs: list[str] = []
+    stack: list[Iterator[PageElement]] = [iter(container.children)]
+    while stack:
+        element: Optional[PageElement] = next(stack[-1], None)
+        if element is None:
+            stack.pop()
+            continue
+        if not isinstance(element, Tag):
+            continue
+
+        text: str = ""
+        tag_name: str = element.name.lower() if element.name else ""
+
+        if tag_name == "div":
+            # div 内部はその場で展開する
+            stack.append(iter(element.children))
+            continue
+
+        elif tag_name == "p":
+            # <br> を含む場合はplain text抽出に任せる
+            if element.find("br"):
+                paragraphs.extend(extract_plain_text(element))
+                continue
+            text = element.get_text('', strip=True).strip()
+
+        elif tag_name in ["h1", "h2", "h3", "h4", "h5", "h6"]:
+            text = element.get_text('', strip=True).strip()
+
+        elif tag_name in ["ul", "ol"]:
+            text = extract_list_text(element).strip()
+
+        elif tag_name == "dl":
+            dt_text: str = "\n".join(dt.get_text('', strip=True).strip() for dt in element.find_all("dt"))
+            dd_text: str = "\n".join(dd.get_text('', strip=True).strip() for dd in element.find_all("dd"))
+            text = (dt_text + "\n" + dd_text).strip()
+
+        elif tag_name == "table":
+            # テーブルは各セルをスペースで、行を改行で結合するが，
+            # 問い合わせ先等の場合は無視する
+            table_text: str = ""
+            for tr in element.find_all("tr"):
+                row_text = " ".join(
+                    td.get_text('', strip=True).strip() for td in tr.find_all(["td", "th"])
+                )
+                table_text += row_text + "\n"
+            if "問い合わせ先" in table_text or "Contact" in table_text:
+                continue
+            text = table_text.strip()
+            text = re.sub(r'\s+\n', '\n', text)
+            text = ''
+        # else:
+        #     text = element.get_text('', strip=True).strip()
+
+        text = re.sub(r'\([Pp]rovisional translation.*?\)', '', text)
+        text = re.sub(r'  +', ' ', text)
+        text = re.sub(r'\n +', '\n', text)
+        text = re.sub(r'\n\n+', '\n', text)
+        text = text.strip()
+
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def extract_plain_text(container: Tag) -> list[str]:
+    """
+    container の子要素からプレーンテキストを抽出する．
+    改行やタグ毎に段落を区切る処理を行う．
+    入れ子の<div>は明示的なスタックで処理し，深さに依存しない．
+    """
+    # (子要素のイテレータ, 段落, 作成中の段落)
+    stack: list[tuple[Iterator[PageElement], list[str], list[str]]] = [(iter(container.children), [], [])]
+    while True:
+        children, paragraphs, current_paragraph = stack[-1]
+        child: Optional[PageElement] = next(children, None)
+        if child is None:
+            if current_paragraph:
+                paragraphs.append("".join(current_paragraph).strip())
+            # 空文字列は除去
+            inner_paragraphs: list[str] = [para for para in paragraphs if para]
+            stack.pop()
+            if not stack:
+                return inner_paragraphs
+            # div 内部の段落は，親の作成中の段落を区切ってから追加する
+            _, paragraphs, current_paragraph = stack[-1]
+            if current_paragraph:
+                paragraphs.append("".join(current_paragraph).strip())
+                current_paragraph.clear()
+            paragraphs.extend(inner_paragraphs)
+            continue
+
+        if isinstance(child, str):
+            current_paragraph.append(add_trailing_space(child.strip()))
+
+        elif isinstance(child, Tag):
+            tag_name: str = child.name.lower() if child.name else ""
+            if tag_name == "h1":
+                if current_paragraph:
+                    paragraphs.append("".join(current_paragraph).strip())
+                    current_paragraph.clear()
+                paragraphs.append(child.get_text(strip=True))
+
+            elif tag_name == "br":
+                if current_paragraph:
+                    paragraphs.append("".join(current_paragraph).strip())
+                    current_paragraph.clear()
+
+            elif tag_name in ["a", "span", "strong"]:
+                current_paragraph.append(add_trailing_space(child.get_text(strip=True)))
+
+            elif tag_name == "div":
+                # div 内部は新しい段落リストで処理する
+                stack.append((iter(child.children), [], []))
+            else:
+                current_paragraph.append(add_trailing_space(child.get_text(strip=True)))
+
+
+def extract_main_text_from_html(soup: BeautifulSoup) -> list[str]:
+    """
+    HTML内の <div id="main"> 以下の本文テキストを抽出する．
+    不要な要素（シェアボタンや連絡先、右寄せなど）は除去する．
+    """
+    paragraphs: list[str] = []
+    main_div: Optional[Tag] = soup.find("div", id="main")
+    if not main_div:
+        return paragraphs
+
+    inner_div: Optional[Tag] = main_div.find("div", class_="inner")
+    if not inner_div:
+        return paragraphs
+
+    content_div: Tag = inner_div
+
+    # 不要な要素の除去
+    for unwanted in content_div.find_all("p", class_="share-button"):
+        unwanted.decompose()
+    for unwanted in content_div.find_all("dl", class_="contact_box"):
+        unwanted.decompose()
+
+    # 右寄せ・notice・caution クラスを持つ要素を除去
+    to_decompose: list[Tag] = []
+    for element in content_div.find_all(["p", "div"]):
+        classes: Optional[list[str]] = element.get("class")
+        if is_style_right_aligned(element):
+            to_decompose.append(element)
+        elif classes and ("a-right" in classes):
+            to_decompose.append(element)
+        elif classes and "notice" in classes:
+            to_decompose.append(element)
+        elif classes and "caution" in classes:
+            to_decompose.append(element)
+    for element in to_decompose:
+        element.decompose()
+
+    # 段落数を判定し，<p>タグがなければ plain text 抽出
+    content_text: str = content_div.get_text()
+    content_text = re.sub(r'\n', '', content_text)
+    content_text = re.sub(r'\s+', ' ', content_text)
+
+    p_tags: list[Tag] = content_div.find_all("p")
+    if not p_tags:
+        paragraphs = extract_plain_text(content_div)
+    else:
+        paragraphs = extract_text_elements(content_div)
+
+    return paragraphs
+
+
+def check_newline_counts(paragraphs_a: list[str], paragraphs_b: list[str]) -> bool:
+    """
+    2つの段落リストにおいて，各段落内の改行数が一致するかチェックする．
+    """
+    for para_a, para_b in zip(paragraphs_a, paragraphs_b):
+        if para_a.count("\n") != para_b.count("\n"):
+            return False
+    return True
+
+
+def contains_not_found(paragraphs: list[str]) -> bool:
+    """
+    段落内に '404 Not Found' が含まれているか判定する．
+    """
+    return any("404 Not Found" in para for para in paragraphs)
+
+
+def extract_paragraphs(doc: DocumentProfile, en_html: str, ja_html: str) -> tuple[list[str], list[str]]:
+    """
+    英日のHTMLを解析し，本文の段落を抽出する．
+    """
+    with doc.stage("parse"):
+        en_soup: BeautifulSoup = BeautifulSoup(en_html, "html.parser")
+        ja_soup: BeautifulSoup = BeautifulSoup(ja_html, "html.parser")
+    doc.count_nodes(en_soup, ja_soup)
+    with doc.stage("extract"):
+        return extract_main_text_from_html(en_soup), extract_main_text_from_html(ja_soup)
+
+
+def extract_date(doc: DocumentProfile, ja_html: str) -> str:
+    """
+    日本語HTMLから日付を抽出する．本文の抽出で木が書き換えられるため解析し直す．
+    """
+    with doc.stage("extract"):
+        return extract_date_from_html(BeautifulSoup(ja_html, "html.parser"))
+
+
+@click.command()
+@click.argument("input_tsv", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("output_json", type=click.Path(dir_okay=False, writable=True, path_type=Path))
+@click.option("--html_directory", "-d", type=click.Path(file_okay=False, path_type=Path), default=Path("html"), help="HTMLファイルが格納されたディレクトリ")
+@click.option("--stats", type=click.Path(dir_okay=False, path_type=Path), default=None, help="抽出結果で更新する統計集計ファイル")
+@click.option("--store", type=click.Path(file_okay=False, path_type=Path), default=None, help="新規・変更分を書き込む統合データストア")
+@filter_options
+@profile_options
+@boilerplate_options
+@prefilter_options
+@watchdog_options
+def main(input_tsv: Path, output_json: Path, html_directory: Path, stats: Optional[Path], store: Optional[Path], quality_filter: bool, filter_config: Optional[Path],
+         profile: Optional[Path], profile_top: int, profile_sort: str, profile_cprofile: Optional[Path],
+         boilerplate: Optional[Path], boilerplate_min_count: int, boilerplate_min_fraction: float,
+         prefilter: bool, rejections: Optional[Path], doc_timeout: float, doc_memory: float, quarantine: Optional[Path]) -> None:
+    """
+    入力TSVとHTMLファイルから記事の本文と日付情報を抽出し、JSONファイルに出力する．
+    """
+    profiler: ExtractionProfiler = make_profiler(profile, profile_top, profile_sort, profile_cprofile)
+    stripper: BoilerplateStripper = make_stripper("fsa", boilerplate, boilerplate_min_count, boilerplate_min_fraction)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+    watchdog: Watchdog = make_watchdog(doc_timeout, doc_memory, quarantine)
+    metadata_list: list[Pair] = read_pairs(input_tsv, "fsa")
+    extracted_data: list[Document] = []
+
+    for record in tqdm(metadata_list, desc="Processing records", unit="record"):
+        tqdm.write(f"Processing ID: {record.id}")
+
+        en_file_path: Path = html_directory / record.en_file
+        ja_file_path: Path = html_directory / record.ja_file
+
+        with watchdog.document(record.id), profiler.document(record.id, en_file_path, ja_file_path) as doc:
+            # コンテナのないページは DOM を構築する前に除外する
+            en_html: Optional[str] = page_filter.read_page(en_file_path, CONTAINER_MARKERS)
+            ja_html: Optional[str] = page_filter.read_page(ja_file_path, CONTAINER_MARKERS) if en_html is not None else None
+            if en_html is None or ja_html is None:
+                continue
+
+            # 予算があれば解析と抽出はワーカープロセスで行う
+            en_paragraphs, ja_paragraphs = watchdog.run(extract_paragraphs, doc, en_html, ja_html)
+
+            # エラー判定
+            if contains_not_found(en_paragraphs) or contains_not_found(ja_paragraphs):
+                tqdm.write(f"Not Found: {record.id}")
+                continue
+            # サイト全体で頻出する段落（定型文）を整合チェック前に除去
+            en_paragraphs, ja_paragraphs = stripper.apply(record.id, en_paragraphs, ja_paragraphs)
+            if not en_paragraphs or not ja_paragraphs:
+                tqdm.write(f"本文取得失敗: {record.id}")
+                continue
+            if len(en_paragraphs) != len(ja_paragraphs):
+                tqdm.write(f"段落数不一致: {record.id} (EN: {len(en_paragraphs)}, JA: {len(ja_paragraphs)})")
+                continue
+            if not check_newline_counts(en_paragraphs, ja_paragraphs):
+                tqdm.write(f"改行数不一致: {record.id}")
+                continue
+
+            ja_date: str = watchdog.run(extract_date, doc, ja_html)
+            if not ja_date:
+                tqdm.write(f"日付抽出失敗: {record.id}")
+                continue
+
+            extracted_data.append(Document(record.id, record.en_URI, record.ja_URI, en_paragraphs, ja_paragraphs, ja_date))
+
+    profiler.write_report()
+    stripper.save(tqdm.write)
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+    tqdm.write(watchdog.summary())
+    watchdog.save()
+    extracted_data = apply_filters(extracted_data, quality_filter, filter_config)
+
+    try:
+        extracted_data = write_documents(output_json, extracted_data)
+    except Exception as e:
+        tqdm.write(f"JSON書き込みエラー: {e}")
+        return
+
+    tqdm.write(f"抽出件数: {len(extracted_data)}")
+
+    if stats:
+        with locked_stats(stats) as aggregate:
+            aggregate.update(extracted_data)
+
+    if store:
+        with locked_store(store) as document_store:
+            tqdm.write(f"Store: {document_store.upsert(extracted_data)}")
+
+
+if __name__ == "__main__":
+    main()
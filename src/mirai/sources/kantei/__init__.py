@@ -0,0 +1 @@
+"""Prime Minister's Office of Japan (kantei)."""
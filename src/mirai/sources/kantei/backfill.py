@@ -0,0 +1,156 @@
+import datetime
+import mmap
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from re import Pattern
+from typing import Iterator, Optional
+import click
+from requests import Response
+from tqdm import tqdm
+
+from mirai.feeds import FeedDiscovery, FeedItem, feed_options, make_discovery
+from mirai.prefilter import PreFilter, make_prefilter, prefilter_options
+from mirai.sources.kantei.fetch import USER_AGENT, fetch, read_jobs
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+BASE_URI: str = 'https://japan.kantei.go.jp'
+INDEX_URI: str = BASE_URI + '/{pm}/actions/{yearmonth}/index.html'
+
+# 首相ごとのアーカイブと対象月（両端を含む。前後の内閣と重なる月は両方で探す）
+ARCHIVES: dict[str, tuple[str, Optional[str]]] = {
+    '103': ('202411', None),
+    '102_ishiba': ('202410', '202411'),
+    '101_kishida': ('202111', '202410'),
+    '100_kishida': ('202110', '202111'),
+    '99_suga': ('202009', '202110'),
+    '98_abe': ('201212', '202009'),
+}
+
+# 1行に複数のリンクがあっても全て拾う（hrefの引用符を越えないようにする）
+URI_PATTERN: Pattern[bytes] = re.compile(rb'href="(/(\d+(_[a-z]+?)?/actions/\d{6}/[^"]+?\.html))"')
+DOCUMENT_PATH: Pattern[str] = re.compile(r'/\d+(_[a-z]+?)?/actions/\d{6}/[^"]+?\.html')
+
+
+def shift_month(yearmonth: str, months: int) -> str:
+    """Shift a YYYYMM string by the given number of months."""
+    index: int = int(yearmonth[:4]) * 12 + int(yearmonth[4:]) - 1 + months
+    return f'{index // 12:04d}{index % 12 + 1:02d}'
+
+
+def iter_months(oldest: str, newest: str) -> Iterator[str]:
+    """Yield YYYYMM strings from OLDEST to NEWEST inclusive."""
+    yearmonth: str = oldest
+    while yearmonth <= newest:
+        yield yearmonth
+        yearmonth = shift_month(yearmonth, 1)
+
+
+def parse_archives(spec: Optional[str], current: str) -> list[tuple[str, str]]:
+    """
+    Expand "pm[:YYYYMM-YYYYMM],..." (default: every archive in ARCHIVES) into (pm, yearmonth) pairs.
+    """
+    ranges: dict[str, tuple[str, Optional[str]]] = {}
+    if spec is None:
+        ranges = dict(ARCHIVES)
+    else:
+        for item in spec.split(','):
+            pm, _, months = item.strip().partition(':')
+            if months:
+                oldest, _, newest = months.partition('-')
+                ranges[pm] = (oldest, newest or None)
+            elif pm in ARCHIVES:
+                ranges[pm] = ARCHIVES[pm]
+            else:
+                raise click.BadParameter(f'Unknown archive without a month range: {pm}', param_hint='--archives')
+    return [(pm, yearmonth) for pm, (oldest, newest) in ranges.items() for yearmonth in iter_months(oldest, min(newest or current, current))]
+
+
+def scan_index(path: Path) -> set[str]:
+    """Return every document path linked from an index page, reading the file through mmap."""
+    if path.stat().st_size == 0:
+        return set()
+    with path.open('rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return {match.group(1).decode('utf-8') for match in URI_PATTERN.finditer(data)}
+
+
+def discover(session: PoliteSession, pm: str, yearmonth: str, index_dir: Path, refresh: set[str]) -> set[str]:
+    """Download one monthly index page unless it is already stored (recent months are re-fetched) and scan it."""
+    path: Path = index_dir / f'{pm}_{yearmonth}.html'
+    if not path.exists() or yearmonth in refresh:
+        response: Response = session.get(INDEX_URI.format(pm=pm, yearmonth=yearmonth))
+        if not response.ok:
+            # 存在しない月は404になるだけなので保存しない
+            if response.status_code != 404:
+                tqdm.write(f'Error: HTTP {response.status_code}: {pm} {yearmonth}')
+            return set()
+        path.write_bytes(response.content)
+    return scan_index(path)
+
+
+def feed_path(item: FeedItem) -> Optional[str]:
+    """The archive path of a feed item, if it is a document page of japan.kantei.go.jp."""
+    if not item.uri.startswith(BASE_URI + '/'):
+        return None
+    path: str = item.uri[len(BASE_URI):]
+    return path if DOCUMENT_PATH.fullmatch(path) else None
+
+
+@click.command()
+@click.argument('index_dir', type=click.Path(file_okay=False, path_type=Path))
+@click.argument('en_dir', type=click.Path(file_okay=False, path_type=Path))
+@click.option('--archives', default=None, help="Comma-separated archives as pm or pm:YYYYMM-YYYYMM (default: all known archives)")
+@click.option('--refresh_months', default=2, type=int, help="Re-download index pages of this many most recent months")
+@click.option('--uri_list', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Also write the discovered URIs to this file")
+@click.option('--index_delay', default=2.0, type=float, help="Delay between index requests in seconds")
+@click.option('--delay', default=3.0, type=float, help="Delay between document requests in seconds")
+@throttle_options
+@feed_options
+@prefilter_options
+def main(index_dir: Path, en_dir: Path, archives: Optional[str], refresh_months: int, uri_list: Optional[Path], index_delay: float, delay: float,
+         min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path],
+         discovery: str, feeds: tuple[str, ...], feed_state: Path,
+         prefilter: bool, rejections: Optional[Path]) -> None:
+    """
+    Back-fill the kantei archives: fetch the monthly index pages of every prime-minister archive into INDEX_DIR,
+    collect the linked English documents and download the missing ones into EN_DIR.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    en_dir.mkdir(parents=True, exist_ok=True)
+    current: str = datetime.date.today().strftime('%Y%m')
+    refresh: set[str] = {shift_month(current, -i) for i in range(refresh_months)}
+    pages: list[tuple[str, str]] = parse_archives(archives, current)
+
+    index_session: PoliteSession = make_session(index_delay, min_concurrency, max_concurrency, throttle_log, headers={'User-Agent': USER_AGENT}, mirror=mirror, record=record)
+    uris: set[str] = set()
+
+    # フィードが読めれば直近の月も保存済みの目次だけで済ませる（未取得の月は取得する）
+    feed_discovery: FeedDiscovery = make_discovery(discovery, feeds, feed_state, BASE_URI + '/')
+    feed_uris: Optional[list[str]] = feed_discovery.uris(index_session, lambda item: feed_path(item) is not None)
+    if feed_uris is not None:
+        uris |= {uri[len(BASE_URI):] for uri in feed_uris}
+        refresh = set()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for found in tqdm(executor.map(lambda page: discover(index_session, page[0], page[1], index_dir, refresh), pages), total=len(pages), desc='Index pages'):
+            uris |= found
+    tqdm.write(f'{len(uris)} documents in {len(pages)} index pages')
+
+    # ソートしてから名前を決めるので、同じURI集合からは毎回同じファイル名になる
+    sorted_uris: list[str] = [BASE_URI + uri for uri in sorted(uris)]
+    if uri_list is not None:
+        uri_list.write_text(''.join(uri + '\n' for uri in sorted_uris), encoding='utf-8')
+    jobs: list[tuple[str, Path]] = [job for job in read_jobs(sorted_uris, en_dir) if not job[1].exists()]
+    tqdm.write(f'{len(jobs)} documents to download')
+
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, headers={'User-Agent': USER_AGENT}, mirror=mirror, record=record)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        list(tqdm(executor.map(lambda job: fetch(session, job[0], job[1], False, page_filter), jobs), total=len(jobs), desc='Documents'))
+    tqdm.write(session.controller.summary())
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+    feed_discovery.commit(uri for uri, path in read_jobs(sorted_uris, en_dir) if path.exists())
+
+
+if __name__ == '__main__':
+    main()
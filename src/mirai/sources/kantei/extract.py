@@ -0,0 +1,291 @@
+import datetime
+import hashlib
+import re
+from re import Match, Pattern
+from typing import Optional, TextIO
+import sys
+from pathlib import Path
+import click
+from tqdm import tqdm
+from bs4 import BeautifulSoup, Tag, NavigableString
+from urllib.parse import urljoin
+
+from mirai.boilerplate import BoilerplateStripper, boilerplate_options, make_stripper
+from mirai.document import Document, write_documents
+from mirai.filters import apply_filters, filter_options
+from mirai.gate import PairGate, gate_options, make_gate
+from mirai.prefilter import ContainerMarker, PreFilter, class_marker, id_marker, make_prefilter, prefilter_options
+from mirai.profile import DocumentProfile, ExtractionProfiler, make_profiler, profile_options
+from mirai.stats import locked_stats
+from mirai.store import locked_store
+from mirai.throttle import PoliteSession, make_session, throttle_options
+from mirai.watchdog import Watchdog, make_watchdog, watchdog_options
+
+BASE_JA_URI: str = 'https://www.kantei.go.jp/'
+BASE_EN_URI: str = 'https://japan.kantei.go.jp/'
+RE_URI: Pattern[str] = re.compile('www.kantei.go.jp/jp/')
+HTML_TAG = Tag | NavigableString
+# get_body_en（新旧どちらかのレイアウト）と get_body_ja が読むコンテナ
+EN_CONTAINER_MARKERS: tuple[ContainerMarker, ...] = (
+    ContainerMarker('div.has-detail-more or div#format', (class_marker('has-detail-more'), id_marker('format'))),
+)
+JA_CONTAINER_MARKERS: tuple[ContainerMarker, ...] = (ContainerMarker('div.section', (class_marker('section'),)),)
+USER_AGENT: str = (
+    'Mozilla/5.0 (Windows NT 12.0; Win32; x86) '
+    'AppleWebKit/934.78 (KHTML, like Gecko) '
+    'Chrome/315.0.0.0 Safari/779.68 Edge/43.29855'
+)
+
+
+def remove_empty_paragraphs(paragraphs: list[str]) -> list[str]:
+    return [para.strip() for para in paragraphs if para.strip() != '']
+
+
+def is_num_newlines(paragraphs0: list[str], paragraphs1: list[str]) -> bool:
+    return all(p0.count('\n') == p1.count('\n') for p0, p1 in zip(paragraphs0, paragraphs1))
+
+
+def get_body_en(soup: BeautifulSoup, version: str) -> Optional[list[str]]:
+    if version not in ['new', 'old']:
+        raise ValueError(f'Invalid version: {version}. Must be "new" or "old".')
+
+    if version == 'new':
+        div = soup.find('div', class_='section has-detail-more')
+    else:
+        div = soup.find('div', id='format')
+
+    if div is None:
+        return None
+
+    aly_div = div.find('div', class_='aly_tx_right')
+    if aly_div:
+        aly_div.decompose()
+
+    for p in div.find_all('p', align='right'):
+        p.decompose()
+
+    for button in div.find_all('button'):
+        button.decompose()
+
+    text: str = div.get_text().strip().replace('\xc2\xa0', ' ')
+    text = re.sub(r'\n\s+\n', '\n\n', text)
+    return remove_empty_paragraphs(text.split('\n\n'))
+
+
+def get_self_uri(soup: BeautifulSoup) -> Optional[str]:
+    meta_tag = soup.find('meta', property='og:url')
+    return meta_tag.get('content') if meta_tag else None
+
+
+def get_japanese_uri(soup: BeautifulSoup) -> Optional[str]:
+    link = soup.find('a', href=RE_URI)
+    if link:
+        uri = link['href']
+        if not uri.startswith('http'):
+            return urljoin(BASE_JA_URI, uri)
+        return uri
+    return None
+
+
+def get_body_ja(soup: BeautifulSoup) -> Optional[list[str]]:
+    div: Optional[HTML_TAG] = soup.find('div', class_='section')
+    if div is None:
+        return None
+
+    paragraphs: list[str] = []
+    for p in div.find_all('p'):
+        text: str = p.get_text().strip().replace('\t', '')
+        paragraphs_in_paragraph = remove_empty_paragraphs(text.split('\n　'))
+        paragraphs.extend(paragraphs_in_paragraph)
+    return paragraphs
+
+
+def get_date_ja(soup: BeautifulSoup) -> Optional[str]:
+    span: Optional[HTML_TAG] = soup.find('span', class_='date')
+    if not span:
+        return None
+
+    dt = convert_str_date_into_datetime(span.get_text())
+    if dt:
+        return dt.isoformat()
+    return None
+
+
+def convert_str_date_into_datetime(str_date: str) -> Optional[datetime.date]:
+    match: Optional[Match[str]] = re.search(r'(平成|令和)(\d{1,2}|元)年(\d{1,2})月(\d{1,2})日', str_date)
+    if match:
+        era, year, month, day = match.groups()
+        if era == '平成':
+            base_year = 1988
+        else:
+            base_year = 2018
+
+        if year == '元':
+            year_num = base_year + 1
+        else:
+            year_num = base_year + int(year)
+
+        return datetime.date(year_num, int(month), int(day))
+    return None
+
+
+def get_version(soup: BeautifulSoup) -> str:
+    return 'new' if soup.find('div', id='top') else 'old'
+
+
+def download_and_save_html(session: PoliteSession, url: str, output_path: Path, prefilter: PreFilter) -> bool:
+    response = session.get(url)
+    if not prefilter.check_response(url, response):
+        return False
+    response.encoding = response.apparent_encoding
+    output_path.write_text(response.text, encoding='utf-8')
+    return True
+
+
+def generate_uid(uri: str) -> str:
+    return hashlib.md5(uri.encode()).hexdigest()[:8]
+
+
+def extract_en(doc: DocumentProfile, en_html: str) -> tuple[Optional[str], Optional[list[str]], Optional[str]]:
+    with doc.stage('parse'):
+        soup: BeautifulSoup = BeautifulSoup(en_html, 'html.parser')
+    doc.count_nodes(soup)
+    with doc.stage('extract'):
+        version: str = get_version(soup)
+        return get_self_uri(soup), get_body_en(soup, version), get_japanese_uri(soup)
+
+
+def extract_ja(doc: DocumentProfile, ja_html: str) -> tuple[Optional[list[str]], Optional[str]]:
+    with doc.stage('parse'):
+        soup: BeautifulSoup = BeautifulSoup(ja_html, 'html.parser')
+    doc.count_nodes(soup)
+    with doc.stage('extract'):
+        return get_body_ja(soup), get_date_ja(soup)
+
+
+@click.command()
+@click.argument('en_directory', type=click.Path(exists=True, path_type=Path))
+@click.argument('ja_directory', type=click.Path(file_okay=False, path_type=Path))
+@click.argument('output_json', type=click.Path(writable=True, path_type=Path))
+@click.option('--delay', default=1.0, type=float, help="Delay between requests in seconds")
+@click.option('--include', default=None, type=click.File('r', encoding='utf-8'), help="Only process the EN file names listed in this file")
+@click.option('--stats', default=None, type=click.Path(dir_okay=False, path_type=Path), help="Statistics aggregate to update with the accepted records")
+@click.option('--store', default=None, type=click.Path(file_okay=False, path_type=Path), help="Consolidated document store to upsert the accepted records into")
+@filter_options
+@profile_options
+@boilerplate_options
+@throttle_options
+@gate_options
+@prefilter_options
+@watchdog_options
+def main(en_directory: Path, ja_directory: Path, output_json: Path, delay: float, include: Optional[TextIO], stats: Optional[Path], store: Optional[Path],
+         quality_filter: bool, filter_config: Optional[Path],
+         profile: Optional[Path], profile_top: int, profile_sort: str, profile_cprofile: Optional[Path],
+         boilerplate: Optional[Path], boilerplate_min_count: int, boilerplate_min_fraction: float,
+         min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path], en_gate: bool, gate_file: Optional[Path],
+         prefilter: bool, rejections: Optional[Path], doc_timeout: float, doc_memory: float, quarantine: Optional[Path]) -> None:
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, headers={'User-Agent': USER_AGENT}, mirror=mirror, record=record)
+    profiler: ExtractionProfiler = make_profiler(profile, profile_top, profile_sort, profile_cprofile)
+    stripper: BoilerplateStripper = make_stripper('kantei', boilerplate, boilerplate_min_count, boilerplate_min_fraction)
+    gate: PairGate = make_gate(en_gate, gate_file)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+    watchdog: Watchdog = make_watchdog(doc_timeout, doc_memory, quarantine)
+    all_data: list[Document] = []
+    ids: set[str] = set()
+
+    file_list = list(en_directory.glob('*'))
+    if include is not None:
+        included: set[str] = {line.strip() for line in include if line.strip()}
+        file_list = [path for path in file_list if path.name in included]
+    total_files = len(file_list)
+
+    for i, en_path in enumerate(tqdm(file_list, total=total_files, desc='Processing files', dynamic_ncols=True), start=1):
+        uid = f'kantei_{generate_uid(str(en_path))}'
+        if uid in ids:
+            tqdm.write(f'Error: 重複したID: {uid}')
+            sys.exit(1)
+        ids.add(uid)
+
+        with watchdog.document(uid), profiler.document(uid, en_path) as doc:
+            # コンテナのないページは DOM を構築する前に除外する
+            en_html: Optional[str] = page_filter.read_page(en_path, EN_CONTAINER_MARKERS)
+            if en_html is None:
+                continue
+            # 予算があれば解析と抽出はワーカープロセスで行う（日本語ページの取得はこのプロセスで行う）
+            en_uri, en_body, ja_uri = watchdog.run(extract_en, doc, en_html)
+
+            # 途中で情報が足りない場合はスキップ
+            if not all([en_uri, ja_uri, en_body]):
+                tqdm.write(f'[{i}/{total_files}] en_URI, ja_URI, en_bodyのいずれかがNone: {en_path}')
+                continue
+
+            ja_basename: str = en_uri.replace(BASE_EN_URI, '').replace('/', '--').replace('.html', '')
+            ja_path: Path = ja_directory / f'{ja_basename}.html'
+
+            fetched: bool = False
+            if not ja_path.exists():
+                # 英語側が構造チェックを通った場合のみ日本語ページを取得する
+                if not gate.check_en(en_path.name, en_body):
+                    continue
+                tqdm.write(f'[{i}/{total_files}] ダウンロードする: {ja_path}')
+                # 取得待ちの時間は文書の予算に含めない
+                with watchdog.paused():
+                    saved: bool = download_and_save_html(session, ja_uri, ja_path, page_filter)
+                if not saved:
+                    continue
+                fetched = True
+
+            doc.add_input(ja_path)
+            ja_html: Optional[str] = page_filter.read_page(ja_path, JA_CONTAINER_MARKERS)
+            if ja_html is None:
+                continue
+            ja_body, ja_date = watchdog.run(extract_ja, doc, ja_html)
+            if fetched:
+                gate.check_ja(en_path.name, ja_body)
+
+            # 元のコード同様、日付が取れない場合もスキップ
+            if ja_body is None or ja_date is None:
+                tqdm.write(f'[{i}/{total_files}] Error: ja_bodyまたはja_dateがNone: {ja_path}')
+                continue
+
+            # サイト全体で頻出する段落（定型文）を除去
+            en_body, ja_body = stripper.apply(uid, en_body, ja_body)
+
+            # 段落数が一致しなかったらスキップ
+            if len(en_body) != len(ja_body):
+                tqdm.write(f'[{i}/{total_files}] 段落数不一致: {en_path} と {ja_path}')
+                continue
+
+            # 改行数が一致しなかったらスキップ
+            if not is_num_newlines(en_body, ja_body):
+                tqdm.write(f'[{i}/{total_files}] 改行数不一致: {en_path}')
+                continue
+
+            # 問題なければデータに追加
+            all_data.append(Document(uid, en_uri, ja_uri, en_body, ja_body, ja_date))
+
+    profiler.write_report()
+    stripper.save(tqdm.write)
+    tqdm.write(gate.summary())
+    gate.save()
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+    tqdm.write(watchdog.summary())
+    watchdog.save()
+    all_data = apply_filters(all_data, quality_filter, filter_config)
+
+    all_data = write_documents(output_json, all_data)
+
+    tqdm.write(f'処理済みデータ数: {len(all_data)}')
+
+    if stats:
+        with locked_stats(stats) as aggregate:
+            aggregate.update(all_data)
+
+    if store:
+        with locked_store(store) as document_store:
+            tqdm.write(f"Store: {document_store.upsert(all_data)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, TextIO
+from urllib.parse import urlsplit
+import click
+from requests import Response
+from tqdm import tqdm
+
+from mirai.prefilter import PreFilter, make_prefilter, prefilter_options
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+USER_AGENT: str = 'Mozilla/5.0 (Windows NT 10.0; Win16; 8086) Chrome Firefox'
+
+
+def uri_filename(uri: str) -> str:
+    """
+    Name a downloaded page after the full path of its URI (/103/actions/202411/a.html -> 103--actions--202411--a.html),
+    so that the name never depends on which other URIs are downloaded alongside it.
+    """
+    path: str = urlsplit(uri).path
+    if not path or path.endswith('/'):
+        path += 'index.html'
+    return path.lstrip('/').replace('/', '--')
+
+
+def read_jobs(fh: Iterable[str], output_dir: Path) -> list[tuple[str, Path]]:
+    """
+    Read "URI" or "URI<TAB>filename" lines. Without a filename the file is named by uri_filename().
+    """
+    jobs: list[tuple[str, Path]] = []
+    for line in fh:
+        parts: list[str] = line.strip().split('\t')
+        if not parts[0]:
+            continue
+        uri: str = parts[0]
+        name: str = parts[1] if len(parts) > 1 else uri_filename(uri)
+        jobs.append((uri, output_dir / name))
+    return jobs
+
+
+def fetch(session: PoliteSession, uri: str, output_path: Path, overwrite: bool, prefilter: PreFilter) -> None:
+    if output_path.exists() and not overwrite:
+        return
+    response: Response = session.get(uri)
+    if not prefilter.check_response(uri, response):
+        return
+    if not response.ok:
+        tqdm.write(f'Error: HTTP {response.status_code}: {uri}')
+        return
+    output_path.write_bytes(response.content)
+    tqdm.write(f'Saved {uri} > {output_path}')
+
+
+@click.command()
+@click.argument('uri_list', type=click.File('r', encoding='utf-8'))
+@click.argument('output_dir', type=click.Path(file_okay=False, path_type=Path))
+@click.option('--delay', default=3.0, type=float, help="Delay between requests in seconds")
+@click.option('--user_agent', default=USER_AGENT, help="User-Agent header")
+@click.option('--overwrite', is_flag=True, help="Re-download files that already exist")
+@throttle_options
+@prefilter_options
+def main(uri_list: TextIO, output_dir: Path, delay: float, user_agent: str, overwrite: bool,
+         min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path], prefilter: bool, rejections: Optional[Path]) -> None:
+    """
+    Download every URI in URI_LIST ("-" for stdin) into OUTPUT_DIR under the adaptive per-host throttle.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs: list[tuple[str, Path]] = read_jobs(uri_list, output_dir)
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, headers={'User-Agent': user_agent}, mirror=mirror, record=record)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        list(tqdm(executor.map(lambda job: fetch(session, job[0], job[1], overwrite, page_filter), jobs), total=len(jobs)))
+    tqdm.write(session.controller.summary())
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+
+
+if __name__ == '__main__':
+    main()
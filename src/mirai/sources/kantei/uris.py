@@ -0,0 +1,24 @@
+import click
+from pathlib import Path
+from tqdm import tqdm
+
+from mirai.sources.kantei.backfill import BASE_URI, scan_index
+
+
+@click.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False, path_type=Path))
+def extract_uris(directory: Path):
+    """
+    Extracts URIs from HTML files in the given DIRECTORY and prints them as full URLs.
+    """
+    uris: set[str] = set()
+
+    for html_file in tqdm(directory.glob("*.html")):
+        uris |= scan_index(html_file)
+
+    for uri in sorted(uris):
+        tqdm.write(f"{BASE_URI}{uri}")
+
+
+if __name__ == "__main__":
+    extract_uris()
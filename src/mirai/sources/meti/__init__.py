@@ -0,0 +1 @@
+"""Ministry of Economy, Trade and Industry (meti)."""
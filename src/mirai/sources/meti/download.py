@@ -0,0 +1,203 @@
+import hashlib
+import re
+from re import Match
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import click
+import requests
+from bs4 import BeautifulSoup
+from tqdm import tqdm
+from urllib.parse import urljoin
+from requests import Response
+
+from mirai.document import PAIR_TSV_HEADER
+from mirai.feeds import FeedDiscovery, FeedItem, feed_options, make_discovery
+from mirai.gate import PairGate, gate_options, make_gate
+from mirai.prefilter import PreFilter, make_prefilter, prefilter_options
+from mirai.sources.meti.extract import extract_main_text
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+BASE_UR: str = 'https://www.meti.go.jp/'
+USER_AGENT: str = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+
+def download_file(session: PoliteSession, url: str, output_path: Path, prefilter: PreFilter) -> None:
+    """Download a file from a URL and save it to the given path, unless it is an error page."""
+    try:
+        tqdm.write(f"Downloading {url} > {output_path}")
+        response: Response = session.get(url)
+        if not prefilter.check_response(url, response):
+            return
+        response.raise_for_status()
+        response.encoding = response.apparent_encoding
+        output_path.write_text(response.text, encoding='utf-8')
+    except requests.RequestException as e:
+        tqdm.write(f"Error downloading {url}: {e}")
+
+
+def read_paragraphs(html: str) -> list[str]:
+    """The body paragraphs, extracted exactly as the extractor does."""
+    return extract_main_text(BeautifulSoup(html, 'html.parser'))
+
+
+def process_document(session: PoliteSession, en_uri: str, base_uri: str, html_dir: Path, gate: PairGate, prefilter: PreFilter) -> Optional[str]:
+    """Download an English page and its Japanese counterpart, returning the TSV row.
+
+    Pages that give no pair return an empty string, pages that failed to download None.
+    """
+    doc_id: str = f'meti_{hashlib.md5(en_uri.encode()).hexdigest()[:8]}'
+
+    # download en_html
+    en_file: str = f'{doc_id}.en.html'
+    en_path: Path = html_dir / en_file
+    tqdm.write(f"Processing {en_uri} > {en_path}")
+    if en_path.exists():
+        return ''
+    download_file(session, en_uri, en_path, prefilter)
+    if not en_path.exists():
+        return None
+
+    # find a link to ja_html in en_html such as <a href="/press/2024/06/20240620002/20240620002.html">Japanese</a>
+    en_html: str = en_path.read_text(encoding='utf-8')
+    ja_match: Optional[Match[str]] = re.search(r'<a href="(/press/.*?\.html)">Japanese</a>', en_html)
+    if not ja_match:
+        return ''
+
+    ja_uri: str = urljoin(base_uri, ja_match.group(1))
+    ja_file: str = f'{doc_id}.ja.html'
+    ja_path: Path = html_dir / ja_file
+
+    if not ja_path.exists():
+        # only fetch the Japanese page when the English one would survive extraction
+        if not gate.check_en(en_file, read_paragraphs(en_html)):
+            return ''
+        download_file(session, ja_uri, ja_path, prefilter)
+        # a failed or rejected Japanese page gets no TSV row
+        if not ja_path.exists():
+            return None
+        gate.check_ja(en_file, read_paragraphs(ja_path.read_text(encoding='utf-8')))
+
+    return f'{doc_id}\t{ja_file}\t{en_file}\t{ja_uri}\t{en_uri}'
+
+
+def accept_feed_item(item: FeedItem, base_uri: str, oldest_yearmonth: int, newest_yearmonth: int) -> bool:
+    """Whether a feed item is an English press release in the requested month range."""
+    if not item.uri.startswith(urljoin(base_uri, '/english/press/')) or not re.search(r'\d', item.uri):
+        return False
+    # press release URIs look like /english/press/2024/0620_002.html
+    path_match: Optional[Match[str]] = re.search(r'/english/press/(\d{4})/(\d{2})\d{2}_', item.uri)
+    if path_match:
+        yearmonth: int = int(path_match.group(1) + path_match.group(2))
+    elif item.modified is not None:
+        yearmonth = item.modified.year * 100 + item.modified.month
+    else:
+        return True
+    return oldest_yearmonth <= yearmonth <= newest_yearmonth
+
+
+def process_index(index_path: Path, base_uri: str, html_dir: Path, session: PoliteSession, executor: ThreadPoolExecutor, gate: PairGate,
+                  prefilter: PreFilter) -> list[str]:
+    """Process an index file to extract metadata."""
+    index_html: str = index_path.read_text(encoding='utf-8')
+
+    en_uris: dict[str, None] = {}
+    match: Optional[Match[str]]
+    for match in re.finditer(r'<a href="(/english/press/.+?)"', index_html):
+        en_uri: str = urljoin(base_uri, match.group(1))
+
+        # skip if filename does not contain digits
+        if not re.search(r'\d', en_uri):
+            continue
+        en_uris[en_uri] = None
+
+    rows = executor.map(lambda uri: process_document(session, uri, base_uri, html_dir, gate, prefilter), en_uris)
+    return [row for row in tqdm(rows, total=len(en_uris)) if row]
+
+
+@click.command()
+@click.argument('oldest_yearmonth', type=int)
+@click.argument('newest_yearmonth', type=int)
+@click.argument('output_tsv', type=click.Path(writable=True, path_type=Path))
+@click.option('--html_directory', default='html', type=click.Path(file_okay=False, path_type=Path), help="Directory to save HTML files")
+@click.option('--base_uri', default='https://www.meti.go.jp/', help="Base URI for downloading files")
+@click.option('--index_uri', default='https://www.meti.go.jp/english/press/nBackIssue', help="Base index URI")
+@click.option('--index_directory', default='indices', type=click.Path(file_okay=False, path_type=Path), help="Directory to save index files")
+@click.option('--delay', default=1.0, type=float, help="Delay between requests in seconds")
+@throttle_options
+@feed_options
+@gate_options
+@prefilter_options
+def main(
+    oldest_yearmonth: int,
+    newest_yearmonth: int,
+    output_tsv: Path,
+    html_directory: Path,
+    base_uri: str,
+    index_uri: str,
+    index_directory: Path,
+    delay: float,
+    min_concurrency: int,
+    max_concurrency: int,
+    throttle_log: Optional[Path],
+    mirror: Optional[str],
+    record: Optional[Path],
+    discovery: str,
+    feeds: tuple[str, ...],
+    feed_state: Path,
+    en_gate: bool,
+    gate_file: Optional[Path],
+    prefilter: bool,
+    rejections: Optional[Path],
+) -> None:
+    html_directory.mkdir(parents=True, exist_ok=True)
+    index_directory.mkdir(parents=True, exist_ok=True)
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, headers={'User-Agent': USER_AGENT}, mirror=mirror, record=record)
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_concurrency)
+    gate: PairGate = make_gate(en_gate, gate_file)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+
+    metadata = [PAIR_TSV_HEADER]
+    done: list[str] = []
+
+    # Feeds replace the index pages when they can be read
+    feed_discovery: FeedDiscovery = make_discovery(discovery, feeds, feed_state, f"{index_uri}{newest_yearmonth}.html")
+    feed_uris: Optional[list[str]] = feed_discovery.uris(
+        session, lambda item: accept_feed_item(item, base_uri, oldest_yearmonth, newest_yearmonth))
+    if feed_uris is not None:
+        rows = executor.map(lambda uri: process_document(session, uri, base_uri, html_directory, gate, page_filter), feed_uris)
+        for uri, row in tqdm(zip(feed_uris, rows), total=len(feed_uris), desc="Processing feed items"):
+            if row is not None:
+                done.append(uri)
+            if row:
+                metadata.append(row)
+    else:
+        # Download index files
+        index_jobs: list[tuple[str, Path]] = []
+        for yearmonth in range(oldest_yearmonth, newest_yearmonth + 1):
+            if yearmonth % 100 == 13:
+                yearmonth += 88
+            index_uri_full: str = f"{index_uri}{yearmonth}.html"
+            index_path: Path = index_directory / f"{yearmonth}.html"
+
+            if not index_path.exists():
+                index_jobs.append((index_uri_full, index_path))
+        list(tqdm(executor.map(lambda job: download_file(session, *job, page_filter), index_jobs), total=len(index_jobs), desc="Downloading index files"))
+
+        # extract en_uri from indices
+        for index_path in tqdm(index_directory.glob("*.html"), desc="Processing index files"):
+            metadata.extend(process_index(index_path, base_uri, html_directory, session, executor, gate, page_filter))
+    executor.shutdown()
+    tqdm.write(session.controller.summary())
+    tqdm.write(gate.summary())
+    gate.save()
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+    # Write output TSV
+    output_tsv.write_text("\n".join(metadata), encoding="utf-8")
+    tqdm.write(f"TSV written to {output_tsv}")
+    feed_discovery.commit(done)
+
+
+if __name__ == '__main__':
+    main()
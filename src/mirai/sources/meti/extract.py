@@ -0,0 +1,185 @@
+import re
+from re import Match
+from pathlib import Path
+from typing import Optional
+import click
+from bs4 import BeautifulSoup, Comment, Tag, NavigableString
+from tqdm import tqdm
+
+from mirai.boilerplate import BoilerplateStripper, boilerplate_options, make_stripper
+from mirai.document import Document, Pair, read_pairs, write_documents
+from mirai.filters import apply_filters, filter_options
+from mirai.prefilter import ContainerMarker, PreFilter, class_marker, make_prefilter, prefilter_options
+from mirai.profile import DocumentProfile, ExtractionProfiler, make_profiler, profile_options
+from mirai.stats import locked_stats
+from mirai.store import locked_store
+from mirai.watchdog import Watchdog, make_watchdog, watchdog_options
+
+HTML_TAG = Tag | NavigableString
+# the container extract_main_text reads
+CONTAINER_MARKERS: tuple[ContainerMarker, ...] = (ContainerMarker('div.main', (class_marker('main'),)),)
+
+
+def extract_date(html: BeautifulSoup) -> str:
+    # extract date from <div class="main">
+    date_text: str = ''
+    main: Optional[HTML_TAG] = html.find('div', class_='main')
+    if main:
+        # extract date from <p class="b-g">
+        date: Optional[HTML_TAG] = main.find('p', class_='b-g')
+        if date:
+            match: Match[str] = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', date.text)
+            if match:
+                year, month, day = match.groups()
+                date_text: str = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+    return date_text
+
+
+def extract_main_text(html: BeautifulSoup) -> list[str]:
+    """Extract the main text content from the HTML."""
+    paragraphs: list[str] = []
+    # <div class="main">
+
+    main: Optional[HTML_TAG] = html.find('div', class_='main')
+    if not main:
+        return paragraphs
+
+    # iterate each element, and if it is <p> or <div class="border_box">, extract text
+    text_stack: list[str] = []
+    element: HTML_TAG
+    for element in main.children:
+        text: str = ''
+        if element.name == 'p':
+            text = element.get_text('', strip=True)
+        elif element.name == 'div' and element.get('class') == ['border_box']:
+            text = element.get_text('', strip=True)
+        elif element.name in ['ul', 'ol']:
+            for li in element.find_all('li'):
+                text += li.get_text('', strip=True) + '\n'
+
+        elif element.name == 'h2':
+            text = element.get_text('', strip=True)
+            if text.lower() in ['関連資料', '関連リンク', '担当', 'division in charge', 'related materials', 'reference links', 'related link'] or 'related link' in text.lower():
+                break
+        elif element.name == 'figure':
+            text = element.get_text('', strip=True)
+
+        elif isinstance(element, str) and not isinstance(element, Comment):
+            text = element.strip()
+            text = re.sub(r'\n\s+', '\n', text)
+            text = re.sub(r'[ \u3000\t]{2,}', ' ', text)
+            if text:
+                text_stack.append(text)
+            continue
+
+        elif element.name == 'a':
+            text = element.get_text('', strip=True)
+            if text:
+                text_stack.append(text)
+            continue
+
+        text = re.sub(r'\n\n+', '\n', text).strip()
+        if text:
+            if text_stack:
+                paragraphs.append(''.join(text_stack))
+                text_stack = []
+            paragraphs.append(text)
+
+    if text_stack:
+        paragraphs.append(''.join(text_stack))
+    return paragraphs
+
+
+def is_num_newlines(paragraphs0: list[str], paragraphs1: list[str]) -> bool:
+    """Check if the number of newlines matches between two lists of paragraphs."""
+    return all(p0.count('\n') == p1.count('\n') for p0, p1 in zip(paragraphs0, paragraphs1))
+
+
+def extract_pair(doc: DocumentProfile, en_html: str, ja_html: str) -> tuple[list[str], list[str], str]:
+    """Parse both pages and extract their main text and the Japanese publication date."""
+    with doc.stage('parse'):
+        en_soup: BeautifulSoup = BeautifulSoup(en_html, 'html.parser')
+        ja_soup: BeautifulSoup = BeautifulSoup(ja_html, 'html.parser')
+    doc.count_nodes(en_soup, ja_soup)
+    with doc.stage('extract'):
+        return extract_main_text(en_soup), extract_main_text(ja_soup), extract_date(ja_soup)
+
+
+@click.command()
+@click.argument('input_tsv', type=click.Path(exists=True, path_type=Path))
+@click.argument('output_json', type=click.Path(writable=True, path_type=Path))
+@click.option('--html_directory', default='html', type=click.Path(file_okay=False, path_type=Path), help="Directory containing HTML files.")
+@click.option('--stats', default=None, type=click.Path(dir_okay=False, path_type=Path), help="Statistics aggregate to update with the accepted records.")
+@click.option('--store', default=None, type=click.Path(file_okay=False, path_type=Path), help="Consolidated document store to upsert the accepted records into.")
+@filter_options
+@profile_options
+@boilerplate_options
+@prefilter_options
+@watchdog_options
+def main(input_tsv: Path, output_json: Path, html_directory: Path, stats: Optional[Path], store: Optional[Path], quality_filter: bool, filter_config: Optional[Path],
+         profile: Optional[Path], profile_top: int, profile_sort: str, profile_cprofile: Optional[Path],
+         boilerplate: Optional[Path], boilerplate_min_count: int, boilerplate_min_fraction: float,
+         prefilter: bool, rejections: Optional[Path], doc_timeout: float, doc_memory: float, quarantine: Optional[Path]) -> None:
+    """Main function to process the input TSV and generate a JSON output."""
+    profiler: ExtractionProfiler = make_profiler(profile, profile_top, profile_sort, profile_cprofile)
+    stripper: BoilerplateStripper = make_stripper('meti', boilerplate, boilerplate_min_count, boilerplate_min_fraction)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+    watchdog: Watchdog = make_watchdog(doc_timeout, doc_memory, quarantine)
+    metadata: list[Pair] = read_pairs(input_tsv, 'meti')
+
+    data: list[Document] = []
+    for item in tqdm(metadata):
+        tqdm.write(f"Processing ID: {item.id}")
+
+        en_path: Path = html_directory / item.en_file
+        ja_path: Path = html_directory / item.ja_file
+
+        with watchdog.document(item.id), profiler.document(item.id, en_path, ja_path) as doc:
+            # pages without the container are rejected before any DOM is built
+            en_html: Optional[str] = page_filter.read_page(en_path, CONTAINER_MARKERS)
+            ja_html: Optional[str] = page_filter.read_page(ja_path, CONTAINER_MARKERS) if en_html is not None else None
+            if en_html is None or ja_html is None:
+                continue
+
+            # with budgets the parse and extract stages run in the watchdog's worker process
+            en_text, ja_text, ja_date = watchdog.run(extract_pair, doc, en_html, ja_html)
+
+            # drop paragraphs that recur across the site before the alignment checks
+            en_text, ja_text = stripper.apply(item.id, en_text, ja_text)
+
+            if not en_text or not ja_text:
+                tqdm.write(f"None: {item.id}")
+                continue
+
+            if len(en_text) != len(ja_text):
+                tqdm.write(f"不一致: {item.id}")
+                continue
+
+            if not is_num_newlines(en_text, ja_text):
+                tqdm.write(f"改行数不一致: {item.id}")
+                continue
+
+            data.append(Document(item.id, item.en_URI, item.ja_URI, en_text, ja_text, ja_date))
+
+    profiler.write_report()
+    stripper.save(tqdm.write)
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+    tqdm.write(watchdog.summary())
+    watchdog.save()
+    data = apply_filters(data, quality_filter, filter_config)
+
+    data = write_documents(output_json, data)
+    if stats:
+        with locked_stats(stats) as aggregate:
+            aggregate.update(data)
+
+    if store:
+        with locked_store(store) as document_store:
+            tqdm.write(f"Store: {document_store.upsert(data)}")
+    # print the number of data
+    tqdm.write(f"Processed {len(data)} items.")
+
+
+if __name__ == '__main__':
+    main()
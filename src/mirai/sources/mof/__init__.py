@@ -0,0 +1 @@
+"""Ministry of Finance (mof)."""
@@ -0,0 +1,193 @@
+import datetime
+import hashlib
+import re
+from re import Match
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urljoin
+import click
+from bs4 import BeautifulSoup
+from typing import Optional
+from requests import Response
+from tqdm import tqdm
+
+from mirai.document import PAIR_TSV_HEADER
+from mirai.feeds import FeedDiscovery, FeedItem, feed_options, make_discovery
+from mirai.gate import PairGate, gate_options, make_gate
+from mirai.prefilter import PreFilter, make_prefilter, prefilter_options
+from mirai.sources.mof.extract import extract_main_text
+from mirai.throttle import PoliteSession, make_session, throttle_options
+
+# Index entries containing these keywords (regular statistics releases) are skipped
+EXCLUDED_KEYWORDS: tuple[str, ...] = (
+    'JGBs', 'PRI', 'Trade Statistics', 'FILP', 'Exchequer', 'Currency',
+    'Balance of', 'International Reserves/Foreign Currency Liquidity'
+)
+
+
+def add_a_month(date: datetime.datetime) -> datetime.datetime:
+    """Add one month to the given datetime object."""
+    year: int = date.year
+    month: int = date.month
+    if month == 12:
+        year += 1
+        month = 1
+    else:
+        month += 1
+    return datetime.datetime(year, month, 1)
+
+
+def read_paragraphs(html: str) -> list[str]:
+    """The body paragraphs, extracted exactly as the extractor does."""
+    return extract_main_text(BeautifulSoup(html, 'html.parser'))
+
+
+def download_pair(session: PoliteSession, en_uri: str, html_dir: Path, gate: PairGate, prefilter: PreFilter, only_new: bool = False) -> Optional[str]:
+    """Download an English page and its Japanese counterpart, returning the TSV row.
+
+    Pages that give no pair return an empty string, pages that failed to download None.
+    """
+    doc_id: str = hashlib.md5(en_uri.encode()).hexdigest()[:8]
+    en_file: Path = html_dir / f'mof_{doc_id}.en.html'
+    ja_file: Path = html_dir / f'mof_{doc_id}.ja.html'
+    # the Japanese page is fetched last, so its presence marks a finished pair
+    if only_new and ja_file.exists():
+        return ''
+    tqdm.write(f"Processing English URI: {en_uri}")
+
+    en_response: Response = session.get(en_uri)
+    if not prefilter.check_response(en_uri, en_response):
+        return None
+    en_response.encoding = en_response.apparent_encoding
+    en_file.write_text(en_response.text, encoding='utf-8')
+
+    for subline in en_response.text.split('\n'):
+        ja_match: Optional[Match[str]] = re.search(
+            r'<div class="text-right"><a href="(.+?)" class="button -arrow-r -sm">Japanese</a></div>',
+            subline
+        )
+        if ja_match:
+            ja_uri: str = urljoin(en_uri, ja_match.group(1))
+            # only fetch the Japanese page when the English one would survive extraction
+            if not gate.check_en(en_file.name, read_paragraphs(en_response.text)):
+                return ''
+            tqdm.write(f"Processing Japanese URI: {ja_uri}")
+
+            ja_response: Response = session.get(ja_uri)
+            if not prefilter.check_response(ja_uri, ja_response):
+                return None
+            ja_response.encoding = ja_response.apparent_encoding
+            ja_file.write_text(ja_response.text, encoding='utf-8')
+            gate.check_ja(en_file.name, read_paragraphs(ja_response.text))
+
+            return f"{doc_id}\t{ja_file.name}\t{en_file.name}\t{ja_uri}\t{en_uri}"
+    return ''
+
+
+def accept_feed_item(item: FeedItem, from_date: datetime.datetime, to_date: datetime.datetime) -> bool:
+    """Whether a feed item is an English HTML release in the month range and not on the keyword deny-list."""
+    if '/english/' not in item.uri or not item.uri.endswith(('.htm', '.html')):
+        return False
+    if any(keyword in item.title for keyword in EXCLUDED_KEYWORDS):
+        return False
+    if item.modified is None:
+        return True
+    return from_date <= datetime.datetime(item.modified.year, item.modified.month, 1) <= to_date
+
+
+@click.command()
+@click.argument('from_yearmonth', type=str)
+@click.argument('to_yearmonth', type=str)
+@click.argument('output_tsv', type=click.Path(writable=True, path_type=Path))
+@click.argument('html_dir', type=click.Path(file_okay=False, path_type=Path))
+@click.option('--delay', default=1.0, type=float, help="Delay between requests in seconds")
+@click.option('--only_new', is_flag=True, help="Skip documents whose Japanese page has already been downloaded")
+@throttle_options
+@feed_options
+@gate_options
+@prefilter_options
+def main(from_yearmonth: str, to_yearmonth: str, output_tsv: Path, html_dir: Path, delay: float, only_new: bool,
+         min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], mirror: Optional[str], record: Optional[Path],
+         discovery: str, feeds: tuple[str, ...], feed_state: Path,
+         en_gate: bool, gate_file: Optional[Path], prefilter: bool, rejections: Optional[Path]) -> None:
+    """Download MOF HTML files and generate a TSV file linking English and Japanese versions."""
+
+    from_date: datetime.datetime = datetime.datetime.strptime(from_yearmonth, '%Y%m')
+    to_date: datetime.datetime = datetime.datetime.strptime(to_yearmonth, '%Y%m')
+
+    html_dir.mkdir(parents=True, exist_ok=True)
+    session: PoliteSession = make_session(delay, min_concurrency, max_concurrency, throttle_log, mirror=mirror, record=record)
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_concurrency)
+    gate: PairGate = make_gate(en_gate, gate_file)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections)
+
+    index_uri_template: str = 'https://www.mof.go.jp/english/public_relations/whats_new/{yearmonth}.html'
+
+    # Generate a list of year-month strings
+    yearmonths: list[str] = []
+    current: datetime.datetime = from_date
+    while current <= to_date:
+        yearmonths.append(current.strftime('%Y%m'))
+        current = add_a_month(current)
+
+    # Prepare TSV data
+    tsv: list[str] = [PAIR_TSV_HEADER]
+
+    # Feeds replace the monthly index pages when they can be read
+    feed_discovery: FeedDiscovery = make_discovery(discovery, feeds, feed_state, index_uri_template.format(yearmonth=to_yearmonth))
+    feed_uris: Optional[list[str]] = feed_discovery.uris(session, lambda item: accept_feed_item(item, from_date, to_date))
+    en_uris: dict[str, None] = dict.fromkeys(feed_uris or [])
+
+    if feed_uris is None:
+        # Download index files
+        def download_index(yearmonth: str) -> None:
+            index_uri: str = index_uri_template.format(yearmonth=yearmonth)
+            response: Response = session.get(index_uri)
+            response.encoding = response.apparent_encoding
+            index_path: Path = html_dir / f'index_{yearmonth}.html'
+            index_path.write_text(response.text, encoding='utf-8')
+
+        list(tqdm(executor.map(download_index, yearmonths), desc='Downloading index files', total=len(yearmonths)))
+
+        for yearmonth in tqdm(yearmonths, desc='Processing index files', total=len(yearmonths)):
+            index_path: Path = html_dir / f'index_{yearmonth}.html'
+            html: str = index_path.read_text(encoding='utf-8')
+            index_uri: str = index_uri_template.format(yearmonth=yearmonth)
+
+            for line in html.split('\n'):
+                if '<li class="information-item">' in line:
+                    if any(keyword in line for keyword in EXCLUDED_KEYWORDS):
+                        continue
+
+                    match: Optional[Match[str]] = re.search(r'<a href="(.+?)"', line)
+                    if not match:
+                        continue
+
+                    en_uri: str = urljoin(index_uri, match.group(1))
+                    if not en_uri.endswith(('.htm', '.html')):
+                        continue
+
+                    en_uris[en_uri] = None
+
+    done: list[str] = []
+    rows = executor.map(lambda uri: download_pair(session, uri, html_dir, gate, page_filter, only_new), en_uris)
+    for en_uri, row in tqdm(zip(en_uris, rows), desc='Downloading documents', total=len(en_uris)):
+        if row is not None:
+            done.append(en_uri)
+        if row:
+            tsv.append(row)
+    executor.shutdown()
+    tqdm.write(session.controller.summary())
+    tqdm.write(gate.summary())
+    gate.save()
+    tqdm.write(page_filter.summary())
+    page_filter.save()
+
+    # Write the output TSV file
+    output_tsv.write_text('\n'.join(tsv), encoding='utf-8')
+    tqdm.write(f"TSV file written to {output_tsv}")
+    feed_discovery.commit(done)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+from pathlib import Path
+import click
+from bs4 import BeautifulSoup, Tag, NavigableString
+from typing import Optional
+
+from mirai.boilerplate import BoilerplateStripper, boilerplate_options, make_stripper
+from mirai.document import Document, Pair, read_pairs, write_documents
+from mirai.filters import apply_filters, filter_options
+from mirai.prefilter import ContainerMarker, PreFilter, class_marker, make_prefilter, prefilter_options
+from mirai.profile import DocumentProfile, ExtractionProfiler, make_profiler, profile_options
+from mirai.stats import locked_stats
+from mirai.store import locked_store
+from mirai.watchdog import Watchdog, make_watchdog, watchdog_options
+
+
+HTML_TAG = NavigableString | Tag
+# either container extract_main_text reads
+CONTAINER_MARKERS: tuple[ContainerMarker, ...] = (
+    ContainerMarker('section.content-section or div.unique-block', (class_marker('content-section'), class_marker('unique-block'))),
+)
+
+def extract_date(html: BeautifulSoup) -> str:
+    """Extract the publication date from <meta name="date">."""
+    for meta in html.find_all('meta', attrs={'name': 'date'}):
+        return meta.get('content', '').strip()
+    return ''
+
+
+def extract_main_text(html: BeautifulSoup) -> list[str]:
+    """Extract main text content from specific sections in the HTML."""
+    paragraphs: list[str] = []
+    main: Optional[HTML_TAG] = html.find('section', class_='content-section') or html.find('div', class_='unique-block')
+    if not main:
+        return paragraphs
+
+    for element in main.find_all(['p', 'h2', 'ol', 'ul']):
+        text: str = ''
+        if element.name == 'h2':
+            text = element.get_text('', strip=True).strip()
+        elif element.name in ['ol', 'ul']:
+            for li in element.find_all('li'):
+                text = li.get_text('', strip=True).strip()
+                if text:
+                    paragraphs.append(text)
+            continue
+        else:
+            if element.find('li'):
+                continue
+            text = element.get_text('', strip=True).strip()
+        if text:
+            paragraphs.append(text)
+
+    if not paragraphs:
+        # get text in main
+        text: str = main.get_text('', strip=True).strip()
+        if text:
+            paragraphs.extend(text.split('\n\n'))
+
+    return paragraphs
+
+
+def is_num_newlines(paragraphs0: list[str], paragraphs1: list[str]) -> bool:
+    """Check if the number of newlines matches between two lists of paragraphs."""
+    return all(p0.count('\n') == p1.count('\n') for p0, p1 in zip(paragraphs0, paragraphs1))
+
+
+def extract_pair(doc: DocumentProfile, en_html: str, ja_html: str) -> tuple[list[str], list[str], str]:
+    """Parse both pages and extract their main text and the Japanese publication date."""
+    with doc.stage('parse'):
+        en_soup: BeautifulSoup = BeautifulSoup(en_html, 'html.parser')
+        ja_soup: BeautifulSoup = BeautifulSoup(ja_html, 'html.parser')
+    doc.count_nodes(en_soup, ja_soup)
+    with doc.stage('extract'):
+        return extract_main_text(en_soup), extract_main_text(ja_soup), extract_date(ja_soup)
+
+
+@click.command()
+@click.argument('input_tsv', type=click.Path(exists=True, path_type=Path))
+@click.argument('output_json', type=click.Path(writable=True, path_type=Path))
+@click.option('--html_directory', default='html', type=click.Path(file_okay=False, path_type=Path), help="Directory containing HTML files.")
+@click.option('--stats', default=None, type=click.Path(dir_okay=False, path_type=Path), help="Statistics aggregate to update with the accepted records.")
+@click.option('--store', default=None, type=click.Path(file_okay=False, path_type=Path), help="Consolidated document store to upsert the accepted records into.")
+@filter_options
+@profile_options
+@boilerplate_options
+@prefilter_options
+@watchdog_options
+def main(input_tsv: Path, output_json: Path, html_directory: Path, stats: Optional[Path], store: Optional[Path], quality_filter: bool, filter_config: Optional[Path],
+         profile: Optional[Path], profile_top: int, profile_sort: str, profile_cprofile: Optional[Path],
+         boilerplate: Optional[Path], boilerplate_min_count: int, boilerplate_min_fraction: float,
+         prefilter: bool, rejections: Optional[Path], doc_timeout: float, doc_memory: float, quarantine: Optional[Path]) -> None:
+    """Process the input TSV and extract data into a JSON output."""
+    profiler: ExtractionProfiler = make_profiler(profile, profile_top, profile_sort, profile_cprofile, log=lambda message: click.echo(message, err=True))
+    stripper: BoilerplateStripper = make_stripper('mof', boilerplate, boilerplate_min_count, boilerplate_min_fraction)
+    page_filter: PreFilter = make_prefilter(prefilter, rejections, log=lambda message: click.echo(message, err=True))
+    watchdog: Watchdog = make_watchdog(doc_timeout, doc_memory, quarantine, log=lambda message: click.echo(message, err=True))
+    metadata: list[Pair] = read_pairs(input_tsv, 'mof')
+
+    data: list[Document] = []
+    for item in metadata:
+        click.echo(f"Processing ID: {item.id}", err=True)
+
+        en_path: Path = html_directory / item.en_file
+        ja_path: Path = html_directory / item.ja_file
+
+        with watchdog.document(item.id), profiler.document(item.id, en_path, ja_path) as doc:
+            # pages without the container are rejected before any DOM is built
+            en_html: Optional[str] = page_filter.read_page(en_path, CONTAINER_MARKERS)
+            ja_html: Optional[str] = page_filter.read_page(ja_path, CONTAINER_MARKERS) if en_html is not None else None
+            if en_html is None or ja_html is None:
+                continue
+
+            # with budgets the parse and extract stages run in the watchdog's worker process
+            en_text, ja_text, ja_date = watchdog.run(extract_pair, doc, en_html, ja_html)
+
+            # drop paragraphs that recur across the site before the alignment checks
+            en_text, ja_text = stripper.apply(item.id, en_text, ja_text)
+
+            if not en_text or not ja_text:
+                click.echo(f"None: {item.id}", err=True)
+                continue
+
+            if len(en_text) != len(ja_text):
+                click.echo(f"不一致: {item.id}", err=True)
+                continue
+
+            if not is_num_newlines(en_text, ja_text):
+                click.echo(f"改行数不一致: {item.id}", err=True)
+                continue
+
+            data.append(Document(item.id, item.en_URI, item.ja_URI, en_text, ja_text, ja_date))
+
+    profiler.write_report()
+    stripper.save(lambda message: click.echo(message, err=True))
+    click.echo(page_filter.summary(), err=True)
+    page_filter.save()
+    click.echo(watchdog.summary(), err=True)
+    watchdog.save()
+    data = apply_filters(data, quality_filter, filter_config, log=lambda message: click.echo(message, err=True))
+
+    data = write_documents(output_json, data, log=lambda message: click.echo(message, err=True))
+    if stats:
+        with locked_stats(stats) as aggregate:
+            aggregate.update(data)
+
+    if store:
+        with locked_store(store) as document_store:
+            click.echo(f"Store: {document_store.upsert(data)}", err=True)
+    # print the number of data
+    click.echo(f"Processed {len(data)} items.", err=True)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""Persistent, incrementally updated corpus statistics.
+
+The aggregate keeps document counts per (source, month, paragraph count) and
+log2 histograms of document character lengths.  The key each document was
+counted under, so that a re-extracted document replaces its old contribution
+instead of being counted twice, is kept in a TSV sidecar next to it
+(``stats.json.documents.tsv``) that is only read when records are added.  The
+aggregate and the cost of rendering it depend on the number of months, not on
+the number of documents.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from mirai.records import Record, record_source, record_year_month
+
+MAX_PARAGRAPHS: int = 20
+DOCUMENTS_HEADER: str = 'id\tsource\tmonth\tbucket\ten_bin\tja_bin'
+
+
+def paragraph_bucket(num_paragraphs: int) -> int:
+    """Paragraph counts above MAX_PARAGRAPHS share one bucket (not shown in the README table)."""
+    return min(num_paragraphs, MAX_PARAGRAPHS + 1)
+
+
+def length_bin(num_chars: int) -> int:
+    """log2 bin of a character count: 0 for empty, n for [2**(n-1), 2**n)."""
+    return num_chars.bit_length()
+
+
+def documents_path(path: Path) -> Path:
+    """The per-document sidecar of the aggregate at ``path``."""
+    return path.with_name(path.name + '.documents.tsv')
+
+
+class StatsAggregate:
+    def __init__(self, data: Optional[dict] = None, documents_file: Optional[Path] = None) -> None:
+        data = data or {}
+        # counts[source][month][bucket], en_chars/ja_chars[source][bin]
+        self.counts: dict[str, dict[str, dict[str, int]]] = data.get('counts', {})
+        self.en_chars: dict[str, dict[str, int]] = data.get('en_chars', {})
+        self.ja_chars: dict[str, dict[str, int]] = data.get('ja_chars', {})
+        self.documents_file: Optional[Path] = documents_file
+        # id -> [source, month, bucket, en_bin, ja_bin], read from the sidecar on first use
+        # (aggregates written before the sidecar existed still carry them inline)
+        self._documents: Optional[dict[str, list[str]]] = data.get('documents')
+
+    @property
+    def documents(self) -> dict[str, list[str]]:
+        if self._documents is None:
+            self._documents = {}
+            if self.documents_file is not None and self.documents_file.exists():
+                with self.documents_file.open(encoding='utf-8') as f:
+                    next(f, None)
+                    for line in f:
+                        doc_id, *key = line.rstrip('\n').split('\t')
+                        self._documents[doc_id] = key
+        return self._documents
+
+    @classmethod
+    def load(cls, path: Path) -> 'StatsAggregate':
+        if not path.exists():
+            return cls(documents_file=documents_path(path))
+        return cls(json.loads(path.read_text(encoding='utf-8')), documents_path(path))
+
+    def save(self, path: Path) -> None:
+        if self._documents is not None:
+            sidecar: Path = documents_path(path)
+            temporary_sidecar: Path = sidecar.with_name(sidecar.name + '.tmp')
+            with temporary_sidecar.open('w', encoding='utf-8') as f:
+                f.write(DOCUMENTS_HEADER + '\n')
+                for doc_id, key in self._documents.items():
+                    f.write('\t'.join([doc_id] + key) + '\n')
+            os.replace(temporary_sidecar, sidecar)
+        temporary: Path = path.with_name(path.name + '.tmp')
+        temporary.write_text(json.dumps({
+            'counts': self.counts,
+            'en_chars': self.en_chars,
+            'ja_chars': self.ja_chars,
+        }, ensure_ascii=False), encoding='utf-8')
+        os.replace(temporary, path)
+
+    def _apply(self, key: list[str], delta: int) -> None:
+        source, month, bucket, en_bin, ja_bin = key
+        months: dict[str, int] = self.counts.setdefault(source, {}).setdefault(month, {})
+        months[bucket] = months.get(bucket, 0) + delta
+        for histogram, value in ((self.en_chars, en_bin), (self.ja_chars, ja_bin)):
+            bins: dict[str, int] = histogram.setdefault(source, {})
+            bins[value] = bins.get(value, 0) + delta
+
+    def add(self, record: Record) -> bool:
+        """Count a record, replacing the contribution of an earlier record with the same id; True for a new id."""
+        key: list[str] = [
+            record_source(record),
+            record_year_month(record),
+            str(paragraph_bucket(len(record['en_body']))),
+            str(length_bin(sum(len(text) for text in record['en_body']))),
+            str(length_bin(sum(len(text) for text in record['ja_body']))),
+        ]
+        doc_id: str = str(record['id'])
+        previous: Optional[list[str]] = self.documents.get(doc_id)
+        if previous == key:
+            return False
+        if previous is not None:
+            self._apply(previous, -1)
+        self._apply(key, 1)
+        self.documents[doc_id] = key
+        return previous is None
+
+    def update(self, records: Iterable[Record]) -> int:
+        return sum(self.add(record) for record in records)
+
+    def month_table(self) -> dict[str, list[int]]:
+        """Documents per month (all sources) for paragraph counts 1..MAX_PARAGRAPHS."""
+        table: dict[str, list[int]] = {}
+        for months in self.counts.values():
+            for month, buckets in months.items():
+                if month == 'unknown':
+                    continue
+                row: list[int] = table.setdefault(month, [0] * MAX_PARAGRAPHS)
+                for bucket, count in buckets.items():
+                    if 1 <= int(bucket) <= MAX_PARAGRAPHS:
+                        row[int(bucket) - 1] += count
+        return dict(sorted(table.items()))
+
+    def markdown(self) -> str:
+        """Render the README's month x paragraph-count table."""
+        header: list[str] = ['-'] + [str(n) for n in range(1, MAX_PARAGRAPHS + 1)]
+        lines: list[str] = ['|' + '|'.join(header) + '|', '|' + '|'.join(['-'] * len(header)) + '|']
+        for month, row in self.month_table().items():
+            lines.append('|' + '|'.join([month] + [str(count) for count in row]) + '|')
+        return '\n'.join(lines)
+
+    def summary(self) -> dict:
+        """Per-source totals and character-length histograms."""
+        sources: dict[str, dict] = {}
+        for source, months in sorted(self.counts.items()):
+            sources[source] = {
+                'documents': sum(sum(buckets.values()) for buckets in months.values()),
+                'months': {month: sum(buckets.values()) for month, buckets in sorted(months.items())},
+                'en_chars_log2': dict(sorted(self.en_chars.get(source, {}).items(), key=lambda item: int(item[0]))),
+                'ja_chars_log2': dict(sorted(self.ja_chars.get(source, {}).items(), key=lambda item: int(item[0]))),
+            }
+        return {'documents': sum(source['documents'] for source in sources.values()), 'sources': sources}
+
+
+@contextmanager
+def locked_stats(path: Path) -> Iterator[StatsAggregate]:
+    """Load the aggregate under an exclusive lock and save it on exit, so extractors can update it concurrently."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_name(path.name + '.lock').open('w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        stats: StatsAggregate = StatsAggregate.load(path)
+        yield stats
+        stats.save(path)
+
+
+def replace_readme_table(readme: str, table: str) -> str:
+    """Replace the statistics table (the block starting with ``|-|1|``) in README text."""
+    lines: list[str] = readme.split('\n')
+    start: int = next(i for i, line in enumerate(lines) if line.startswith('|-|1|'))
+    end: int = start
+    while end < len(lines) and lines[end].startswith('|'):
+        end += 1
+    return '\n'.join(lines[:start] + table.split('\n') + lines[end:])
@@ -0,0 +1,189 @@
+"""Consolidated document store that upserts by ``id``.
+
+A store is a directory holding a compacted ``base.jsonl``, a few
+``delta-NNNNNN.jsonl`` segments and ``index.tsv``, which maps every ``id`` to
+the digest of its current version, the time that version was stored and the
+segment it lives in.  Upserting compares digests with the index and appends
+only new or changed documents as a new delta segment; after ``max_deltas``
+segments the store is compacted into a new base.  Each stored line is the
+document plus its ``modified`` stamp, so the segments are readable as JSONL
+by ``read_documents`` too, but only :meth:`DocumentStore.documents` knows
+which line is current.  Storage and load time follow the number of unique
+documents, not the number of extraction runs.
+
+The index is replaced only after a delta has been written, so a crash leaves
+at most an orphaned segment, which the next compaction removes.
+"""
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from mirai.document import Document
+from mirai.records import record_source
+
+BASE: str = 'base'
+INDEX_HEADER: str = 'id\tdigest\tmodified\tsegment'
+
+
+@dataclass(slots=True)
+class IndexEntry:
+    digest: str
+    modified: str
+    segment: str
+
+
+@dataclass(slots=True)
+class UpsertResult:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    segment: Optional[str] = None
+    compacted: bool = False
+
+    def __str__(self) -> str:
+        text: str = f'{self.added} added, {self.updated} updated, {self.unchanged} unchanged'
+        if self.segment is not None:
+            text += f' (written to {self.segment})'
+        return text + (', compacted' if self.compacted else '')
+
+
+def document_digest(document: Document) -> str:
+    text: str = json.dumps(document.to_dict(), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _replace(path: Path, lines: Iterable[str]) -> None:
+    temporary: Path = path.with_name(path.name + '.tmp')
+    with temporary.open('w', encoding='utf-8') as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class DocumentStore:
+    def __init__(self, root: Path, max_deltas: int = 8) -> None:
+        self.root: Path = root
+        self.max_deltas: int = max_deltas
+        self.index: dict[str, IndexEntry] = {}
+        index_path: Path = root / 'index.tsv'
+        if index_path.exists():
+            with index_path.open(encoding='utf-8') as f:
+                next(f, None)
+                for line in f:
+                    doc_id, digest, modified, segment = line.rstrip('\n').split('\t')
+                    self.index[doc_id] = IndexEntry(digest, modified, segment)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _segment_path(self, segment: str) -> Path:
+        return self.root / f'{segment}.jsonl'
+
+    def _deltas(self) -> list[str]:
+        return sorted(path.stem for path in self.root.glob('delta-*.jsonl'))
+
+    def _write_index(self) -> None:
+        _replace(self.root / 'index.tsv', [INDEX_HEADER + '\n'] + [
+            f'{doc_id}\t{entry.digest}\t{entry.modified}\t{entry.segment}\n' for doc_id, entry in self.index.items()
+        ])
+
+    @staticmethod
+    def _line(document: Document, modified: str) -> str:
+        return json.dumps({**document.to_dict(), 'modified': modified}, ensure_ascii=False) + '\n'
+
+    def upsert(self, documents: Iterable[Document], now: Optional[datetime.datetime] = None) -> UpsertResult:
+        """Store the documents that are new or differ from their stored version as one delta segment."""
+        modified: str = (now or datetime.datetime.now(datetime.timezone.utc)).isoformat(timespec='seconds')
+        result: UpsertResult = UpsertResult()
+        changed: dict[str, tuple[Document, str]] = {}
+        total: int = 0
+        for document in documents:
+            total += 1
+            digest: str = document_digest(document)
+            entry: Optional[IndexEntry] = self.index.get(document.id)
+            if entry is not None and entry.digest == digest:
+                changed.pop(document.id, None)
+                continue
+            changed[document.id] = (document, digest)
+
+        for doc_id in changed:
+            if doc_id in self.index:
+                result.updated += 1
+            else:
+                result.added += 1
+        result.unchanged = total - len(changed)
+        if not changed:
+            return result
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        deltas: list[str] = self._deltas()
+        segment: str = f'delta-{int(deltas[-1][6:]) + 1 if deltas else 1:06d}'
+        _replace(self._segment_path(segment), (self._line(document, modified) for document, _ in changed.values()))
+        for doc_id, (_, digest) in changed.items():
+            self.index[doc_id] = IndexEntry(digest, modified, segment)
+        self._write_index()
+        result.segment = segment
+
+        if len(deltas) + 1 >= self.max_deltas:
+            self.compact()
+            result.compacted = True
+        return result
+
+    def _current_lines(self) -> Iterator[tuple[str, str]]:
+        """(id, line) of the current version of every document, in segment order."""
+        for segment in [BASE] + self._deltas():
+            path: Path = self._segment_path(segment)
+            if not path.exists():
+                continue
+            with path.open(encoding='utf-8') as f:
+                for line in f:
+                    doc_id: str = json.loads(line)['id']
+                    entry: Optional[IndexEntry] = self.index.get(doc_id)
+                    if entry is not None and entry.segment == segment:
+                        yield doc_id, line
+
+    def documents(self, source: Optional[str] = None) -> Iterator[Document]:
+        """Yield the current version of every stored document (of one source if given)."""
+        for _, line in self._current_lines():
+            document: Document = Document.from_dict(json.loads(line))
+            if source is None or record_source(document) == source:
+                yield document
+
+    def modified(self, doc_id: str) -> Optional[str]:
+        entry: Optional[IndexEntry] = self.index.get(doc_id)
+        return entry.modified if entry is not None else None
+
+    def compact(self) -> None:
+        """Rewrite the current versions into a new base and drop the delta segments."""
+        if not self.root.exists():
+            return
+        stale: list[Path] = [self._segment_path(segment) for segment in self._deltas()]
+        ids: list[str] = []
+
+        def lines() -> Iterator[str]:
+            for doc_id, line in self._current_lines():
+                ids.append(doc_id)
+                yield line
+
+        _replace(self._segment_path(BASE), lines())
+        for doc_id in ids:
+            self.index[doc_id].segment = BASE
+        self._write_index()
+        for path in stale:
+            path.unlink()
+
+
+@contextmanager
+def locked_store(root: Path, max_deltas: int = 8) -> Iterator[DocumentStore]:
+    """Open the store under an exclusive lock, so extractors of different sources can upsert concurrently."""
+    root.mkdir(parents=True, exist_ok=True)
+    with (root / '.lock').open('w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield DocumentStore(root, max_deltas=max_deltas)
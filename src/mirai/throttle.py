@@ -0,0 +1,252 @@
+"""Adaptive per-host request throttling.
+
+Each host gets an AIMD (additive-increase / multiplicative-decrease) window.
+The window bounds the number of in-flight requests to the host and the spacing
+between request starts (``delay / window``), so a window of 1 behaves exactly
+like the old fixed ``time.sleep(delay)`` loops.  Healthy latency percentiles
+grow the window up to the ceiling; 429/503 responses, server errors, connection
+failures and slow percentiles shrink it back towards the floor, and
+``Retry-After`` pauses the host entirely.
+
+The session can also record every response into a local archive or send every
+request to a replay server instead (see :mod:`mirai.mirror`); hosts are still
+throttled by the URL the caller asked for.
+"""
+import datetime
+import email.utils
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import click
+import requests
+from requests import Response
+from tqdm import tqdm
+
+from mirai.mirror import MirrorArchive, mirror_url
+
+RETRY_STATUSES: frozenset[int] = frozenset({429, 503})
+
+
+@dataclass
+class ThrottleConfig:
+    """Limits and tuning knobs shared by every host."""
+    floor: int = 1
+    ceiling: int = 4
+    delay: float = 1.0
+    increase: float = 1.0
+    decrease: float = 0.5
+    latency_target: float = 2.0
+    latency_percentile: float = 0.9
+    window: int = 10
+    backoff: float = 30.0
+    max_retries: int = 3
+    timeout: float = 60.0
+
+    def __post_init__(self) -> None:
+        if self.floor < 1 or self.ceiling < self.floor:
+            raise ValueError(f'Invalid concurrency limits: floor={self.floor}, ceiling={self.ceiling}')
+
+
+@dataclass
+class HostState:
+    limit: float
+    in_flight: int = 0
+    next_start: float = 0.0
+    blocked_until: float = 0.0
+    latencies: deque[float] = field(default_factory=deque)
+    requests: int = 0
+    throttled: int = 0
+    errors: int = 0
+    max_limit: float = 0.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at: datetime.datetime = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the ``q`` quantile (nearest rank) of a non-empty list."""
+    ordered: list[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AIMDController:
+    """Thread-safe per-host AIMD concurrency controller."""
+
+    def __init__(self, config: ThrottleConfig, log: Callable[[str], Any] = tqdm.write, decision_log: Optional[Path] = None) -> None:
+        self.config: ThrottleConfig = config
+        self.log: Callable[[str], Any] = log
+        self.decision_log: Optional[Path] = decision_log
+        self.hosts: dict[str, HostState] = {}
+        self.condition: threading.Condition = threading.Condition()
+
+    def _state(self, host: str) -> HostState:
+        state: Optional[HostState] = self.hosts.get(host)
+        if state is None:
+            state = HostState(limit=float(self.config.floor), latencies=deque(maxlen=self.config.window), max_limit=float(self.config.floor))
+            self.hosts[host] = state
+        return state
+
+    def acquire(self, host: str) -> None:
+        """Block until the host's window and spacing allow another request."""
+        with self.condition:
+            state: HostState = self._state(host)
+            while True:
+                now: float = time.monotonic()
+                wait: float = max(state.blocked_until, state.next_start) - now
+                if wait <= 0 and state.in_flight < int(state.limit):
+                    state.in_flight += 1
+                    state.requests += 1
+                    state.next_start = now + self.config.delay / state.limit
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, host: str, latency: float, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """Record the outcome of a request and adjust the host's window."""
+        with self.condition:
+            state: HostState = self._state(host)
+            state.in_flight -= 1
+            if status is None or status in RETRY_STATUSES or status >= 500:
+                if status in RETRY_STATUSES:
+                    state.throttled += 1
+                else:
+                    state.errors += 1
+                reason: str = 'connection error' if status is None else f'HTTP {status}'
+                self._adjust(host, state, max(float(self.config.floor), state.limit * self.config.decrease), reason)
+                cooldown: Optional[float] = retry_after
+                if cooldown is None and status in RETRY_STATUSES:
+                    cooldown = self.config.backoff
+                if cooldown:
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + cooldown)
+                    self._record(host, 'pause', state.limit, state.limit, f'{reason}, retry after {cooldown:.1f}s')
+            else:
+                state.latencies.append(latency)
+                if len(state.latencies) == state.latencies.maxlen:
+                    observed: float = percentile(list(state.latencies), self.config.latency_percentile)
+                    label: str = f'p{int(self.config.latency_percentile * 100)} latency {observed:.2f}s'
+                    if observed > self.config.latency_target:
+                        self._adjust(host, state, max(float(self.config.floor), state.limit * self.config.decrease), f'{label} > {self.config.latency_target:.2f}s')
+                    else:
+                        self._adjust(host, state, min(float(self.config.ceiling), state.limit + self.config.increase), f'{label} <= {self.config.latency_target:.2f}s')
+            self.condition.notify_all()
+
+    def _adjust(self, host: str, state: HostState, new_limit: float, reason: str) -> None:
+        old_limit: float = state.limit
+        state.limit = new_limit
+        state.max_limit = max(state.max_limit, new_limit)
+        # 次の判定は新しい窓で観測した応答だけを使う
+        state.latencies.clear()
+        if int(new_limit) != int(old_limit):
+            action: str = 'increase' if new_limit > old_limit else 'decrease'
+            self._record(host, action, old_limit, new_limit, reason)
+
+    def _record(self, host: str, action: str, old_limit: float, new_limit: float, reason: str) -> None:
+        self.log(f'[throttle] {host}: {action} {int(old_limit)} -> {int(new_limit)} ({reason})')
+        if self.decision_log is None:
+            return
+        entry: dict[str, str | int] = {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'host': host,
+            'action': action,
+            'from': int(old_limit),
+            'to': int(new_limit),
+            'reason': reason,
+        }
+        with self.decision_log.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def summary(self) -> str:
+        """Return a one-line-per-host summary of requests made and limits reached."""
+        with self.condition:
+            return '\n'.join(
+                f'[throttle] {host}: {state.requests} requests, {state.throttled} throttled, '
+                f'{state.errors} errors, max concurrency {int(state.max_limit)}'
+                for host, state in sorted(self.hosts.items())
+            )
+
+
+class PoliteSession:
+    """``requests`` wrapper that routes every request through an :class:`AIMDController`."""
+
+    def __init__(self, controller: AIMDController, headers: Optional[dict[str, str]] = None,
+                 mirror: Optional[str] = None, recorder: Optional[MirrorArchive] = None) -> None:
+        self.controller: AIMDController = controller
+        self.headers: dict[str, str] = headers or {}
+        self.mirror: Optional[str] = mirror
+        self.recorder: Optional[MirrorArchive] = recorder
+        self.local: threading.local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # requests.Session はスレッド間で共有しない
+        session: Optional[requests.Session] = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self.local.session = session
+        return session
+
+    def get(self, url: str, **kwargs: Any) -> Response:
+        """GET ``url``, retrying 429/503 responses after the host's cooldown."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> Response:
+        """POST to ``url``, retrying 429/503 responses after the host's cooldown."""
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        host: str = urlsplit(url).netloc
+        target: str = mirror_url(self.mirror, url) if self.mirror else url
+        kwargs.setdefault('timeout', self.controller.config.timeout)
+        attempt: int = 0
+        while True:
+            self.controller.acquire(host)
+            start: float = time.monotonic()
+            status: Optional[int] = None
+            retry_after: Optional[float] = None
+            try:
+                response: Response = self._session().request(method, target, **kwargs)
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            finally:
+                self.controller.release(host, time.monotonic() - start, status, retry_after)
+            if self.recorder is not None and method == 'GET':
+                self.recorder.record(url, response)
+            if status not in RETRY_STATUSES or attempt >= self.controller.config.max_retries:
+                return response
+            attempt += 1
+
+
+def throttle_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--min_concurrency``/``--max_concurrency``/``--throttle_log``/``--mirror``/``--record`` options to a click command."""
+    func = click.option('--record', default=None, type=click.Path(file_okay=False, path_type=Path), help="Record every response into this mirror archive")(func)
+    func = click.option('--mirror', default=None, help="Fetch from this replay server (mirai mirror serve) instead of the live sites")(func)
+    func = click.option('--throttle_log', default=None, type=click.Path(dir_okay=False, writable=True, path_type=Path), help="Append throttle decisions to this JSONL file")(func)
+    func = click.option('--max_concurrency', default=ThrottleConfig.ceiling, type=int, help="Maximum in-flight requests per host")(func)
+    func = click.option('--min_concurrency', default=ThrottleConfig.floor, type=int, help="Minimum in-flight requests per host")(func)
+    return func
+
+
+def make_session(delay: float, min_concurrency: int, max_concurrency: int, throttle_log: Optional[Path], headers: Optional[dict[str, str]] = None,
+                 mirror: Optional[str] = None, record: Optional[Path] = None) -> PoliteSession:
+    """Build a :class:`PoliteSession` from the values of :func:`throttle_options`."""
+    config: ThrottleConfig = ThrottleConfig(floor=min_concurrency, ceiling=max_concurrency, delay=delay)
+    recorder: Optional[MirrorArchive] = MirrorArchive(record) if record is not None else None
+    return PoliteSession(AIMDController(config, decision_log=throttle_log), headers=headers, mirror=mirror, recorder=recorder)
@@ -0,0 +1,285 @@
+"""Per-paragraph token counts kept in a sidecar, and batch planning over them.
+
+A sidecar is a directory of NumPy arrays that can be memory-mapped::
+
+    meta.json          tokenizer spec and format version
+    ids.json           record ids, in row order
+    hashes.npy         uint64 content hash of each record's bodies
+    en_paragraphs.npy  int32 number of English paragraphs of each record
+    offsets.npy        int64 start of each record's counts (rows + 1)
+    counts.npy         int32 token counts, English paragraphs then Japanese
+
+Updating a sidecar only tokenizes the records whose id is new or whose bodies
+changed; the other rows are copied over, and rows of records missing from the
+input are kept.  A different tokenizer spec starts a new sidecar.
+
+Tokenizers are named by a spec: ``regex`` (words and punctuation in English,
+ASCII runs and single characters in Japanese; the default, no model needed),
+``chars``, ``tiktoken:ENCODING``, ``hf:NAME_OR_tokenizer.json`` (the
+``tokenizers`` package) or ``module:attribute`` naming a callable
+``(texts, lang) -> counts``.  The last three are imported only when used.
+"""
+import hashlib
+import importlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+from tqdm import tqdm
+
+from mirai.packed import attach_worker, share_records, worker_corpus
+from mirai.records import Record, iter_records
+
+Tokenizer = Callable[[list[str], str], list[int]]
+
+# 形式やトークナイザの実装を変えたら上げる
+SIDECAR_VERSION: int = 1
+LANGS: tuple[str, ...] = ('en', 'ja')
+RE_TOKEN: dict[str, re.Pattern[str]] = {
+    'en': re.compile(r'\w+|[^\w\s]'),
+    'ja': re.compile(r'[A-Za-z0-9]+|\S'),
+}
+
+
+def regex_tokenizer(texts: list[str], lang: str) -> list[int]:
+    pattern: re.Pattern[str] = RE_TOKEN[lang]
+    return [sum(1 for _ in pattern.finditer(text)) for text in texts]
+
+
+def char_tokenizer(texts: list[str], lang: str) -> list[int]:
+    return [len(text) for text in texts]
+
+
+def make_tokenizer(spec: str) -> Tokenizer:
+    """Build the tokenizer named by ``spec`` (see the module docstring)."""
+    if spec == 'regex':
+        return regex_tokenizer
+    if spec == 'chars':
+        return char_tokenizer
+    kind, _, name = spec.partition(':')
+    if not name:
+        raise ValueError(f'Unknown tokenizer: {spec}')
+    if kind == 'tiktoken':
+        import tiktoken
+        encoding = tiktoken.get_encoding(name)
+        return lambda texts, lang: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+    if kind == 'hf':
+        from tokenizers import Tokenizer as HFTokenizer
+        model = HFTokenizer.from_file(name) if Path(name).is_file() else HFTokenizer.from_pretrained(name)
+        return lambda texts, lang: [len(encoding.ids) for encoding in model.encode_batch(texts, add_special_tokens=False)]
+    return getattr(importlib.import_module(kind), name)
+
+
+def content_hash(record: Record) -> int:
+    """64-bit hash of a record's English and Japanese bodies."""
+    digest = hashlib.blake2b(digest_size=8)
+    for lang in LANGS:
+        for paragraph in record[f'{lang}_body']:
+            digest.update(paragraph.encode('utf-8') + b'\0')
+        digest.update(b'\1')
+    return int.from_bytes(digest.digest(), 'little')
+
+
+class TokenCounts:
+    """The arrays of a sidecar, with per-record and per-document lookups."""
+
+    def __init__(self, tokenizer: str, ids: list[str], hashes: np.ndarray, en_paragraphs: np.ndarray,
+                 offsets: np.ndarray, counts: np.ndarray) -> None:
+        self.tokenizer: str = tokenizer
+        self.ids: list[str] = ids
+        self.hashes: np.ndarray = hashes
+        self.en_paragraphs: np.ndarray = en_paragraphs
+        self.offsets: np.ndarray = offsets
+        self.counts: np.ndarray = counts
+        self.rows: dict[str, int] = {doc_id: row for row, doc_id in enumerate(ids)}
+
+    @classmethod
+    def empty(cls, tokenizer: str) -> 'TokenCounts':
+        return cls(tokenizer, [], np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32),
+                   np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32))
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional['TokenCounts']:
+        """Memory-map a sidecar, or None if ``directory`` holds no complete one."""
+        if not (directory / 'offsets.npy').exists():
+            return None
+        meta: dict = json.loads((directory / 'meta.json').read_text(encoding='utf-8'))
+        if meta.get('version') != SIDECAR_VERSION:
+            return None
+        arrays: dict[str, np.ndarray] = {
+            name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in ('hashes', 'en_paragraphs', 'offsets', 'counts')
+        }
+        ids: list[str] = json.loads((directory / 'ids.json').read_text(encoding='utf-8'))
+        return cls(meta['tokenizer'], ids, **arrays)
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        # offsets は最後に書き、途中で中断した場合は読み込まない
+        (directory / 'offsets.npy').unlink(missing_ok=True)
+        (directory / 'meta.json').write_text(json.dumps({'version': SIDECAR_VERSION, 'tokenizer': self.tokenizer}), encoding='utf-8')
+        (directory / 'ids.json').write_text(json.dumps(self.ids, ensure_ascii=False), encoding='utf-8')
+        for name, array, dtype in (('hashes', self.hashes, np.uint64), ('en_paragraphs', self.en_paragraphs, np.int32),
+                                   ('counts', self.counts, np.int32), ('offsets', self.offsets, np.int64)):
+            # 置き換えで書き、読み込み中の古い配列のマップを壊さない
+            temporary: Path = directory / f'{name}.npy.tmp'
+            with temporary.open('wb') as f:
+                np.save(f, np.asarray(array, dtype=dtype))
+            temporary.replace(directory / f'{name}.npy')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.rows
+
+    def span(self, row: int, lang: str) -> tuple[int, int]:
+        """Range of ``counts`` holding the paragraphs of row ``row`` in ``lang``."""
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        middle: int = start + int(self.en_paragraphs[row])
+        return (start, middle) if lang == 'en' else (middle, end)
+
+    def paragraph_counts(self, doc_id: str, lang: str) -> np.ndarray:
+        start, end = self.span(self.rows[doc_id], lang)
+        return np.asarray(self.counts[start:end])
+
+    def document_totals(self, lang: str) -> np.ndarray:
+        """Token count of every record's ``lang`` body, in row order."""
+        cumulative: np.ndarray = np.concatenate([[0], np.cumsum(self.counts, dtype=np.int64)])
+        starts: np.ndarray = np.asarray(self.offsets[:-1], dtype=np.int64)
+        ends: np.ndarray = np.asarray(self.offsets[1:], dtype=np.int64)
+        if lang == 'en':
+            ends = starts + np.asarray(self.en_paragraphs, dtype=np.int64)
+        else:
+            starts = starts + np.asarray(self.en_paragraphs, dtype=np.int64)
+        return cumulative[ends] - cumulative[starts]
+
+
+_tokenizer: Optional[Tokenizer] = None
+
+
+def _attach(handle: str, spec: str) -> None:
+    global _tokenizer
+    attach_worker(handle)
+    _tokenizer = make_tokenizer(spec)
+
+
+def _count_document(position: int) -> tuple[list[int], list[int]]:
+    document = worker_corpus()[position]
+    return _tokenizer(document.en_body, 'en'), _tokenizer(document.ja_body, 'ja')
+
+
+def update_counts(directory: Path, paths: Iterable[Path], spec: str, workers: Optional[int] = None,
+                  chunksize: int = 64) -> tuple[TokenCounts, int, int]:
+    """Bring the sidecar in ``directory`` up to date with the records of ``paths``.
+
+    Returns the updated counts, the number of records tokenized and the number
+    of rows reused.
+    """
+    make_tokenizer(spec)
+    previous: Optional[TokenCounts] = TokenCounts.load(directory)
+    if previous is None or previous.tokenizer != spec:
+        previous = TokenCounts.empty(spec)
+
+    current: dict[str, int] = {}
+    pending: list[str] = []
+
+    def changed(records: Iterator[Record]) -> Iterator[Record]:
+        for record in records:
+            doc_id: str = str(record['id'])
+            digest: int = content_hash(record)
+            current[doc_id] = digest
+            row: Optional[int] = previous.rows.get(doc_id)
+            if row is None or int(previous.hashes[row]) != digest:
+                pending.append(doc_id)
+                yield record
+
+    # 変わったレコードだけを共有メモリに詰めて数える
+    fresh: dict[str, tuple[list[int], list[int]]] = {}
+    with share_records(changed(iter_records(paths))) as corpus:
+        if len(corpus):
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(corpus.handle, spec)) as executor:
+                results = executor.map(_count_document, range(len(corpus)), chunksize=chunksize)
+                for doc_id, counts in tqdm(zip(pending, results), total=len(corpus), desc='Counting tokens', unit='doc'):
+                    fresh[doc_id] = counts
+
+    ids: list[str] = list(previous.ids) + [doc_id for doc_id in current if doc_id not in previous.rows]
+    hashes: list[int] = []
+    en_paragraphs: list[int] = []
+    pieces: list[np.ndarray] = []
+    reused: int = 0
+    for doc_id in ids:
+        if doc_id in fresh:
+            en_counts, ja_counts = fresh[doc_id]
+            hashes.append(current[doc_id])
+            en_paragraphs.append(len(en_counts))
+            pieces.append(np.array(en_counts + ja_counts, dtype=np.int32))
+        else:
+            row: int = previous.rows[doc_id]
+            hashes.append(int(previous.hashes[row]))
+            en_paragraphs.append(int(previous.en_paragraphs[row]))
+            pieces.append(np.array(previous.counts[int(previous.offsets[row]):int(previous.offsets[row + 1])], dtype=np.int32))
+            reused += doc_id in current
+    lengths: np.ndarray = np.array([len(piece) for piece in pieces], dtype=np.int64)
+    counts: TokenCounts = TokenCounts(
+        spec, ids, np.array(hashes, dtype=np.uint64), np.array(en_paragraphs, dtype=np.int32),
+        np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        np.concatenate(pieces) if pieces else np.empty(0, dtype=np.int32),
+    )
+    counts.save(directory)
+    return counts, len(fresh), reused
+
+
+@dataclass
+class Batch:
+    # (id, 段落番号)。文書単位のときは段落番号が None
+    items: list[tuple[str, Optional[int]]]
+    tokens: int
+
+
+@dataclass
+class BatchPlan:
+    batches: list[Batch] = field(default_factory=list)
+    dropped: list[tuple[str, Optional[int]]] = field(default_factory=list)
+    tokens: int = 0
+
+
+def plan_batches(counts: TokenCounts, lang: str, max_tokens: int, max_size: int, unit: str = 'document',
+                 context_window: Optional[int] = None, ids: Optional[Iterable[str]] = None) -> BatchPlan:
+    """Pack documents (or paragraphs) of ``lang`` into batches of similar length.
+
+    Units are sorted by token count and cut into batches of at most
+    ``max_size`` units and ``max_tokens`` tokens (a longer unit gets a batch
+    of its own).  Units longer than ``context_window`` are dropped.  ``ids``
+    restricts the plan to those records; a repeated id is planned once.
+    """
+    rows: np.ndarray = (np.arange(len(counts)) if ids is None
+                        else np.array([counts.rows[doc_id] for doc_id in dict.fromkeys(ids) if doc_id in counts.rows], dtype=np.int64))
+    if unit == 'document':
+        lengths: np.ndarray = counts.document_totals(lang)[rows]
+        keys: list[tuple[str, Optional[int]]] = [(counts.ids[row], None) for row in rows.tolist()]
+    else:
+        spans: list[tuple[int, int]] = [counts.span(row, lang) for row in rows.tolist()]
+        lengths = np.concatenate([np.asarray(counts.counts[start:end]) for start, end in spans]) if spans else np.empty(0, dtype=np.int32)
+        keys = [(counts.ids[row], k) for row, (start, end) in zip(rows.tolist(), spans) for k in range(end - start)]
+
+    plan: BatchPlan = BatchPlan()
+    order: np.ndarray = np.argsort(lengths, kind='stable')
+    current: list[tuple[str, Optional[int]]] = []
+    current_tokens: int = 0
+    for index, length in zip(order.tolist(), lengths[order].tolist()):
+        if context_window is not None and length > context_window:
+            plan.dropped.append(keys[index])
+            continue
+        if current and (len(current) >= max_size or current_tokens + length > max_tokens):
+            plan.batches.append(Batch(current, current_tokens))
+            current, current_tokens = [], 0
+        current.append(keys[index])
+        current_tokens += length
+        plan.tokens += length
+    if current:
+        plan.batches.append(Batch(current, current_tokens))
+    return plan
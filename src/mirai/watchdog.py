@@ -0,0 +1,228 @@
+"""Per-document time and memory budgets for the serial extractor loops.
+
+The body of an extractor's loop runs inside :meth:`Watchdog.document`, and the
+parse/extract stages of the document run through :meth:`Watchdog.run`, which
+hands them to a single worker process.  The worker is given the time left in
+the document's budget and runs under ``RLIMIT_AS``, so a parse that never
+returns is killed at the deadline and one that blows up its memory fails
+with ``MemoryError`` inside the worker instead of getting the run OOM-killed.
+Either way, and also when the worker dies or raises ``RecursionError``, the
+document is abandoned with :class:`BudgetExceeded`, the worker is replaced
+by a fresh one for the next document, and the loop carries on.  The gate,
+filter and boilerplate bookkeeping stays in the main process;
+:meth:`Watchdog.check` between stages abandons a document whose time ran out
+there, so shared state is never left half-updated.
+
+The budgets are off unless ``--doc_timeout``/``--doc_memory`` are given;
+without them every stage runs in the main process as before.  Abandoned
+documents are kept in a quarantine TSV (``key``, ``reason``, ``seconds``,
+``memory_mb``, the worker's resident memory when it was stopped) if
+``--quarantine`` is given; a document that later extracts within budget drops
+out of it.  The memory budget needs ``resource`` and ``/proc/self/statm``, so
+it only applies on Linux.
+"""
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import click
+from tqdm import tqdm
+
+from mirai.profile import DocumentProfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+QUARANTINE_HEADER: str = 'key\treason\tseconds\tmemory_mb'
+PROC: Path = Path('/proc')
+
+
+class BudgetExceeded(Exception):
+    """Raised when the current document went over its budget or its worker failed."""
+
+
+def statm_bytes(field: int, pid: str = 'self') -> Optional[int]:
+    """Read a field of ``/proc/<pid>/statm`` (0: address space, 1: resident) in bytes."""
+    try:
+        return int((PROC / pid / 'statm').read_text().split()[field]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _serve(conn: Connection, memory_bytes: int) -> None:
+    """Worker loop: run ``func(*args)`` for each task received and send back the outcome."""
+    if memory_bytes > 0:
+        # 起動直後のアドレス空間に予算を足したものを上限にする
+        limit: int = (statm_bytes(0) or 0) + memory_bytes
+        hard: int = resource.getrlimit(resource.RLIMIT_AS)[1]
+        resource.setrlimit(resource.RLIMIT_AS, (limit if hard == resource.RLIM_INFINITY else min(limit, hard), hard))
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send(('ok', func(*args)))
+        except (RecursionError, MemoryError) as e:
+            conn.send(('breach', type(e).__name__))
+        except Exception as e:
+            try:
+                conn.send(('raise', e))
+            except Exception:
+                conn.send(('raise', RuntimeError(repr(e))))
+
+
+class Watchdog:
+    """Enforces the per-document budgets and records the documents that exceed them.
+
+    One document is watched at a time, so the extractor loop must be serial.
+    """
+
+    def __init__(self, path: Optional[Path], seconds: float = 0.0, memory_mb: float = 0.0,
+                 log: Callable[[str], None] = tqdm.write) -> None:
+        self.path: Optional[Path] = path
+        self.seconds: float = seconds
+        self.memory_mb: float = memory_mb if resource is not None and statm_bytes(0) is not None else 0.0
+        self.log: Callable[[str], None] = log
+        self.quarantine: dict[str, tuple[str, float, float]] = {}
+        self.counts: dict[str, int] = {}
+        self._start: float = 0.0
+        self._paused: float = 0.0
+        self._process: Optional[BaseProcess] = None
+        self._conn: Optional[Connection] = None
+        if memory_mb > 0 and self.memory_mb == 0:
+            log('Watchdog: RLIMIT_AS is not available on this platform; only the time budget applies')
+        if path is not None and path.exists():
+            with path.open(encoding='utf-8') as f:
+                next(f, None)
+                for line in f:
+                    key, reason, seconds_text, memory_text = line.rstrip('\n').split('\t')
+                    self.quarantine[key] = (reason, float(seconds_text), float(memory_text))
+
+    @property
+    def enabled(self) -> bool:
+        return self.seconds > 0 or self.memory_mb > 0
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._start - self._paused
+
+    def _start_worker(self) -> None:
+        context = multiprocessing.get_context('spawn')
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child, int(self.memory_mb * 1e6)), name='mirai-watchdog', daemon=True)
+        self._process.start()
+        child.close()
+
+    def _stop_worker(self) -> float:
+        """Kill the worker (the next task starts a fresh one) and return its resident memory in MB."""
+        if self._process is None:
+            return 0.0
+        resident: int = statm_bytes(1, str(self._process.pid)) or 0
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process, self._conn = None, None
+        return round(resident / 1e6, 1)
+
+    def run(self, func: Callable[..., Any], doc: DocumentProfile, *args: Any) -> Any:
+        """Run ``func(doc, *args)``, the parse/extract stages of the current document, in the worker.
+
+        ``func`` must be a module-level function and its arguments and result picklable.  The
+        worker's stage timings and node counts are added to ``doc``.  Without budgets ``func``
+        runs in this process.
+        """
+        if not self.enabled:
+            return func(doc, *args)
+        self.check()
+        if self._process is None:
+            self._start_worker()
+        try:
+            self._conn.send((_staged, (func, doc.detached(), args)))
+            if self.seconds > 0 and not self._conn.poll(max(self.seconds - self._elapsed(), 0.0)):
+                raise BudgetExceeded(f'time over {self.seconds:g}s', self._stop_worker())
+            status, value = self._conn.recv()
+        except (EOFError, OSError):
+            self._process.join()
+            raise BudgetExceeded(f'worker died ({self._process.exitcode})', self._stop_worker()) from None
+        if status == 'breach':
+            # MemoryError のあとはヒープが膨らんだままなのでワーカーを作り直す
+            raise BudgetExceeded(value, self._stop_worker() if value == 'MemoryError' else 0.0)
+        if status == 'raise':
+            raise value
+        result, stages = value
+        doc.absorb(stages)
+        return result
+
+    def check(self) -> None:
+        """Abandon the current document if its time ran out; call between stages."""
+        if self.enabled and self.seconds > 0 and self._elapsed() > self.seconds:
+            raise BudgetExceeded(f'time over {self.seconds:g}s', 0.0)
+
+    def _record(self, key: str, reason: str, elapsed: float, memory: float) -> None:
+        self.quarantine[key] = (reason, round(elapsed, 2), memory)
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        self.log(f'Quarantined: {key}: {reason} ({elapsed:.1f}s, {memory:.0f} MB)')
+
+    @contextmanager
+    def document(self, key: str) -> Iterator[None]:
+        """Run the body as document ``key``; an abandoned body is recorded and skipped, not raised."""
+        if not self.enabled:
+            yield
+            return
+        self._start, self._paused = time.perf_counter(), 0.0
+        try:
+            yield
+        except BudgetExceeded as e:
+            reason, memory = e.args
+            self._record(key, reason, self._elapsed(), memory)
+        except (RecursionError, MemoryError) as e:
+            self._record(key, type(e).__name__, self._elapsed(), 0.0)
+        else:
+            self.quarantine.pop(key, None)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Exclude the body (a network request, say) from the current document's budget."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._paused += time.perf_counter() - start
+
+    def summary(self) -> str:
+        return 'Watchdog: ' + (', '.join(f'{count} {reason}' for reason, count in sorted(self.counts.items())) or 'nothing quarantined')
+
+    def save(self) -> None:
+        # 何も隔離していなければ空の TSV は作らない
+        if self.path is None or not (self.quarantine or self.path.exists()):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('w', encoding='utf-8') as f:
+            f.write(QUARANTINE_HEADER + '\n')
+            for key, (reason, seconds, memory) in sorted(self.quarantine.items()):
+                f.write(f'{key}\t{reason}\t{seconds}\t{memory}\n')
+
+
+def _staged(func: Callable[..., Any], doc: DocumentProfile, args: tuple[Any, ...]) -> tuple[Any, DocumentProfile]:
+    """Run in the worker: call ``func`` and send its profile back along with the result."""
+    return func(doc, *args), doc
+
+
+def watchdog_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Add the ``--doc_timeout``, ``--doc_memory`` and ``--quarantine`` options to a click command."""
+    func = click.option('--quarantine', default=None, type=click.Path(dir_okay=False, path_type=Path), help="TSV recording the documents abandoned for exceeding their budget")(func)
+    func = click.option('--doc_memory', default=0.0, type=float, help="Address space in MB the extraction worker may grow by, e.g. 2048 (default: no limit)")(func)
+    func = click.option('--doc_timeout', default=0.0, type=float, help="Seconds a document may take, e.g. 120 (default: no limit)")(func)
+    return func
+
+
+def make_watchdog(doc_timeout: float, doc_memory: float, quarantine: Optional[Path], log: Callable[[str], None] = tqdm.write) -> Watchdog:
+    """Build a :class:`Watchdog` from the values of :func:`watchdog_options`."""
+    return Watchdog(quarantine, doc_timeout, doc_memory, log=log)
@@ -0,0 +1,4 @@
+from mirai.commands.mock_translation_server import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+from mirai.commands.score import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+from mirai.commands.stats import main
+
+if __name__ == '__main__':
+    main()
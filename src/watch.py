@@ -0,0 +1,4 @@
+from mirai.commands.watch import main
+
+if __name__ == '__main__':
+    main()
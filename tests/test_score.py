@@ -0,0 +1,51 @@
+"""Corpus scores of ``mirai score`` against sacrebleu on the same documents."""
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from mirai.commands.score import main, tokenize_13a
+
+sacrebleu = pytest.importorskip('sacrebleu')
+from sacrebleu.tokenizers.tokenizer_13a import Tokenizer13a  # noqa: E402
+
+REFERENCES: list[list[str]] = [
+    ['GDP grew 3.5% in the April-June quarter, the Cabinet Office said.', 'Exports rose to ¥2,000 billion.'],
+    ['The Minister met his U.S. counterpart on 12-13 May.', 'They agreed on "close co-operation" & follow-up talks.'],
+    ['Press conference by the Prime Minister (excerpt).'],
+]
+HYPOTHESES: list[list[str]] = [
+    ['GDP grew by 3.5% in the April-June quarter, according to the Cabinet Office.', 'Exports rose to 2,000 billion yen.'],
+    ['The minister met his US counterpart on May 12-13.', 'They agreed on "close cooperation" and follow-up talks.'],
+    ['Prime Minister\'s press conference (excerpt)'],
+]
+
+
+@pytest.mark.parametrize('text', ['3.5% and 2,000.', 'co-operation, 12-13 May.', 'a &quot;b&quot; &amp; c-\nd', 'x...y,z'])
+def test_tokenize_13a_matches_sacrebleu(text: str) -> None:
+    assert tokenize_13a(text) == Tokenizer13a()(text).split()
+
+
+def test_corpus_scores_match_sacrebleu(tmp_path: Path) -> None:
+    dataset: Path = tmp_path / 'dataset.json'
+    dataset.write_text(json.dumps([
+        {'id': f'doc{i}', 'en_URI': '', 'ja_URI': '', 'en_body': body, 'ja_body': ['。'] * len(body), 'ja_date': '2024-01-01'}
+        for i, body in enumerate(REFERENCES)
+    ]), encoding='utf-8')
+    hypotheses: Path = tmp_path / 'hypotheses.jsonl'
+    hypotheses.write_text(''.join(
+        json.dumps({'id': f'doc{i}', 'system': 'system', 'direction': 'ja-en', 'hyp_body': body}) + '\n'
+        for i, body in enumerate(HYPOTHESES)
+    ), encoding='utf-8')
+    output: Path = tmp_path / 'scores.json'
+
+    result = CliRunner().invoke(main, [str(dataset), '-h', str(hypotheses), '-o', str(output),
+                                       '--cache_dir', str(tmp_path / 'cache'), '--bootstrap', '10', '--workers', '1'])
+    assert result.exit_code == 0, result.output
+
+    scores: dict = json.loads(output.read_text(encoding='utf-8'))['systems']['system']
+    references: list[str] = ['\n'.join(body) for body in REFERENCES]
+    outputs: list[str] = ['\n'.join(body) for body in HYPOTHESES]
+    assert scores['BLEU']['score'] == pytest.approx(sacrebleu.corpus_bleu(outputs, [references]).score, abs=1e-6)
+    assert scores['chrF']['score'] == pytest.approx(sacrebleu.corpus_chrf(outputs, [references]).score, abs=1e-6)